@@ -1,16 +1,51 @@
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
+import httpx
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage
 
 # Load environment variables
 load_dotenv()
 
-# Initialize ChatOpenAI
-# Initialize ChatOpenAI per request to avoid thread deadlocks in FastAPI
-def get_llm():
-    return ChatOpenAI(model="gpt-4o", temperature=0, request_timeout=30)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")  # "openai" or "fake" (see fake_llm.py)
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+
+# Process-wide chat model, installed by main.py's lifespan with a bounded,
+# keep-alive connection pool shared by every request (see set_llm).
+_llm: Optional[BaseChatModel] = None
+
+def create_llm(http_async_client: Optional[httpx.AsyncClient] = None, backend: Optional[str] = None, **kwargs) -> BaseChatModel:
+    """
+    Builds the chat model for `backend` (default LLM_BACKEND). The OpenAI one
+    sends its async calls through `http_async_client`.
+    """
+    backend = backend or LLM_BACKEND
+    if backend == "fake":
+        from fake_llm import FakeChatModel
+        return FakeChatModel(**kwargs)
+    if backend != "openai":
+        raise ValueError(f"Unknown LLM_BACKEND: {backend!r}")
+    return ChatOpenAI(
+        model=LLM_MODEL,
+        temperature=0,
+        request_timeout=LLM_TIMEOUT,
+        http_async_client=http_async_client,
+        **kwargs,
+    )
+
+def set_llm(llm: Optional[BaseChatModel]) -> None:
+    global _llm
+    _llm = llm
+
+def get_llm() -> BaseChatModel:
+    """The shared model; created on first use when running outside the FastAPI app."""
+    global _llm
+    if _llm is None:
+        _llm = create_llm()
+    return _llm
 
 def _convert_history_to_messages(chat_history: List[Dict[str, str]]) -> List[BaseMessage]:
     """Converts a list of dicts to LangChain message objects."""
@@ -26,18 +61,7 @@ def _convert_history_to_messages(chat_history: List[Dict[str, str]]) -> List[Bas
             messages.append(SystemMessage(content=content))
     return messages
 
-async def user_chatbot(FAQ_context: str, chat_history: List[Dict[str, str]], message: str = "") -> str:
-    """
-    Constructs the prompt and executes the chat using LangChain OpenAI.
-    
-    Args:
-        FAQ_context: A string containing the FAQ.
-        chat_history: A list of dictionaries representing the chat history.
-        message: The latest user message.
-        
-    Returns:
-        The content of the assistant's response.
-    """
+def _build_user_messages(FAQ_context: str, chat_history: List[Dict[str, str]], message: str = "") -> List[BaseMessage]:
     system_prompt = f"""You are a helpful customer support assistant.
 Use the following FAQ to answer the user's questions.
 If the answer is not in the FAQ, politely say you don't know and offer to connect them to a human agent.
@@ -53,25 +77,36 @@ If the answer is not in the FAQ, politely say you don't know and offer to connec
     # Add the latest message if provided
     if message:
         messages.append(HumanMessage(content=message))
-        
-    # Execute the LLM call
-    llm = get_llm()
-    response = await llm.ainvoke(messages)
-    return response.content
+    return messages
 
-async def agent_chatbot(full_profile: str, chat_history: List[Dict[str, str]], FAQ_context: str, message: str = "") -> str:
+async def user_chatbot(FAQ_context: str, chat_history: List[Dict[str, str]], message: str = "") -> str:
     """
-    Constructs the prompt and executes the chat using LangChain OpenAI with a custom profile.
+    Constructs the prompt and executes the chat using LangChain OpenAI.
     
     Args:
-        full_profile: A string containing the agent's persona/instructions.
-        chat_history: A list of dictionaries representing the chat history.
         FAQ_context: A string containing the FAQ.
+        chat_history: A list of dictionaries representing the chat history.
         message: The latest user message.
         
     Returns:
         The content of the assistant's response.
     """
+    messages = _build_user_messages(FAQ_context, chat_history, message)
+        
+    # Execute the LLM call
+    llm = get_llm()
+    response = await llm.ainvoke(messages)
+    return response.content
+
+async def user_chatbot_stream(FAQ_context: str, chat_history: List[Dict[str, str]], message: str = "") -> AsyncIterator[str]:
+    """Same as `user_chatbot`, but yields the reply token by token as the LLM produces it."""
+    messages = _build_user_messages(FAQ_context, chat_history, message)
+    llm = get_llm()
+    async for chunk in llm.astream(messages):
+        if chunk.content:
+            yield chunk.content
+
+def _build_agent_messages(full_profile: str, chat_history: List[Dict[str, str]], FAQ_context: str, message: str = "") -> List[BaseMessage]:
     system_prompt = f"""{full_profile}
 
 Use the following FAQ to answer the user's questions where relevant.
@@ -85,8 +120,32 @@ Use the following FAQ to answer the user's questions where relevant.
     
     if message:
         messages.append(HumanMessage(content=message))
+    return messages
+
+async def agent_chatbot(full_profile: str, chat_history: List[Dict[str, str]], FAQ_context: str, message: str = "") -> str:
+    """
+    Constructs the prompt and executes the chat using LangChain OpenAI with a custom profile.
+    
+    Args:
+        full_profile: A string containing the agent's persona/instructions.
+        chat_history: A list of dictionaries representing the chat history.
+        FAQ_context: A string containing the FAQ.
+        message: The latest user message.
+        
+    Returns:
+        The content of the assistant's response.
+    """
+    messages = _build_agent_messages(full_profile, chat_history, FAQ_context, message)
         
     # Execute the LLM call
     llm = get_llm()
     response = await llm.ainvoke(messages)
     return response.content
+
+async def agent_chatbot_stream(full_profile: str, chat_history: List[Dict[str, str]], FAQ_context: str, message: str = "") -> AsyncIterator[str]:
+    """Same as `agent_chatbot`, but yields the reply token by token as the LLM produces it."""
+    messages = _build_agent_messages(full_profile, chat_history, FAQ_context, message)
+    llm = get_llm()
+    async for chunk in llm.astream(messages):
+        if chunk.content:
+            yield chunk.content
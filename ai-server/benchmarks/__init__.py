@@ -0,0 +1,10 @@
+from typing import List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (0.0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
@@ -0,0 +1,175 @@
+"""
+Benchmark: a ChatOpenAI per request (the old `get_llm()`) vs the shared,
+pooled client that main.py installs at startup.
+
+Runs both against a local OpenAI-compatible stub (benchmarks/stub_openai.py,
+started in a subprocess), reporting latency percentiles, throughput and the
+process' open file descriptors sampled during the run.
+
+    cd ai-server && python -m benchmarks.llm_client --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import gc
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from agent import create_llm
+from benchmarks import percentile
+from main import (
+    LLM_CONNECT_TIMEOUT, LLM_KEEPALIVE_EXPIRY, LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS, LLM_POOL_TIMEOUT, LLM_TIMEOUT,
+)
+
+AI_SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MESSAGES = [
+    SystemMessage(content="You are a helpful customer support assistant."),
+    HumanMessage(content="How do I schedule a property viewing?"),
+]
+
+
+def open_fds() -> Optional[int]:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:  # not Linux
+        return None
+
+
+async def sample_fds(samples: List[int], stop: asyncio.Event, every: float = 0.02):
+    while not stop.is_set():
+        count = open_fds()
+        if count is not None:
+            samples.append(count)
+        try:
+            await asyncio.wait_for(stop.wait(), every)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(get_llm, requests: int, concurrency: int) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await get_llm().ainvoke(MESSAGES)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    fds_before = open_fds()
+    samples: List[int] = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_fds(samples, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "mean": statistics.mean(latencies) if latencies else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "fds_before": fds_before,
+        "fds_peak": max(samples) if samples else None,
+        "fds_after": open_fds(),
+    }
+
+
+async def bench_shared(base_url: str, requests: int, concurrency: int) -> Dict:
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT, pool=LLM_POOL_TIMEOUT),
+    )
+    llm = create_llm(http_client, backend="openai", base_url=base_url, api_key="stub")
+    try:
+        await run(lambda: llm, min(requests, concurrency), concurrency)  # warm-up
+        return await run(lambda: llm, requests, concurrency)
+    finally:
+        await http_client.aclose()
+
+
+async def bench_per_request(base_url: str, requests: int, concurrency: int) -> Dict:
+    get_llm = lambda: create_llm(backend="openai", base_url=base_url, api_key="stub")
+    await run(get_llm, min(requests, concurrency), concurrency)  # warm-up
+    return await run(get_llm, requests, concurrency)
+
+
+def start_stub(port: int, delay: float) -> subprocess.Popen:
+    env = dict(os.environ, STUB_OPENAI_DELAY=str(delay))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.stub_openai:app",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=AI_SERVER_DIR, env=env,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).raise_for_status()
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("stub OpenAI server did not start")
+
+
+def report(name: str, result: Dict) -> None:
+    print(
+        f"{name:<12} {result['requests']:>5} {result['errors']:>4} "
+        f"{result['throughput']:>8.1f} "
+        f"{result['mean'] * 1000:>8.1f} {result['p50'] * 1000:>8.1f} "
+        f"{result['p95'] * 1000:>8.1f} {result['p99'] * 1000:>8.1f} "
+        f"{result['fds_before']!s:>6} {result['fds_peak']!s:>6} {result['fds_after']!s:>6}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.05, help="stub response delay (seconds)")
+    parser.add_argument("--port", type=int, default=5998)
+    parser.add_argument("--mode", choices=["both", "shared", "per-request"], default="both")
+    args = parser.parse_args()
+
+    stub = start_stub(args.port, args.delay)
+    base_url = f"http://127.0.0.1:{args.port}/v1"
+    try:
+        print(f"{'mode':<12} {'reqs':>5} {'errs':>4} {'req/s':>8} "
+              f"{'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'fd0':>6} {'fdmax':>6} {'fd1':>6}")
+        # Shared first: the per-request run leaves unclosed clients behind.
+        if args.mode in ("both", "shared"):
+            report("shared", asyncio.run(bench_shared(base_url, args.requests, args.concurrency)))
+            gc.collect()
+        if args.mode in ("both", "per-request"):
+            report("per-request", asyncio.run(bench_per_request(base_url, args.requests, args.concurrency)))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Load test for the chat path.
+
+Drives the ai-server's /chat (or /chat/stream) or the Django chat proxy at a
+fixed concurrency and reports latency percentiles, time to first token and
+throughput. Results are saved as JSON so runs can be compared across commits.
+
+    # ai-server on the offline model (LLM_BACKEND=fake), started by the harness
+    cd ai-server && python -m benchmarks.loadtest --spawn-ai --stream \\
+        --requests 500 --concurrency 50 --output results/ai-stream.json
+
+    # Django proxy (e.g. the asgi service in front of a fake-backed ai-server)
+    python -m benchmarks.loadtest --target django --url http://127.0.0.1:8001 \\
+        --token "$JWT" --stream --compare results/django-stream.json
+
+Time to first token is measured to the first `token` event when streaming;
+for the blocking endpoints it equals the full latency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks import percentile
+
+AI_SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = {
+    ("ai", False): "/chat",
+    ("ai", True): "/chat/stream",
+    ("django", False): "/api/v1/user/chat/",
+    ("django", True): "/api/v1/user/chat/stream/",
+}
+DEFAULT_URLS = {"ai": "http://127.0.0.1:5000", "django": "http://127.0.0.1:8001"}
+
+QUESTIONS = [
+    "How do the QR codes work?",
+    "How do I schedule a property viewing?",
+    "Can I submit a formal offer through the app?",
+    "Is my data secure?",
+    "What happens if I scan a QR code for a property that is no longer available?",
+    "How do agents manage their inventory?",
+    "How do I contact support?",
+    "Does the platform support real-time communication?",
+]
+
+
+class Sample:
+    __slots__ = ("status", "latency", "ttft", "outcome")
+
+    def __init__(self, status: int, latency: float, ttft: Optional[float], outcome: str):
+        self.status = status
+        self.latency = latency
+        self.ttft = ttft
+        self.outcome = outcome  # ok | fallback | error
+
+
+async def send(client: httpx.AsyncClient, path: str, payload: Dict, stream: bool) -> Sample:
+    start = time.perf_counter()
+    if not stream:
+        try:
+            response = await client.post(path, json=payload)
+        except httpx.HTTPError:
+            return Sample(0, time.perf_counter() - start, None, "error")
+        latency = time.perf_counter() - start
+        if response.status_code != 200:
+            return Sample(response.status_code, latency, None, "error")
+        outcome = "fallback" if response.json().get("fallback") else "ok"
+        return Sample(200, latency, latency, outcome)
+
+    ttft, event, outcome, status = None, None, "error", 0
+    try:
+        async with client.stream("POST", path, json=payload) as response:
+            status = response.status_code
+            if status != 200:
+                await response.aread()
+                return Sample(status, time.perf_counter() - start, None, "error")
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[5:])
+                    if event is None and "token" in data and ttft is None:
+                        ttft = time.perf_counter() - start
+                    elif event == "done":
+                        outcome = "fallback" if data.get("fallback") else "ok"
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                    elif event == "error":
+                        outcome = "error"
+                    event = None
+    except httpx.HTTPError:
+        outcome = "error"
+    return Sample(status, time.perf_counter() - start, ttft, outcome)
+
+
+async def run(args) -> Dict:
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    path = PATHS[(args.target, args.stream)]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    samples: List[Sample] = []
+
+    def payload(i: int) -> Dict:
+        return {"message": QUESTIONS[i % len(QUESTIONS)]}
+
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, limits=limits, timeout=args.timeout) as client:
+        await asyncio.gather(*(send(client, path, payload(i), args.stream) for i in range(args.warmup)))
+
+        pending = iter(range(args.requests))  # shared by the workers: fixed concurrency
+
+        async def worker():
+            for i in pending:
+                samples.append(await send(client, path, payload(i), args.stream))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(args, samples, elapsed)
+
+
+def _distribution(values: List[float]) -> Dict[str, float]:
+    return {
+        "mean": round(statistics.mean(values) * 1000, 2) if values else 0.0,
+        "p50": round(percentile(values, 50) * 1000, 2),
+        "p95": round(percentile(values, 95) * 1000, 2),
+        "p99": round(percentile(values, 99) * 1000, 2),
+        "max": round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+
+def summarize(args, samples: List[Sample], elapsed: float) -> Dict:
+    outcomes = Counter(sample.outcome for sample in samples)
+    succeeded = [sample for sample in samples if sample.outcome == "ok"]
+    return {
+        "label": args.label,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "target": args.target,
+        "url": args.url + PATHS[(args.target, args.stream)],
+        "stream": args.stream,
+        "concurrency": args.concurrency,
+        "requests": len(samples),
+        "ok": outcomes["ok"],
+        "fallbacks": outcomes["fallback"],
+        "errors": outcomes["error"],
+        "status_counts": {str(status): count for status, count in Counter(s.status for s in samples).items()},
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(succeeded) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": _distribution([s.latency for s in succeeded]),
+        "ttft_ms": _distribution([s.ttft for s in succeeded if s.ttft is not None]),
+        "fake_llm": args.fake_llm,
+    }
+
+
+def git_label() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=AI_SERVER_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def spawn_ai(args) -> subprocess.Popen:
+    """Start the ai-server on the fake model (FAQ cache off unless --cache)."""
+    env = dict(
+        os.environ,
+        LLM_BACKEND="fake",
+        FAQ_CACHE_ENABLED="true" if args.cache else "false",
+        FAKE_LLM_LATENCY=str(args.fake_latency),
+        FAKE_LLM_TOKENS_PER_SECOND=str(args.fake_rate),
+        FAKE_LLM_REPLY_TOKENS=str(args.fake_tokens),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=AI_SERVER_DIR, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{args.port}/health", timeout=1).raise_for_status()
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("ai-server did not start")
+
+
+def print_result(result: Dict, baseline: Optional[Dict] = None) -> None:
+    print(f"{result['target']} {result['url']}  stream={result['stream']}  "
+          f"concurrency={result['concurrency']}  label={result['label']}")
+    print(f"requests={result['requests']} ok={result['ok']} fallbacks={result['fallbacks']} "
+          f"errors={result['errors']} statuses={result['status_counts']}")
+
+    rows = [("throughput req/s", result["throughput_rps"], baseline and baseline["throughput_rps"])]
+    for group in ("latency_ms", "ttft_ms"):
+        for key in ("p50", "p95", "p99"):
+            rows.append((f"{group[:-3]} {key} ms", result[group][key], baseline and baseline[group][key]))
+    for name, value, base in rows:
+        line = f"  {name:<18} {value:>10.2f}"
+        if base:
+            line += f"   baseline {base:>10.2f}  ({(value - base) / base * 100:+.1f}%)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["ai", "django"], default="ai")
+    parser.add_argument("--url", help="base URL (default: ai http://127.0.0.1:5000, django http://127.0.0.1:8001)")
+    parser.add_argument("--token", default=os.getenv("LOADTEST_TOKEN"), help="JWT for --target django")
+    parser.add_argument("--stream", action="store_true", help="use the SSE endpoints")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--label", default=None, help="run label (default: current git commit)")
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to diff against")
+    spawn = parser.add_argument_group("spawned ai-server (--spawn-ai)")
+    spawn.add_argument("--spawn-ai", action="store_true", help="start the ai-server on the fake LLM backend")
+    spawn.add_argument("--port", type=int, default=5996)
+    spawn.add_argument("--workers", type=int, default=1)
+    spawn.add_argument("--cache", action="store_true", help="keep the FAQ answer cache on")
+    spawn.add_argument("--fake-latency", type=float, default=0.3, help="seconds to first token")
+    spawn.add_argument("--fake-rate", type=float, default=50, help="tokens per second")
+    spawn.add_argument("--fake-tokens", type=int, default=40, help="tokens per reply")
+    args = parser.parse_args()
+
+    if args.spawn_ai and args.target != "ai":
+        parser.error("--spawn-ai only applies to --target ai")
+    if args.target == "django" and not args.token:
+        parser.error("--target django needs --token (or LOADTEST_TOKEN)")
+    args.label = args.label or git_label()
+    args.fake_llm = None
+    process = None
+    if args.spawn_ai:
+        args.url = f"http://127.0.0.1:{args.port}"
+        args.fake_llm = {"latency": args.fake_latency, "tokens_per_second": args.fake_rate,
+                         "reply_tokens": args.fake_tokens, "cache": args.cache, "workers": args.workers}
+        process = spawn_ai(args)
+    args.url = (args.url or DEFAULT_URLS[args.target]).rstrip("/")
+
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_result(result, baseline)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Minimal OpenAI-compatible server for benchmarks: answers POST /v1/chat/completions
+with a canned reply after STUB_OPENAI_DELAY seconds (plain or streamed).
+
+    uvicorn benchmarks.stub_openai:app --port 5998
+"""
+import asyncio
+import json
+import os
+import time
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+DELAY = float(os.getenv("STUB_OPENAI_DELAY", "0.05"))
+REPLY = "Scan2Home lets you book a viewing straight from the property page."
+
+app = FastAPI(title="Stub OpenAI")
+
+
+@app.get("/health")
+def health_check():
+    return {"status": "ok"}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: dict):
+    await asyncio.sleep(DELAY)
+    created = int(time.time())
+    model = body.get("model", "stub")
+
+    if not body.get("stream"):
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": REPLY},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def chunk(delta, finish_reason=None):
+        data = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(data)}\n\n"
+
+    async def events():
+        yield chunk({"role": "assistant", "content": ""})
+        for word in REPLY.split(" "):
+            yield chunk({"content": word + " "})
+        yield chunk({}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
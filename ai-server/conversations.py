@@ -0,0 +1,72 @@
+"""
+Server-side chat history, so callers send only the new message and a
+conversation id instead of the whole transcript on every turn.
+
+Each conversation is a Redis list of JSON messages under
+`chat:conv:<user_id>:<conversation_id>`, capped at CONVERSATION_MAX_MESSAGES
+(older turns are summarised at prompt time anyway, see history.py) and
+expiring CONVERSATION_TTL seconds after the last message. If Redis is down
+the chat still works, just without memory of earlier turns.
+"""
+import json
+import logging
+import os
+import re
+import uuid
+from typing import Dict, List
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+CONVERSATION_TTL = int(os.getenv("CONVERSATION_TTL", "86400"))
+CONVERSATION_MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", "100"))
+
+CONVERSATION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def new_conversation_id() -> str:
+    return str(uuid.uuid4())
+
+
+class ConversationStore:
+    def __init__(self, client: aioredis.Redis, ttl: int = CONVERSATION_TTL, max_messages: int = CONVERSATION_MAX_MESSAGES):
+        self.client = client
+        self.ttl = ttl
+        self.max_messages = max_messages
+
+    @classmethod
+    def from_url(cls, url: str = REDIS_URL) -> "ConversationStore":
+        client = aioredis.Redis.from_url(
+            url, socket_timeout=REDIS_SOCKET_TIMEOUT, socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        )
+        return cls(client)
+
+    @staticmethod
+    def key(user_id: str, conversation_id: str) -> str:
+        return f"chat:conv:{user_id}:{conversation_id}"
+
+    async def load(self, user_id: str, conversation_id: str) -> List[Dict[str, str]]:
+        try:
+            raw = await self.client.lrange(self.key(user_id, conversation_id), -self.max_messages, -1)
+        except RedisError as e:
+            logger.warning(f"Could not load conversation: {str(e)}")
+            return []
+        return [json.loads(item) for item in raw]
+
+    async def append(self, user_id: str, conversation_id: str, *messages: Dict[str, str]) -> None:
+        key = self.key(user_id, conversation_id)
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.rpush(key, *(json.dumps(message) for message in messages))
+                pipe.ltrim(key, -self.max_messages, -1)
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Could not save conversation: {str(e)}")
+
+    async def close(self) -> None:
+        await self.client.aclose()
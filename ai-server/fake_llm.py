@@ -0,0 +1,96 @@
+"""
+Offline stand-in for ChatOpenAI (LLM_BACKEND=fake), for load tests and local
+development without an OpenAI key.
+
+Replies are deterministic for a given last user message. Timing is shaped like
+a real model: FAKE_LLM_LATENCY seconds before the first token, then
+FAKE_LLM_TOKENS_PER_SECOND tokens a second for FAKE_LLM_REPLY_TOKENS tokens
+(one word = one token).
+"""
+import asyncio
+import hashlib
+import os
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+WORDS = (
+    "Scan2Home agents can help with viewings offers QR boards listings and "
+    "inventory reports so please let us know what you need next and we will "
+    "get back to you shortly with the details for this property"
+).split()
+
+
+class FakeChatModel(BaseChatModel):
+    latency: float = float(os.getenv("FAKE_LLM_LATENCY", "0.3"))
+    tokens_per_second: float = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "50"))
+    reply_tokens: int = int(os.getenv("FAKE_LLM_REPLY_TOKENS", "40"))
+
+    @property
+    def _llm_type(self) -> str:
+        return "scan2home-fake"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        question = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        seed = int(hashlib.sha256(str(question).encode("utf-8")).hexdigest()[:8], 16)
+        words = [WORDS[(seed + i * 7) % len(WORDS)] for i in range(max(1, self.reply_tokens))]
+        return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+    def _token_interval(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _result(self, tokens: List[str]) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.latency + len(tokens) * self._token_interval())
+        return self._result(tokens)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency + len(tokens) * self._token_interval())
+        return self._result(tokens)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in self._tokens(messages):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+            time.sleep(self._token_interval())
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for token in self._tokens(messages):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(self._token_interval())
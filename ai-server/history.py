@@ -0,0 +1,222 @@
+"""
+Token-budgeted prompt assembly for the chatbots.
+
+Instead of forwarding the whole `chat_history` and the whole FAQ on every
+turn, `compact()` builds the prompt from:
+  - the FAQ entries most relevant to the current message (local retrieval
+    over the parsed Q/A pairs, see similarity.py);
+  - the last HISTORY_RECENT_TURNS turns, verbatim;
+  - a rolling summary of the turns before that (one clipped line per
+    message, newest kept first), as a system message;
+and keeps the total under PROMPT_TOKEN_BUDGET. Token counts are local
+(tiktoken when its encoding is available, otherwise ~4 characters a token).
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from similarity import Vector, cosine, embed
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+HISTORY_RECENT_TURNS = int(os.getenv("HISTORY_RECENT_TURNS", "3"))
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "300"))
+FAQ_TOP_K = int(os.getenv("FAQ_TOP_K", "3"))
+FAQ_TOKEN_BUDGET = int(os.getenv("FAQ_TOKEN_BUDGET", "800"))
+
+# Chat-format overhead per message, and the fixed wording of the system prompts.
+MESSAGE_OVERHEAD_TOKENS = 4
+PROMPT_TEMPLATE_TOKENS = 60
+SUMMARY_LINE_WORDS = 25
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+FAQ_ENTRY_RE = re.compile(r"^Q:\s*(.+?)\s*\nA:\s*(.+?)\s*(?=^Q:|\Z)", re.M | re.S)
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+# ── Token counting ────────────────────────────────────────────────────────────
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """tiktoken's gpt-4o encoding, loaded once; None if it can't be loaded (e.g. offline)."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = None
+    return _encoding
+
+
+def tokenizer_name() -> str:
+    encoding = _get_encoding()
+    return encoding.name if encoding is not None else "estimate"
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, (len(text) + 3) // 4)
+
+
+def message_tokens(content: str) -> int:
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+# ── FAQ retrieval ─────────────────────────────────────────────────────────────
+@dataclass
+class FAQEntry:
+    text: str
+    vector: Vector
+    tokens: int
+
+
+@lru_cache(maxsize=32)
+def parse_faq(FAQ_context: str) -> Tuple[FAQEntry, ...]:
+    """The `Q: ... / A: ...` pairs of an FAQ text; a single entry if it has no such pairs."""
+    entries = []
+    for question, answer in FAQ_ENTRY_RE.findall(FAQ_context.strip()):
+        text = f"Q: {question}\nA: {answer}"
+        entries.append(FAQEntry(text=text, vector=embed(f"{question} {answer}"), tokens=count_tokens(text)))
+    if not entries and FAQ_context.strip():
+        text = FAQ_context.strip()
+        entries.append(FAQEntry(text=text, vector=embed(text), tokens=count_tokens(text)))
+    return tuple(entries)
+
+
+def select_faq(FAQ_context: str, query: str, top_k: int, budget: int) -> Tuple[str, int, int]:
+    """Returns (FAQ text, entries used, entries available) for the `top_k` entries closest to `query`."""
+    entries = parse_faq(FAQ_context)
+    if len(entries) == 1 and entries[0].tokens > budget:
+        return _clip_tokens(entries[0].text, budget), 1, 1
+
+    vector = embed(query)
+    ranked = sorted(range(len(entries)), key=lambda i: cosine(vector, entries[i].vector), reverse=True)
+    chosen, used = [], 0
+    for i in ranked[:top_k]:
+        if used + entries[i].tokens > budget:
+            continue
+        chosen.append(i)
+        used += entries[i].tokens
+    return "\n\n".join(entries[i].text for i in sorted(chosen)), len(chosen), len(entries)
+
+
+# ── History ───────────────────────────────────────────────────────────────────
+def _clip_words(text: str, words: int) -> str:
+    first = SENTENCE_END_RE.split(" ".join(text.split()), maxsplit=1)[0]
+    parts = first.split(" ")
+    return " ".join(parts[:words]) + ("…" if len(parts) > words else "")
+
+
+def _clip_tokens(text: str, budget: int) -> str:
+    while text and count_tokens(text) > budget:
+        text = text[: int(len(text) * 0.9)]
+    return text
+
+
+def _summary_line(msg: Dict[str, str]) -> str:
+    label = {"user": "User", "assistant": "Assistant"}.get(msg.get("role"), "Note")
+    return f"- {label}: {_clip_words(msg.get('content', ''), SUMMARY_LINE_WORDS)}"
+
+
+def _recent_start(history: List[Dict[str, str]], turns: int) -> int:
+    """Index where the last `turns` turns (each starting at a user message) begin."""
+    seen = 0
+    for i in range(len(history) - 1, -1, -1):
+        if history[i].get("role") == "user":
+            seen += 1
+            if seen == turns:
+                return i
+    return 0
+
+
+@dataclass
+class CompactPrompt:
+    faq: str
+    history: List[Dict[str, str]]
+    stats: Dict = field(default_factory=dict)
+
+
+def compact(
+    FAQ_context: str,
+    chat_history: List[Dict[str, str]],
+    message: str,
+    preamble: str = "",
+    budget: Optional[int] = None,
+) -> CompactPrompt:
+    """
+    Fit FAQ context and history around `message` (and the agent `preamble`,
+    if any) within `budget` tokens. The returned `history` starts with the
+    rolling summary as a system message when older turns were folded.
+    """
+    budget = budget or PROMPT_TOKEN_BUDGET
+    fixed = (
+        PROMPT_TEMPLATE_TOKENS + count_tokens(preamble)
+        + message_tokens(message) + MESSAGE_OVERHEAD_TOKENS  # system message
+    )
+
+    last_user = next((m.get("content", "") for m in reversed(chat_history) if m.get("role") == "user"), "")
+    faq, faq_used, faq_total = select_faq(
+        FAQ_context, f"{message} {last_user}", FAQ_TOP_K, min(FAQ_TOKEN_BUDGET, max(0, budget - fixed))
+    )
+    remaining = budget - fixed - count_tokens(faq)
+
+    # Last N turns verbatim; if even those don't fit, drop from the oldest.
+    start = _recent_start(chat_history, HISTORY_RECENT_TURNS) if HISTORY_RECENT_TURNS > 0 else len(chat_history)
+    recent = chat_history[start:]
+    recent_tokens = [message_tokens(m.get("content", "")) for m in recent]
+    while recent and sum(recent_tokens) > remaining:
+        recent, recent_tokens = recent[1:], recent_tokens[1:]
+        start += 1
+    remaining -= sum(recent_tokens)
+
+    # Everything older goes into the summary, newest lines first, within budget.
+    summary_budget = min(HISTORY_SUMMARY_TOKENS, remaining) - message_tokens(SUMMARY_HEADER)
+    lines, summary_tokens = [], 0
+    for msg in reversed(chat_history[:start]):
+        line = _summary_line(msg)
+        tokens = count_tokens(line) + 1
+        if summary_tokens + tokens > summary_budget:
+            break
+        lines.append(line)
+        summary_tokens += tokens
+    lines.reverse()
+
+    history = list(recent)
+    if lines:
+        history.insert(0, {"role": "system", "content": "\n".join([SUMMARY_HEADER, *lines])})
+
+    prompt_tokens = (
+        fixed + count_tokens(faq) + sum(message_tokens(m["content"]) for m in history)
+    )
+    full_tokens = (
+        PROMPT_TEMPLATE_TOKENS + count_tokens(preamble) + MESSAGE_OVERHEAD_TOKENS
+        + count_tokens(FAQ_context) + message_tokens(message)
+        + sum(message_tokens(m.get("content", "")) for m in chat_history)
+    )
+    return CompactPrompt(
+        faq=faq,
+        history=history,
+        stats={
+            "prompt_tokens": prompt_tokens,
+            "uncompacted_tokens": full_tokens,
+            "budget": budget,
+            "tokenizer": tokenizer_name(),
+            "history_messages": len(chat_history),
+            "history_kept": len(recent),
+            "history_summarized": len(lines),
+            "history_dropped": start - len(lines),
+            "summary_tokens": summary_tokens,
+            "faq_entries": faq_total,
+            "faq_entries_used": faq_used,
+            "faq_tokens": count_tokens(faq),
+        },
+    )
@@ -1,17 +1,68 @@
 """
 Scan2Home AI Server — FastAPI microservice wrapping the LangChain chatbot agent.
 """
+import json
 import os
-from typing import List, Dict, Optional
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from typing import Any, List, Dict, Optional
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from agent import user_chatbot, agent_chatbot
+from agent import (
+    LLM_TIMEOUT, create_llm, set_llm,
+    user_chatbot, agent_chatbot, user_chatbot_stream, agent_chatbot_stream,
+)
+from conversations import CONVERSATION_ID_RE, ConversationStore, new_conversation_id
+from history import compact, tokenizer_name
+from response_cache import ResponseCache
 
-app = FastAPI(title="Scan2Home AI Server", version="1.0.0")
+# ── LLM connection pool (per worker process) ─────────────────────────────────
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_POOL_TIMEOUT = float(os.getenv("LLM_POOL_TIMEOUT", "10"))
+
+# ── FAQ answer cache (per worker process, see response_cache.py) ─────────────
+FAQ_CACHE_ENABLED = os.getenv("FAQ_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+faq_cache = ResponseCache(
+    max_entries=int(os.getenv("FAQ_CACHE_MAX_ENTRIES", "1000")),
+    ttl=float(os.getenv("FAQ_CACHE_TTL", "86400")),
+    threshold=float(os.getenv("FAQ_CACHE_SIMILARITY", "0.9")),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    One ChatOpenAI and one httpx pool for the life of the worker, so requests
+    reuse warm (TLS) connections instead of building a client each time.
+    """
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT, pool=LLM_POOL_TIMEOUT),
+    )
+    set_llm(create_llm(http_client))
+    app.state.conversations = ConversationStore.from_url()
+    tokenizer_name()  # load the tokenizer now rather than on the first request
+    try:
+        yield
+    finally:
+        set_llm(None)
+        await http_client.aclose()
+        await app.state.conversations.close()
+
+
+app = FastAPI(title="Scan2Home AI Server", version="1.0.0", lifespan=lifespan)
 
 # ── Default FAQ Context ──────────────────────────────────────────────────────
 DEFAULT_FAQ = """
@@ -51,7 +102,10 @@ A: You can reach our support team via the in-app support feature or by emailing
 class ChatRequest(BaseModel):
     message: str
     user_id: str = ""
-    chat_history: Optional[List[Dict[str, str]]] = []
+    # Omit to have the history kept server-side (see conversations.py);
+    # a new conversation is started when `conversation_id` is not given.
+    chat_history: Optional[List[Dict[str, str]]] = None
+    conversation_id: Optional[str] = Field(default=None, pattern=CONVERSATION_ID_RE.pattern)
     mode: str = "user"  # "user" or "agent"
     agent_profile: Optional[str] = None
     faq_context: Optional[str] = None
@@ -59,6 +113,49 @@ class ChatRequest(BaseModel):
 
 class ChatResponse(BaseModel):
     reply: str
+    conversation_id: Optional[str] = None
+    cached: bool = False
+    prompt_stats: Optional[Dict[str, Any]] = None
+
+
+class ChatTurn:
+    """Everything a /chat or /chat/stream request needs before calling the LLM."""
+
+    def __init__(self, req: ChatRequest, store: ConversationStore):
+        self.req = req
+        self.store = store
+        self.faq = req.faq_context or DEFAULT_FAQ
+        self.is_agent = bool(req.mode == "agent" and req.agent_profile)
+        # Stateless callers send the transcript; otherwise it lives in the store.
+        self.stateful = req.chat_history is None and bool(req.user_id)
+        self.conversation_id = (req.conversation_id or new_conversation_id()) if self.stateful else None
+        self.history: List[Dict[str, str]] = req.chat_history or []
+
+    async def load(self) -> None:
+        if self.stateful and self.req.conversation_id:
+            self.history = await self.store.load(self.req.user_id, self.conversation_id)
+
+    @property
+    def cacheable(self) -> bool:
+        """
+        FAQ-mode questions that open a conversation; follow-ups depend on the
+        history, so they always go to the LLM.
+        """
+        return FAQ_CACHE_ENABLED and not self.is_agent and not self.history
+
+    def prompt(self):
+        return compact(
+            self.faq, self.history, self.req.message,
+            preamble=self.req.agent_profile if self.is_agent else "",
+        )
+
+    async def remember(self, reply: str) -> None:
+        if self.stateful:
+            await self.store.append(
+                self.req.user_id, self.conversation_id,
+                {"role": "user", "content": self.req.message},
+                {"role": "assistant", "content": reply},
+            )
 
 
 # ── Endpoints ─────────────────────────────────────────────────────────────────
@@ -67,30 +164,112 @@ def health_check():
     return {"status": "ok", "service": "ai-server"}
 
 
+@app.get("/stats/cache")
+def cache_stats():
+    """FAQ answer cache counters and hit rates for this worker process."""
+    return faq_cache.stats()
+
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat(req: ChatRequest):
+async def chat(req: ChatRequest, request: Request):
     """
     Unified chat endpoint.
     - mode="user"  → uses user_chatbot (FAQ-based support)
     - mode="agent" → uses agent_chatbot (custom agent persona)
+    History comes from the conversation store unless `chat_history` is sent,
+    and is compacted to the prompt budget first (see history.py);
+    `prompt_stats` reports the prompt size and what was trimmed.
     """
-    faq = req.faq_context or DEFAULT_FAQ
-    history = req.chat_history or []
+    turn = ChatTurn(req, request.app.state.conversations)
+    await turn.load()
+
+    if turn.cacheable:
+        cached = faq_cache.get(turn.faq, req.message)
+        if cached is not None:
+            await turn.remember(cached)
+            return ChatResponse(reply=cached, conversation_id=turn.conversation_id, cached=True)
 
+    prompt = turn.prompt()
     try:
-        if req.mode == "agent" and req.agent_profile:
+        if turn.is_agent:
             reply = await agent_chatbot(
                 full_profile=req.agent_profile,
-                chat_history=history,
-                FAQ_context=faq,
+                chat_history=prompt.history,
+                FAQ_context=prompt.faq,
                 message=req.message,
             )
         else:
             reply = await user_chatbot(
-                FAQ_context=faq,
-                chat_history=history,
+                FAQ_context=prompt.faq,
+                chat_history=prompt.history,
                 message=req.message,
             )
-        return ChatResponse(reply=reply)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI processing error: {str(e)}")
+
+    if turn.cacheable:
+        faq_cache.set(turn.faq, req.message, reply)
+    await turn.remember(reply)
+    return ChatResponse(reply=reply, conversation_id=turn.conversation_id, prompt_stats=prompt.stats)
+
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    """
+    Streaming variant of /chat (Server-Sent Events).
+    - one `data: {"token": "..."}` event per chunk of the reply
+    - `event: done` with `{"reply": "<full reply>", "conversation_id": ..., "prompt_stats": {...}}` at the end
+    - `event: error` with `{"detail": "..."}` if the LLM call fails midway
+    """
+    turn = ChatTurn(req, request.app.state.conversations)
+    await turn.load()
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    if turn.cacheable:
+        cached = faq_cache.get(turn.faq, req.message)
+        if cached is not None:
+            async def replay():
+                yield _sse({"token": cached})
+                await turn.remember(cached)
+                yield _sse({"reply": cached, "conversation_id": turn.conversation_id, "cached": True}, event="done")
+            return StreamingResponse(replay(), media_type="text/event-stream", headers=headers)
+
+    prompt = turn.prompt()
+    if turn.is_agent:
+        tokens = agent_chatbot_stream(
+            full_profile=req.agent_profile,
+            chat_history=prompt.history,
+            FAQ_context=prompt.faq,
+            message=req.message,
+        )
+    else:
+        tokens = user_chatbot_stream(
+            FAQ_context=prompt.faq,
+            chat_history=prompt.history,
+            message=req.message,
+        )
+
+    async def events():
+        reply = []
+        try:
+            async for token in tokens:
+                reply.append(token)
+                yield _sse({"token": token})
+        except Exception as e:
+            yield _sse({"detail": f"AI processing error: {str(e)}"}, event="error")
+            return
+        reply = "".join(reply)
+        if turn.cacheable:
+            faq_cache.set(turn.faq, req.message, reply)
+        await turn.remember(reply)
+        yield _sse(
+            {"reply": reply, "conversation_id": turn.conversation_id, "prompt_stats": prompt.stats},
+            event="done",
+        )
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
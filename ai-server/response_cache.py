@@ -0,0 +1,112 @@
+"""
+In-process cache for FAQ-mode answers (per worker process).
+
+Two tiers over the same entries:
+  1. exact    — dict lookup on (FAQ hash, normalised message);
+  2. semantic — nearest cached question for the same FAQ by cosine similarity
+                of local embeddings (see similarity.py), above a threshold,
+                among those with the same question words and negation
+                (`intent()`), so "why doesn't X work" never gets "how does X work".
+
+Entries are evicted least-recently-used beyond `max_entries` and expire after
+`ttl` seconds. Hit/miss counters are exposed through `stats()`.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from similarity import Vector, cosine, embed, intent, normalize
+
+Key = Tuple[str, str]
+
+
+@dataclass
+class CacheEntry:
+    question: str
+    reply: str
+    vector: Vector
+    intent: Tuple[FrozenSet[str], bool]
+    expires_at: float
+
+
+def faq_hash(FAQ_context: str) -> str:
+    return hashlib.sha256(FAQ_context.encode("utf-8")).hexdigest()[:16]
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 1000, ttl: float = 86400, threshold: float = 0.9):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries: "OrderedDict[Key, CacheEntry]" = OrderedDict()
+        self.counters: Dict[str, int] = dict.fromkeys(
+            ("lookups", "exact_hits", "semantic_hits", "misses", "stores", "evictions", "expirations"), 0
+        )
+
+    def get(self, FAQ_context: str, message: str) -> Optional[str]:
+        """The cached reply for `message` (or a close paraphrase of it), or None."""
+        self.counters["lookups"] += 1
+        key = (faq_hash(FAQ_context), normalize(message))
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None and self._alive(key, entry, now):
+            self._entries.move_to_end(key)
+            self.counters["exact_hits"] += 1
+            return entry.reply
+
+        vector, question_intent = embed(message), intent(message)
+        best_key, best_score = None, self.threshold
+        for other_key, other in list(self._entries.items()):
+            if other_key[0] != key[0] or not self._alive(other_key, other, now):
+                continue
+            if other.intent != question_intent:
+                continue
+            score = cosine(vector, other.vector)
+            if score >= best_score:
+                best_key, best_score = other_key, score
+        if best_key is None:
+            self.counters["misses"] += 1
+            return None
+
+        self._entries.move_to_end(best_key)
+        self.counters["semantic_hits"] += 1
+        return self._entries[best_key].reply
+
+    def set(self, FAQ_context: str, message: str, reply: str) -> None:
+        key = (faq_hash(FAQ_context), normalize(message))
+        if not key[1] or not reply:
+            return
+        self._entries[key] = CacheEntry(
+            question=message, reply=reply, vector=embed(message), intent=intent(message),
+            expires_at=time.monotonic() + self.ttl,
+        )
+        self._entries.move_to_end(key)
+        self.counters["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.counters["lookups"]
+        hits = self.counters["exact_hits"] + self.counters["semantic_hits"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "exact_hit_rate": round(self.counters["exact_hits"] / lookups, 4) if lookups else 0.0,
+            "semantic_hit_rate": round(self.counters["semantic_hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+    def _alive(self, key: Key, entry: CacheEntry, now: float) -> bool:
+        if entry.expires_at > now:
+            return True
+        del self._entries[key]
+        self.counters["expirations"] += 1
+        return False
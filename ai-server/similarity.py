@@ -0,0 +1,82 @@
+"""
+Local text embeddings for similarity lookups (no model, no external service).
+
+Texts are mapped to sparse, L2-normalised vectors by feature hashing their
+content words and character trigrams, so paraphrases that share most of their
+wording ("how do I book a viewing" / "how can I book a viewing?") score close
+to 1.0 and unrelated questions close to 0.
+
+Question words and negations are kept as features, but a small change in them
+("how do QR codes work" / "why do QR codes not work") still scores high, so
+callers should also compare `intent()` before treating two texts as the same
+question.
+"""
+import math
+import re
+import zlib
+from typing import Dict, FrozenSet, Tuple
+
+Vector = Dict[int, float]
+
+DIMENSIONS = 1 << 18
+WORD_WEIGHT = 2.0
+TRIGRAM_WEIGHT = 1.0
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by can could do does for from i if in is it me my
+of on or our please the there this to was we will with would you your
+""".split())
+QUESTION_WORDS = frozenset("how what when where which who whom whose why".split())
+NEGATIONS = frozenset("""
+no not never nor none nothing cannot cant dont doesnt didnt isnt arent wasnt
+werent wont wouldnt couldnt shouldnt havent hasnt hadnt
+""".split())
+
+
+def normalize(text: str) -> str:
+    """Lower-cased words only: 'How don't QR codes work?!' -> 'how dont qr codes work'."""
+    return " ".join(WORD_RE.findall(text.lower().replace("'", "").replace("\u2019", "")))
+
+
+def intent(text: str) -> Tuple[FrozenSet[str], bool]:
+    """The question words in `text` and whether it is negated; paraphrases must agree on both."""
+    words = normalize(text).split()
+    return frozenset(QUESTION_WORDS.intersection(words)), not NEGATIONS.isdisjoint(words)
+
+
+def _stem(word: str) -> str:
+    """Crude plural folding ('codes' -> 'code'), enough to match paraphrases."""
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _feature(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8")) % DIMENSIONS
+
+
+def embed(text: str) -> Vector:
+    vector: Vector = {}
+    words = normalize(text).split()
+    content = [_stem(word) for word in words if word not in STOPWORDS] or words
+    for word in content:
+        index = _feature(f"w:{word}")
+        vector[index] = vector.get(index, 0.0) + WORD_WEIGHT
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            index = _feature(f"c:{padded[i:i + 3]}")
+            vector[index] = vector.get(index, 0.0) + TRIGRAM_WEIGHT
+
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if norm:
+        for index in vector:
+            vector[index] /= norm
+    return vector
+
+
+def cosine(a: Vector, b: Vector) -> float:
+    """Similarity of two `embed()` vectors (already normalised), in [0, 1]."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(index, 0.0) for index, weight in a.items())
@@ -0,0 +1,77 @@
+"""
+Run from ai-server/: python -m unittest discover -s tests -t .
+
+Uses the Redis at REDIS_URL; skipped when it can't be reached.
+"""
+import asyncio
+import unittest
+import uuid
+
+from redis.exceptions import RedisError
+
+from conversations import REDIS_URL, ConversationStore
+
+
+def turn(i):
+    return {"role": "user", "content": f"message {i}"}
+
+
+class ConversationStoreTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.store = ConversationStore.from_url(REDIS_URL)
+        self.store.max_messages = 4
+        self.addAsyncCleanup(self.store.close)
+        try:
+            await self.store.client.ping()
+        except RedisError as e:
+            self.skipTest(f"Redis unavailable: {str(e)}")
+        self.user_id = uuid.uuid4().hex
+        self.key = ConversationStore.key(self.user_id, "conv")
+        self.addAsyncCleanup(self.forget)
+
+    async def forget(self):
+        await self.store.client.delete(self.key)
+
+    async def test_append_and_load(self):
+        self.assertEqual(await self.store.load(self.user_id, "conv"), [])
+        await self.store.append(self.user_id, "conv", turn(1), {"role": "assistant", "content": "reply"})
+        await self.store.append(self.user_id, "conv", turn(2))
+        self.assertEqual(
+            await self.store.load(self.user_id, "conv"),
+            [turn(1), {"role": "assistant", "content": "reply"}, turn(2)],
+        )
+        # Conversations are per user
+        self.assertEqual(await self.store.load(uuid.uuid4().hex, "conv"), [])
+
+    async def test_only_the_latest_messages_are_kept(self):
+        for i in range(3):
+            await self.store.append(self.user_id, "conv", turn(2 * i), turn(2 * i + 1))
+        self.assertEqual(await self.store.load(self.user_id, "conv"), [turn(i) for i in range(2, 6)])
+        self.assertEqual(await self.store.client.llen(self.key), 4)
+
+    async def test_ttl_is_refreshed_by_each_append(self):
+        self.store.ttl = 60
+        await self.store.append(self.user_id, "conv", turn(1))
+        self.assertTrue(0 < await self.store.client.ttl(self.key) <= 60)
+
+        await self.store.client.expire(self.key, 5)
+        await self.store.append(self.user_id, "conv", turn(2))
+        self.assertGreater(await self.store.client.ttl(self.key), 5)
+
+        self.store.ttl = 1
+        await self.store.append(self.user_id, "conv", turn(3))
+        await asyncio.sleep(1.1)
+        self.assertEqual(await self.store.load(self.user_id, "conv"), [])
+
+
+class ConversationStoreUnavailableTests(unittest.IsolatedAsyncioTestCase):
+    async def test_redis_errors_fail_open(self):
+        store = ConversationStore.from_url("redis://127.0.0.1:1/0")
+        self.addAsyncCleanup(store.close)
+        with self.assertLogs("conversations", "WARNING"):
+            await store.append("user", "conv", turn(1))
+            self.assertEqual(await store.load("user", "conv"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Run from ai-server/: python -m unittest discover -s tests -t ."""
+import unittest
+
+from history import HISTORY_RECENT_TURNS, SUMMARY_HEADER, SUMMARY_LINE_WORDS, compact, count_tokens, message_tokens
+
+FAQ = "\n".join(
+    f"Q: Question {i} about {topic}?\nA: {' '.join([topic] * 40)}."
+    for i, topic in enumerate(["viewings", "offers", "fees", "boards", "mortgages", "parking"])
+)
+
+
+def conversation(turns, words=30):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"Question {i}: " + "word " * words})
+        history.append({"role": "assistant", "content": f"Answer {i}: " + "word " * words})
+    return history
+
+
+class CompactTests(unittest.TestCase):
+    def assertWithinBudget(self, prompt, message, budget):
+        self.assertLessEqual(prompt.stats["prompt_tokens"], budget)
+        # The reported total matches what is actually sent
+        faq_and_history = count_tokens(prompt.faq) + sum(message_tokens(m["content"]) for m in prompt.history)
+        self.assertLessEqual(faq_and_history, budget - message_tokens(message))
+
+    def test_stays_within_budget(self):
+        for budget in (300, 600, 1500, 3000):
+            with self.subTest(budget=budget):
+                prompt = compact(FAQ, conversation(20), "How much are the fees?", budget=budget)
+                self.assertWithinBudget(prompt, "How much are the fees?", budget)
+                self.assertLess(prompt.stats["prompt_tokens"], prompt.stats["uncompacted_tokens"])
+
+    def test_agent_preamble_counts_against_the_budget(self):
+        preamble = "Agent profile: " + "word " * 400
+        without = compact(FAQ, conversation(20), "Hi", budget=1000)
+        prompt = compact(FAQ, conversation(20), "Hi", preamble=preamble, budget=1000)
+        self.assertLessEqual(prompt.stats["prompt_tokens"], 1000)
+        self.assertLess(
+            sum(message_tokens(m["content"]) for m in prompt.history),
+            sum(message_tokens(m["content"]) for m in without.history),
+        )
+
+    def test_keeps_recent_turns_and_summarises_the_rest(self):
+        history = conversation(10)
+        prompt = compact(FAQ, history, "And the fees?", budget=3000)
+
+        summary, *recent = prompt.history
+        self.assertEqual(recent, history[-2 * HISTORY_RECENT_TURNS:])
+        self.assertEqual(summary["role"], "system")
+        self.assertTrue(summary["content"].startswith(SUMMARY_HEADER))
+        # Newest of the older turns are summarised first
+        self.assertIn(f"Answer {9 - HISTORY_RECENT_TURNS}:", summary["content"])
+        stats = prompt.stats
+        self.assertEqual(stats["history_kept"], 2 * HISTORY_RECENT_TURNS)
+        self.assertEqual(stats["history_summarized"] + stats["history_dropped"], len(history) - len(recent))
+
+    def test_short_history_is_kept_verbatim(self):
+        history = conversation(2, words=5)
+        prompt = compact(FAQ, history, "Thanks", budget=3000)
+        self.assertEqual(prompt.history, history)
+        self.assertEqual(prompt.stats["history_summarized"], 0)
+
+    def test_oversized_message(self):
+        history = conversation(4, words=10)
+        history[-1]["content"] = "Listing details. " + "word " * 5000
+        prompt = compact(FAQ, history, "Tell me more", budget=1000)
+
+        self.assertWithinBudget(prompt, "Tell me more", 1000)
+        # It can't be sent verbatim; it's clipped into the summary instead
+        self.assertNotIn(history[-1], prompt.history)
+        summary = prompt.history[0]["content"]
+        self.assertTrue(summary.startswith(SUMMARY_HEADER))
+        self.assertIn("- Assistant: Listing details.", summary)
+        self.assertLessEqual(max(len(line.split()) for line in summary.splitlines()), SUMMARY_LINE_WORDS + 2)
+
+    def test_oversized_faq_is_clipped(self):
+        faq = "word " * 5000
+        prompt = compact(faq, conversation(1), "Hi", budget=1000)
+        self.assertWithinBudget(prompt, "Hi", 1000)
+        self.assertTrue(prompt.faq)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+"""Run from ai-server/: python -m unittest discover -s tests -t ."""
+import unittest
+
+from response_cache import ResponseCache
+from similarity import intent
+
+FAQ = "Q: How do QR codes work? A: Scan the board with your phone camera."
+
+# (cached question, new question): different questions that share most of their wording
+NEAR_MISSES = [
+    ("How do QR codes work?", "Why do QR codes not work?"),
+    ("Can I make an offer online?", "Can I not make an offer online?"),
+    ("Do you charge fees?", "Don't you charge fees?"),
+    ("Where is the office?", "When is the office open?"),
+]
+PARAPHRASES = [
+    ("How do I book a viewing", "how can I book a viewing?"),
+    ("How do QR codes work?", "How does the QR code work"),
+    ("Is the property still available?", "is this property still available"),
+]
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_near_misses_are_not_served_from_cache(self):
+        for cached, asked in NEAR_MISSES:
+            with self.subTest(cached=cached, asked=asked):
+                cache = ResponseCache()
+                cache.set(FAQ, cached, "cached answer")
+                self.assertIsNone(cache.get(FAQ, asked))
+
+    def test_paraphrases_hit(self):
+        for cached, asked in PARAPHRASES:
+            with self.subTest(cached=cached, asked=asked):
+                cache = ResponseCache()
+                cache.set(FAQ, cached, "cached answer")
+                self.assertEqual(cache.get(FAQ, asked), "cached answer")
+
+    def test_other_faq_misses(self):
+        cache = ResponseCache()
+        cache.set(FAQ, "How do QR codes work?", "cached answer")
+        self.assertIsNone(cache.get(FAQ + " Q: Fees? A: None.", "How do QR codes work?"))
+
+    def test_intent(self):
+        self.assertEqual(intent("Why don't QR codes work?"), (frozenset({"why"}), True))
+        self.assertEqual(intent("Is it free"), (frozenset(), False))
+
+
+if __name__ == "__main__":
+    unittest.main()
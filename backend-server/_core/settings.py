@@ -23,6 +23,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -42,6 +43,7 @@ LOCAL_APPS = [
     'apps.notifications',
     'apps.chat',
     'apps.admin_panel',
+    'apps.stats',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -174,18 +176,51 @@ CSRF_TRUSTED_ORIGINS = env.list('CSRF_TRUSTED_ORIGINS', default=[
     'https://scan2home.selimreza.dev',
 ])
 
+# ─── REDIS ───────────────────────────────────────────────────
+REDIS_URL = env('REDIS_URL', default='redis://redis:6379/0')
+# Keep hot paths (QR scans) from hanging when Redis is slow or down
+REDIS_SOCKET_TIMEOUT = env.float('REDIS_SOCKET_TIMEOUT', default=0.5)
+
+# ─── CACHE ───────────────────────────────────────────────────
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'scan2home',
+        'OPTIONS': {
+            'socket_timeout': REDIS_SOCKET_TIMEOUT,
+            'socket_connect_timeout': REDIS_SOCKET_TIMEOUT,
+        },
+    },
+}
+# Board → active property lookups for the public QR redirect.
+# Entries are invalidated on reassignment, so the TTL is only a safety net.
+QR_BOARD_CACHE_TIMEOUT = env.int('QR_BOARD_CACHE_TIMEOUT', default=60 * 60 * 24)
+QR_BOARD_NEGATIVE_CACHE_TIMEOUT = env.int('QR_BOARD_NEGATIVE_CACHE_TIMEOUT', default=60)
+# Scans of one board within this many seconds share a single notification
+SCAN_NOTIFICATION_WINDOW = env.int('SCAN_NOTIFICATION_WINDOW', default=10 * 60)
+# A user's last_active is recorded at most once per this many seconds (see ActivityService)
+LAST_ACTIVE_INTERVAL = env.int('LAST_ACTIVE_INTERVAL', default=60)
+# Admin dashboard payload: fresh for this long, and invalidated by admin actions.
+# With a stale timeout > 0 an outdated payload is served for up to that long
+# while it is recomputed in the background (stale-while-revalidate).
+ADMIN_DASHBOARD_CACHE_TIMEOUT = env.int('ADMIN_DASHBOARD_CACHE_TIMEOUT', default=5 * 60)
+ADMIN_DASHBOARD_STALE_TIMEOUT = env.int('ADMIN_DASHBOARD_STALE_TIMEOUT', default=0)
+# Safety-net TTL for the per-user unread notification counters
+NOTIFICATION_UNREAD_CACHE_TIMEOUT = env.int('NOTIFICATION_UNREAD_CACHE_TIMEOUT', default=60 * 60)
+
 # ─── CHANNELS (WebSocket) ────────────────────────────────────
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
         'CONFIG': {
-            'hosts': [env('REDIS_URL', default='redis://redis:6379/0')],
+            'hosts': [REDIS_URL],
         },
     },
 }
 
 # ─── CELERY ─────────────────────────────────────────────────
-CELERY_BROKER_URL = env('REDIS_URL', default='redis://redis:6379/0')
+CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = CELERY_BROKER_URL
 
 # ─── EMAIL ──────────────────────────────────────────────────
@@ -214,6 +249,22 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # App-specific settings
 FRONTEND_URL = env('FRONTEND_URL', default='https://scan2home.com')
 CHATBOT_SERVICE_URL = env('CHATBOT_SERVICE_URL', default='http://ai-server:5000/chat')
+CHATBOT_STREAM_URL = env('CHATBOT_STREAM_URL', default=CHATBOT_SERVICE_URL.rstrip('/') + '/stream')
+# Async chat proxy (per ASGI worker): ai-server connection pool / concurrency
+# limit, timeouts, and circuit breaker (open after N failures, retry after S seconds)
+CHATBOT_MAX_CONCURRENCY = env.int('CHATBOT_MAX_CONCURRENCY', default=32)
+CHATBOT_TIMEOUT = env.float('CHATBOT_TIMEOUT', default=35)
+CHATBOT_CONNECT_TIMEOUT = env.float('CHATBOT_CONNECT_TIMEOUT', default=3)
+CHATBOT_BREAKER_THRESHOLD = env.int('CHATBOT_BREAKER_THRESHOLD', default=5)
+CHATBOT_BREAKER_RESET = env.float('CHATBOT_BREAKER_RESET', default=30)
+# Admission control: calls waiting for a slot per worker (and how long), then
+# per user across workers: requests in flight, and a token bucket of N at once
+# refilled at M a minute. Rejections are 429 with Retry-After.
+CHATBOT_MAX_QUEUE = env.int('CHATBOT_MAX_QUEUE', default=64)
+CHATBOT_QUEUE_TIMEOUT = env.float('CHATBOT_QUEUE_TIMEOUT', default=5)
+CHAT_USER_MAX_IN_FLIGHT = env.int('CHAT_USER_MAX_IN_FLIGHT', default=2)
+CHAT_USER_RATE_BURST = env.int('CHAT_USER_RATE_BURST', default=10)
+CHAT_USER_RATE_PER_MINUTE = env.float('CHAT_USER_RATE_PER_MINUTE', default=10)
 OTP_EXPIRY_MINUTES = 10
 
 # ─── WHITENOISE STATIC ──────────────────────────────────────
@@ -234,25 +285,34 @@ import os
 LOG_DIR = BASE_DIR / 'logs'
 os.makedirs(LOG_DIR, exist_ok=True)
 
+# Records of the `request` logger waiting for its writer thread; beyond this
+# they are dropped (see BACKGROUND_LOGGERS below)
+REQUEST_LOG_QUEUE_SIZE = env.int('REQUEST_LOG_QUEUE_SIZE', default=10000)
+# Fraction of requests logged per route name (default 1); 5xx and slow requests are always logged
+REQUEST_LOG_SAMPLE_RATES = {
+    'qr-scan-redirect': env.float('REQUEST_LOG_QR_REDIRECT_SAMPLE_RATE', default=0.1),
+}
+REQUEST_LOG_SLOW_MS = env.int('REQUEST_LOG_SLOW_MS', default=1000)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
-        'request_fmt': {
-            'format': '%(message)s',
+        'json': {
+            '()': 'apps.common.logging.JSONFormatter',
         },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
-            'formatter': 'request_fmt',
+            'formatter': 'json',
         },
         'request_file': {
             'class': 'logging.handlers.RotatingFileHandler',
             'filename': LOG_DIR / 'requests.log',
             'maxBytes': 10 * 1024 * 1024,  # 10 MB
             'backupCount': 5,
-            'formatter': 'request_fmt',
+            'formatter': 'json',
         },
         'file': {
             'level': 'ERROR',
@@ -263,6 +323,7 @@ LOGGING = {
         },
     },
     'loggers': {
+        # Written by a background thread, see BACKGROUND_LOGGERS
         'request': {
             'handlers': ['console', 'request_file'],
             'level': 'INFO',
@@ -275,3 +336,13 @@ LOGGING = {
         },
     },
 }
+
+# Loggers whose handlers run on a background thread, with the size of their
+# queue. Once LOGGING is applied, apps.common.logging.start_background_logging()
+# (called from AccountsConfig.ready()) swaps each logger's handlers above for a
+# BackgroundHandler: the request thread only enqueues the record, and a
+# QueueListener thread per process formats and writes it to those handlers.
+# Records that arrive while the queue is full are dropped, not waited on.
+BACKGROUND_LOGGERS = {
+    'request': REQUEST_LOG_QUEUE_SIZE,
+}
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.accounts"
+
+    def ready(self):
+        from apps.common.logging import start_background_logging
+
+        # Request logs (RequestLoggingMiddleware) are formatted and written off
+        # the request thread; see BACKGROUND_LOGGERS in settings
+        start_background_logging()
@@ -0,0 +1,36 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.accounts.services import ActivityService
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Writes buffered last_active timestamps from Redis to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Seconds between flushes; 0 flushes once and exits',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            try:
+                users = ActivityService.flush()
+                if users:
+                    self.stdout.write(f'Flushed last_active for {users} users')
+            except Exception:
+                if not interval:
+                    raise
+                logger.exception('last_active flush failed; retrying next interval')
+
+            if not interval:
+                break
+            time.sleep(interval)
+            close_old_connections()
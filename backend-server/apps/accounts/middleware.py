@@ -1,42 +1,106 @@
-import time
 import logging
-from django.utils import timezone
+import random
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
 
 logger = logging.getLogger('request')
 
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# [count, seconds] for the request being handled; the context is carried into
+# sync_to_async threads, so async views' queries are counted too
+_query_stats = ContextVar('request_query_stats', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.monotonic()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.monotonic() - start
+
 
 class UpdateLastActiveMiddleware(MiddlewareMixin):
-    def process_request(self, request):
-        if request.user.is_authenticated:
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            User.objects.filter(pk=request.user.pk).update(last_active=timezone.now())
-        return None
+    """
+    Records activity through ActivityService (throttled, written back in bulk).
+    Runs on the way out so JWT users, who DRF only authenticates inside the
+    view, are seen as well as session users.
+    """
+
+    def process_response(self, request, response):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            from .services import ActivityService
+            ActivityService.touch(user.pk)
+        return response
 
 
 class RequestLoggingMiddleware(MiddlewareMixin):
-    """Logs every request with: timestamp | method | path | user | status | duration."""
+    """
+    One structured log record per request: request id, route name, user id,
+    status, DB query count and time, and duration (monotonic). The `request`
+    logger goes through a queue (apps.common.logging.BackgroundHandler), so
+    formatting and file writes happen off the request thread.
+
+    Routes listed in REQUEST_LOG_SAMPLE_RATES are logged at that rate; server
+    errors and requests slower than REQUEST_LOG_SLOW_MS always are.
+    """
 
     def process_request(self, request):
-        request._req_start = time.time()
+        request._req_start = time.monotonic()
+        request.request_id = self._request_id(request)
+        request._query_stats = [0, 0.0]
+        _query_stats.set(request._query_stats)
+        for conn in connections.all():
+            if _record_query not in conn.execute_wrappers:
+                conn.execute_wrappers.append(_record_query)
 
     def process_response(self, request, response):
-        duration_ms = 0
-        if hasattr(request, '_req_start'):
-            duration_ms = int((time.time() - request._req_start) * 1000)
-
-        user = 'anonymous'
-        if hasattr(request, 'user') and request.user.is_authenticated:
-            user = request.user.email or str(request.user)
-
-        logger.info(
-            '%s | %s %s | %s | %s | %dms',
-            timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
-            request.method,
-            request.get_full_path(),
-            user,
-            response.status_code,
-            duration_ms,
-        )
+        _query_stats.set(None)
+        if not hasattr(request, '_req_start'):
+            return response
+        duration_ms = (time.monotonic() - request._req_start) * 1000
+        response.headers.setdefault('X-Request-ID', request.request_id)
+
+        match = getattr(request, 'resolver_match', None)
+        route = (match.view_name or match.route) if match else None
+        if not self._sampled(route, response.status_code, duration_ms):
+            return response
+
+        user = getattr(request, 'user', None)
+        queries, query_time = request._query_stats
+        logger.info('request', extra={
+            'request_id': request.request_id,
+            'method': request.method,
+            'route': route,
+            'user_id': str(user.pk) if user is not None and user.is_authenticated else None,
+            'status': response.status_code,
+            'db_queries': queries,
+            'db_ms': round(query_time * 1000, 2),
+            'duration_ms': round(duration_ms, 2),
+        })
         return response
+
+    @staticmethod
+    def _request_id(request):
+        # Keep an id set by the proxy so its logs and ours can be joined
+        incoming = request.headers.get('X-Request-ID', '')
+        if REQUEST_ID_RE.match(incoming):
+            return incoming
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def _sampled(route, status, duration_ms):
+        if status >= 500 or duration_ms >= settings.REQUEST_LOG_SLOW_MS:
+            return True
+        rate = settings.REQUEST_LOG_SAMPLE_RATES.get(route, 1.0)
+        return rate >= 1 or random.random() < rate
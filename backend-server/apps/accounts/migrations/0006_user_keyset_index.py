@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0005_alter_otpverification_otp_code"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(
+                fields=["role", "member_since", "id"], name="user_role_joined_idx"
+            ),
+        ),
+    ]
@@ -1,7 +1,8 @@
 import uuid
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
-from django.db.models import Avg
+from django.db.models import Avg, Count, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
@@ -23,6 +24,20 @@ class CustomUserManager(BaseUserManager):
         extra_fields.setdefault('is_superuser', True)
         return self.create_user(email, password, **extra_fields)
 
+    def with_profile_stats(self):
+        """
+        Annotate the agent totals UserProfileSerializer shows (listings and
+        their views) as correlated subqueries, so a page of users is fetched
+        in a single statement.
+        """
+        from apps.properties.models import Property
+
+        properties = Property.objects.filter(agent=models.OuterRef('pk')).order_by().values('agent')
+        return self.get_queryset().select_related('agent_profile').annotate(
+            profile_properties_count=Coalesce(Subquery(properties.annotate(n=Count('pk')).values('n')), 0),
+            profile_views_count=Coalesce(Subquery(properties.annotate(n=Sum('views_count')).values('n')), 0),
+        )
+
 
 class CustomUser(AbstractBaseUser, PermissionsMixin):
     class Role(models.TextChoices):
@@ -53,6 +68,8 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         indexes = [
             models.Index(fields=['email']),
             models.Index(fields=['role']),
+            # Keyset pagination of the admin user / agent lists
+            models.Index(fields=['role', 'member_since', 'id'], name='user_role_joined_idx'),
         ]
 
     def __str__(self):
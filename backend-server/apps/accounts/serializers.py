@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.utils.timesince import timesince
-from django.db.models import Sum
+from django.db.models import QuerySet, Sum
 from drf_spectacular.utils import extend_schema_field, OpenApiTypes
 from .models import AgentProfile, AgentReview
+from .services import ActivityService
 
 User = get_user_model()
 
@@ -68,6 +69,24 @@ class UserProfileSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id', 'email', 'role', 'member_since', 'last_active')
 
+    def to_representation(self, instance):
+        # last_active is written back in batches; include what hasn't been flushed yet
+        pending = self._pending_last_active(instance)
+        if pending and (instance.last_active is None or pending > instance.last_active):
+            instance.last_active = pending
+        return super().to_representation(instance)
+
+    def _pending_last_active(self, obj):
+        # One Redis round-trip per list rather than per user
+        pending = self.context.setdefault('pending_last_active', {})
+        if obj.pk not in pending:
+            batch = [obj.pk]
+            if isinstance(self.parent, serializers.ListSerializer) and isinstance(self.parent.instance, (list, QuerySet)):
+                batch = [user.pk for user in self.parent.instance]
+            pending.update(dict.fromkeys(batch))
+            pending.update(ActivityService.pending(batch))
+        return pending.get(obj.pk)
+
     @extend_schema_field(OpenApiTypes.STR)
     def get_last_active_human(self, obj):
         if not obj.last_active:
@@ -82,16 +101,23 @@ class UserProfileSerializer(serializers.ModelSerializer):
             return "inactive"
         return "active"
 
+    # The totals below come from User.objects.with_profile_stats() when the
+    # queryset was annotated, and are queried per user otherwise.
+
     @extend_schema_field(OpenApiTypes.INT)
     def get_total_properties_count(self, obj):
         if obj.role != 'agent':
             return 0
+        if hasattr(obj, 'profile_properties_count'):
+            return obj.profile_properties_count
         return obj.properties.count()
 
     @extend_schema_field(OpenApiTypes.INT)
     def get_total_views_count(self, obj):
         if obj.role != 'agent':
             return 0
+        if hasattr(obj, 'profile_views_count'):
+            return obj.profile_views_count
         return obj.properties.aggregate(Sum('views_count'))['views_count__sum'] or 0
 
 
@@ -1,11 +1,19 @@
+import logging
 import random
 import string
+import time
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+import redis
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
+from django.db import connection, transaction
+from apps.common.redis import claim, get_redis
 from .models import OTPVerification
 
+logger = logging.getLogger(__name__)
+
 OTP_EXPIRY = getattr(settings, 'OTP_EXPIRY_MINUTES', 10)
 
 
@@ -52,3 +60,97 @@ class AuthService:
                 otp.save()
             return True
         return False
+
+
+class ActivityService:
+    """
+    Write-behind `last_active` tracking.
+
+    `touch()` runs on every authenticated request but records a user at most
+    once per LAST_ACTIVE_INTERVAL per process, as an HSET of the request time
+    into a Redis hash. `flush()` (run by `manage.py flush_last_active`) writes
+    the whole hash back with one `UPDATE ... FROM (VALUES ...)` per batch, so
+    the users table sees one write per active user per flush instead of one
+    per request. Unflushed values are visible through `pending()`.
+    """
+    PENDING_KEY = 'accounts:last_active'
+    FLUSH_BATCH_SIZE = 1000
+    # Per-process throttle; cleared rather than pruned when it gets large
+    MAX_TRACKED = 10000
+    _recorded = {}
+
+    @staticmethod
+    def touch(user_id):
+        """Record activity for `user_id`. Returns False if it was throttled."""
+        key = str(user_id)
+        now = time.monotonic()
+        last = ActivityService._recorded.get(key)
+        if last is not None and now - last < settings.LAST_ACTIVE_INTERVAL:
+            return False
+        if len(ActivityService._recorded) >= ActivityService.MAX_TRACKED:
+            ActivityService._recorded.clear()
+        ActivityService._recorded[key] = now
+
+        try:
+            get_redis().hset(ActivityService.PENDING_KEY, key, time.time())
+        except redis.RedisError as e:
+            logger.warning(f"Activity buffer unavailable, writing through: {str(e)}")
+            get_user_model().objects.filter(pk=user_id).update(last_active=timezone.now())
+        return True
+
+    @staticmethod
+    def pending(user_ids):
+        """{user_id: datetime} of activity recorded but not yet flushed (None if there is none)."""
+        keys = [str(user_id) for user_id in user_ids]
+        if not keys:
+            return {}
+        try:
+            client = get_redis()
+            pipe = client.pipeline(transaction=False)
+            pipe.hmget(ActivityService.PENDING_KEY, keys)
+            pipe.hmget(f'{ActivityService.PENDING_KEY}:flushing', keys)
+            live, flushing = pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Pending activity lookup failed: {str(e)}")
+            return {}
+        result = {}
+        for user_id, a, b in zip(user_ids, live, flushing):
+            stamps = [float(ts) for ts in (a, b) if ts is not None]
+            result[user_id] = datetime.fromtimestamp(max(stamps), tz=dt_timezone.utc) if stamps else None
+        return result
+
+    @staticmethod
+    def flush():
+        """Write buffered activity to the database. Returns the number of users updated."""
+        client = get_redis()
+        key = claim(client, ActivityService.PENDING_KEY)
+        if not key:
+            return 0
+        pending = client.hgetall(key)
+
+        rows = [
+            (user_id, datetime.fromtimestamp(float(ts), tz=dt_timezone.utc))
+            for user_id, ts in pending.items()
+        ]
+        updated = 0
+        with transaction.atomic():
+            for i in range(0, len(rows), ActivityService.FLUSH_BATCH_SIZE):
+                updated += ActivityService._update(rows[i:i + ActivityService.FLUSH_BATCH_SIZE])
+        client.delete(key)
+        return updated
+
+    @staticmethod
+    def _update(rows):
+        User = get_user_model()
+        pk = User._meta.pk
+        quote = connection.ops.quote_name
+        values = ', '.join([f'(%s::{pk.db_type(connection)}, %s::timestamptz)'] * len(rows))
+        # Never move last_active backwards (e.g. past a write-through while Redis was down)
+        sql = (
+            f'UPDATE {quote(User._meta.db_table)} AS u SET last_active = v.ts '
+            f'FROM (VALUES {values}) AS v(id, ts) '
+            f'WHERE u.{quote(pk.column)} = v.id AND (u.last_active IS NULL OR u.last_active < v.ts)'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [param for row in rows for param in row])
+            return cursor.rowcount
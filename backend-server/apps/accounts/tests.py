@@ -1,3 +1,150 @@
-from django.test import TestCase
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import redis
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.common.redis import get_redis
+
+from .middleware import RequestLoggingMiddleware
+from .services import ActivityService
+
+User = get_user_model()
+
+
+def clear_activity():
+    ActivityService._recorded.clear()
+    get_redis().delete(ActivityService.PENDING_KEY, f'{ActivityService.PENDING_KEY}:flushing')
+
+
+@override_settings(LAST_ACTIVE_INTERVAL=60)
+class ActivityServiceTests(TestCase):
+    def setUp(self):
+        clear_activity()
+        self.addCleanup(clear_activity)
+        self.alice = User.objects.create_user('alice@example.com', full_name='Alice')
+        self.bob = User.objects.create_user('bob@example.com', full_name='Bob')
+
+    def last_active(self, user):
+        user.refresh_from_db(fields=['last_active'])
+        return user.last_active
+
+    def test_touch_is_throttled_per_interval(self):
+        start = time.monotonic()
+        with mock.patch('apps.accounts.services.time.monotonic', return_value=start):
+            self.assertTrue(ActivityService.touch(self.alice.pk))
+            self.assertFalse(ActivityService.touch(self.alice.pk))
+            self.assertTrue(ActivityService.touch(self.bob.pk))
+        with mock.patch('apps.accounts.services.time.monotonic', return_value=start + 59):
+            self.assertFalse(ActivityService.touch(self.alice.pk))
+        with mock.patch('apps.accounts.services.time.monotonic', return_value=start + 60):
+            self.assertTrue(ActivityService.touch(self.alice.pk))
+        self.assertEqual(get_redis().hlen(ActivityService.PENDING_KEY), 2)
+
+    def test_flush_persists_pending_activity(self):
+        before = timezone.now()
+        with self.assertNumQueries(0):
+            ActivityService.touch(self.alice.pk)
+        pending = ActivityService.pending([self.alice.pk, self.bob.pk])
+        self.assertGreaterEqual(pending[self.alice.pk], before - timedelta(seconds=1))
+        self.assertIsNone(pending[self.bob.pk])
+        self.assertIsNone(self.last_active(self.alice))
+
+        self.assertEqual(ActivityService.flush(), 1)
+        self.assertEqual(self.last_active(self.alice), pending[self.alice.pk])
+        self.assertIsNone(self.last_active(self.bob))
+
+        # Nothing left pending, and nothing more to flush
+        self.assertEqual(ActivityService.pending([self.alice.pk]), {self.alice.pk: None})
+        self.assertFalse(get_redis().exists(ActivityService.PENDING_KEY, f'{ActivityService.PENDING_KEY}:flushing'))
+        self.assertEqual(ActivityService.flush(), 0)
+
+    def test_flush_never_moves_last_active_back(self):
+        ActivityService.touch(self.alice.pk)
+        later = timezone.now() + timedelta(minutes=5)
+        User.objects.filter(pk=self.alice.pk).update(last_active=later)
+        self.assertEqual(ActivityService.flush(), 0)
+        self.assertEqual(self.last_active(self.alice), later)
+
+    def test_flush_in_batches(self):
+        ActivityService.touch(self.alice.pk)
+        ActivityService.touch(self.bob.pk)
+        with mock.patch.object(ActivityService, 'FLUSH_BATCH_SIZE', 1), \
+                mock.patch.object(ActivityService, '_update', wraps=ActivityService._update) as update:
+            self.assertEqual(ActivityService.flush(), 2)
+        self.assertEqual(update.call_count, 2)
+        self.assertIsNotNone(self.last_active(self.bob))
+
+    def test_writes_through_when_redis_is_down(self):
+        with mock.patch.object(redis.Redis, 'hset', side_effect=redis.ConnectionError('down')):
+            with self.assertLogs('apps.accounts.services', 'WARNING'):
+                self.assertTrue(ActivityService.touch(self.alice.pk))
+        self.assertIsNotNone(self.last_active(self.alice))
+
+
+@override_settings(REQUEST_LOG_SAMPLE_RATES={'qr-scan-redirect': 0.1}, REQUEST_LOG_SLOW_MS=1000)
+class RequestLoggingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.scan_url = f'/scan/{uuid.uuid4()}/'
+
+    def get(self, url, roll):
+        with mock.patch('apps.accounts.middleware.random.random', return_value=roll):
+            return APIClient().get(url, HTTP_X_REQUEST_ID='req-1')
+
+    def respond(self, status):
+        def get_response(request):
+            request.resolver_match = resolve(self.scan_url)
+            return HttpResponse(status=status)
+        with mock.patch('apps.accounts.middleware.random.random', return_value=0.99):
+            return RequestLoggingMiddleware(get_response)(RequestFactory().get(self.scan_url))
+
+    def test_routes_are_sampled_at_their_rate(self):
+        with self.assertLogs('request', 'INFO') as logs:
+            response = self.get(self.scan_url, roll=0.05)
+        [record] = logs.records
+        self.assertEqual(record.route, 'qr-scan-redirect')
+        self.assertEqual(response['X-Request-ID'], 'req-1')
+
+        with self.assertNoLogs('request'):
+            response = self.get(self.scan_url, roll=0.1)
+        self.assertEqual(response['X-Request-ID'], 'req-1')
+
+        # Routes without a rate are always logged
+        with self.assertLogs('request', 'INFO'):
+            self.get('/api/v1/user/notifications/unread-count/', roll=0.99)
+
+    def test_errors_and_slow_requests_are_always_logged(self):
+        with self.assertLogs('request', 'INFO') as logs:
+            self.respond(500)
+        self.assertEqual((logs.records[0].route, logs.records[0].status), ('qr-scan-redirect', 500))
+
+        with self.assertNoLogs('request'):
+            self.respond(200)
+        with override_settings(REQUEST_LOG_SLOW_MS=0), self.assertLogs('request', 'INFO'):
+            self.respond(200)
+
+    def test_record_fields(self):
+        user = User.objects.create_user('alice@example.com', full_name='Alice')
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.assertLogs('request', 'INFO') as logs:
+            client.get('/api/v1/user/notifications/', HTTP_X_REQUEST_ID='bad id!')
+        record = logs.records[0]
+        self.assertEqual(
+            (record.method, record.route, record.user_id, record.status),
+            ('GET', 'notification-list', str(user.pk), 200),
+        )
+        # An unusable incoming id is replaced
+        self.assertRegex(record.request_id, r'^[0-9a-f]{32}$')
+        self.assertGreater(record.db_queries, 0)
+        self.assertGreaterEqual(record.duration_ms, record.db_ms)
@@ -16,6 +16,7 @@ from .serializers import (
 )
 from .models import AgentProfile, AgentReview
 from .services import AuthService
+from apps.admin_panel.services import DashboardService
 from apps.common.doc_examples import (
     BUYER_REGISTER_REQUEST, AGENT_REGISTER_REQUEST, LOGIN_REQUEST, LOGIN_RESPONSE
 )
@@ -50,6 +51,7 @@ class BuyerRegisterView(APIView):
         serializer = BuyerRegisterSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
+        DashboardService.invalidate()
         return Response(get_tokens_for_user(user), status=status.HTTP_201_CREATED)
 
 
@@ -66,6 +68,7 @@ class AgentRegisterView(APIView):
         serializer = AgentRegisterSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
+        DashboardService.invalidate()
         return Response(get_tokens_for_user(user), status=status.HTTP_201_CREATED)
 
 
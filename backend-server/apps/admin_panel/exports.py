@@ -0,0 +1,159 @@
+"""
+Streaming exports of admin data (`/api/v1/admin/export/<entity>/`).
+
+Rows are read as plain tuples through a server-side cursor
+(`.iterator(chunk_size=...)`) and written out by generators, so memory stays
+flat whatever the table size. The CSV header is yielded before the query
+runs, so the first byte goes out straight away.
+"""
+import csv
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .filters import filter_properties, filter_users
+
+CHUNK_SIZE = 2000          # rows fetched per server-side cursor round trip
+BUFFER_SIZE = 64 * 1024    # bytes of output gathered before each write
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+# ── Entities ──────────────────────────────────────────────────
+# Each returns ({column: lookup}, queryset) for the request's filters.
+
+def export_properties(params):
+    from apps.properties.models import Property
+
+    columns = {
+        'id': 'id', 'title': 'title', 'property_type': 'property_type', 'status': 'status',
+        'is_approved': 'is_approved', 'price': 'price', 'address': 'address', 'postcode': 'postcode',
+        'beds': 'beds', 'baths': 'baths', 'size_sqft': 'size_sqft',
+        'agent_id': 'agent_id', 'agent_email': 'agent__email',
+        'views_count': 'views_count', 'qr_scanned_count': 'qr_scanned_count', 'offer_count': 'offer_count',
+        'created_at': 'created_at',
+    }
+    qs = filter_properties(Property.objects.with_offer_count(), params)
+    ordering = ('-search_rank', '-id') if 'search_rank' in qs.query.annotations else ('-created_at', '-id')
+    return columns, qs.order_by(*ordering)
+
+
+def export_users(params):
+    """`?role=buyer|agent|admin` narrows the export; agents also take the agent list's filters."""
+    columns = {
+        'id': 'id', 'email': 'email', 'full_name': 'full_name', 'phone': 'phone', 'role': 'role',
+        'is_active': 'is_active', 'is_banned': 'is_banned',
+        'brand_name': 'agent_profile__brand_name', 'is_verified': 'agent_profile__is_verified',
+        'member_since': 'member_since', 'last_active': 'last_active',
+    }
+    qs = get_user_model().objects.all()
+    role = params.get('role')
+    if role and role != 'all':
+        qs = qs.filter(role=role)
+    qs = filter_users(qs, params, agents=role == 'agent')
+    return columns, qs.order_by('-member_since', '-id')
+
+
+def export_offers(params):
+    from apps.offers.models import Offer
+
+    columns = {
+        'id': 'id', 'property_id': 'property_id', 'property_title': 'property__title',
+        'agent_id': 'property__agent_id', 'buyer_id': 'buyer_id', 'buyer_name': 'buyer_name',
+        'email': 'email', 'phone': 'phone', 'offer_amount': 'offer_amount', 'status': 'status',
+        'is_lead': 'is_lead', 'created_at': 'created_at',
+    }
+    return columns, _filter_status(Offer.objects.all(), params).order_by('-created_at', '-id')
+
+
+def export_bookings(params):
+    from apps.bookings.models import Booking
+
+    columns = {
+        'id': 'id', 'property_id': 'property_id', 'property_title': 'property__title',
+        'agent_id': 'property__agent_id', 'buyer_id': 'buyer_id', 'buyer_name': 'buyer__full_name',
+        'buyer_email': 'buyer__email', 'date': 'date', 'time_slot': 'time_slot', 'status': 'status',
+        'created_at': 'created_at',
+    }
+    return columns, _filter_status(Booking.objects.all(), params).order_by('-created_at', '-id')
+
+
+def _filter_status(qs, params):
+    status_filter = params.get('status')
+    if status_filter and status_filter != 'all':
+        qs = qs.filter(status=status_filter)
+    return qs
+
+
+EXPORTS = {
+    'properties': export_properties,
+    'users': export_users,
+    'offers': export_offers,
+    'bookings': export_bookings,
+}
+
+
+# ── Writers ───────────────────────────────────────────────────
+
+class _Echo:
+    """File-like object whose write() hands back the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+# Leading characters that make spreadsheets treat a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # User-entered text (names, titles, addresses) must not run as a formula
+        return f"'{value}"
+    return value
+
+
+def csv_lines(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def ndjson_lines(headers, rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(headers, row))) + '\n'
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Join small lines into ~`size` byte writes; the first line goes out on its own."""
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    yield first.encode('utf-8')
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def stream_export(columns, queryset, file_format):
+    """The encoded output of `queryset` as `file_format` (see FORMATS), as a generator."""
+    headers = list(columns)
+    rows = queryset.values_list(*columns.values()).iterator(chunk_size=CHUNK_SIZE)
+    if file_format == 'csv':
+        return buffered(csv_lines(headers, rows))
+    return buffered(ndjson_lines(headers, rows))
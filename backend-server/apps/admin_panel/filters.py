@@ -0,0 +1,52 @@
+from django.db.models import Q
+
+
+def filter_properties(qs, params):
+    """Query-string filters of the admin property list (shared with its export)."""
+    # Approval status (all / approved / pending)
+    active_status = params.get('approval_status') or params.get('status')
+    if active_status and active_status != 'all':
+        if active_status == 'approved':
+            qs = qs.filter(is_approved=True)
+        elif active_status == 'pending':
+            qs = qs.filter(is_approved=False)
+
+    # Property types (comma separated string "house,apartment")
+    type_filter = params.get('type')
+    property_types = params.get('property_types')
+    if property_types:
+        types_list = [t.strip().lower() for t in property_types.split(',') if t.strip()]
+        if types_list:
+            qs = qs.filter(property_type__in=types_list)
+    elif type_filter:
+        qs = qs.filter(property_type=type_filter)
+
+    search = params.get('search', '').strip()
+    if search:
+        from apps.properties.search import search_properties
+        qs = search_properties(qs, search)
+    return qs
+
+
+def filter_users(qs, params, agents=False):
+    """Query-string filters of the admin user and agent lists (shared with their export)."""
+    search = params.get('search')
+    if search:
+        condition = Q(full_name__icontains=search) | Q(email__icontains=search)
+        if agents:
+            condition |= Q(agent_profile__brand_name__icontains=search)
+        qs = qs.filter(condition)
+
+    if agents:
+        verified_only = params.get('verified_only') or params.get('verify_list')
+        if verified_only == 'true':
+            qs = qs.filter(agent_profile__is_verified=True)
+
+    account_status_filter = params.get('account_status')
+    if account_status_filter == 'active':
+        qs = qs.filter(is_active=True, is_banned=False)
+    elif account_status_filter == 'inactive':
+        qs = qs.filter(is_active=False)
+    elif account_status_filter == 'suspend':
+        qs = qs.filter(is_banned=True)
+    return qs
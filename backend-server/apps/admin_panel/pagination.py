@@ -0,0 +1,23 @@
+from apps.common.pagination import KeysetPagination
+from apps.properties.pagination import PropertyCursorPagination
+
+
+class AdminUserCursorPagination(KeysetPagination):
+    """Cursor pagination for the admin user and agent lists (`?ordering=` picks the sort)."""
+    orderings = {
+        'newest': ('-member_since', '-id'),
+        'oldest': ('member_since', 'id'),
+    }
+    default_ordering = 'newest'
+
+
+class AdminPropertyCursorPagination(PropertyCursorPagination):
+    """
+    Property listing orderings plus sorting by offers received; needs the
+    `offer_count` annotation from `Property.objects.with_admin_projection()`.
+    """
+    orderings = {
+        **PropertyCursorPagination.orderings,
+        'offers_desc': ('-offer_count', '-id'),
+        'offers_asc': ('offer_count', 'id'),
+    }
@@ -0,0 +1,159 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, transaction
+
+from apps.properties.models import Property, SupportMessage
+from apps.stats.services import StatsService
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class DashboardService:
+    """
+    The admin dashboard payload, built from the maintained counters
+    (StatsService) plus a few "latest" lists, and cached for every admin.
+
+    Admin actions that change the numbers (property approve/reject, bans,
+    agent verification, registrations, new or deleted listings) call
+    `invalidate()`. With ADMIN_DASHBOARD_STALE_TIMEOUT > 0 an invalidated or
+    expired payload keeps being served for up to that long while a single
+    background thread recomputes it, so a page load is one cache read. The
+    payload is built from plain values (`base_url` for absolute media URLs),
+    never from the request, so it can outlive the request that triggered it.
+    """
+    DATA_KEY = 'admin:dashboard'
+    FRESH_KEY = 'admin:dashboard:fresh'
+    REFRESH_LOCK_KEY = 'admin:dashboard:refreshing'
+    REFRESH_LOCK_TIMEOUT = 60
+
+    @staticmethod
+    def get(request):
+        base_url = request.build_absolute_uri('/')
+        try:
+            cached = cache.get_many([DashboardService.DATA_KEY, DashboardService.FRESH_KEY])
+        except Exception as e:
+            logger.warning(f"Dashboard cache read failed: {str(e)}")
+            return DashboardService.compute(base_url)
+
+        data = cached.get(DashboardService.DATA_KEY)
+        if data is None:
+            return DashboardService.refresh(base_url)
+        if DashboardService.FRESH_KEY not in cached:
+            DashboardService._refresh_in_background(base_url)
+        return data
+
+    @staticmethod
+    def refresh(base_url):
+        data = DashboardService.compute(base_url)
+        fresh_for = settings.ADMIN_DASHBOARD_CACHE_TIMEOUT
+        try:
+            cache.set_many({DashboardService.DATA_KEY: data, DashboardService.FRESH_KEY: True}, fresh_for)
+            if settings.ADMIN_DASHBOARD_STALE_TIMEOUT:
+                # The payload outlives its freshness marker by the stale window
+                cache.touch(DashboardService.DATA_KEY, fresh_for + settings.ADMIN_DASHBOARD_STALE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Dashboard cache write failed: {str(e)}")
+        return data
+
+    @staticmethod
+    def invalidate():
+        keys = [DashboardService.FRESH_KEY]
+        if not settings.ADMIN_DASHBOARD_STALE_TIMEOUT:
+            keys.append(DashboardService.DATA_KEY)
+
+        def _delete():
+            try:
+                cache.delete_many(keys)
+            except Exception as e:
+                logger.warning(f"Dashboard cache invalidation failed: {str(e)}")
+        transaction.on_commit(_delete)
+
+    @staticmethod
+    def _refresh_in_background(base_url):
+        try:
+            if not cache.add(DashboardService.REFRESH_LOCK_KEY, True, DashboardService.REFRESH_LOCK_TIMEOUT):
+                return  # another worker is on it
+        except Exception as e:
+            logger.warning(f"Dashboard refresh lock failed: {str(e)}")
+            return
+
+        def run():
+            try:
+                DashboardService.refresh(base_url)
+            except Exception:
+                logger.exception('Dashboard refresh failed')
+            finally:
+                cache.delete(DashboardService.REFRESH_LOCK_KEY)
+                # This thread's own DB connections
+                connections.close_all()
+        threading.Thread(target=run, daemon=True).start()
+
+    # ── Computation ───────────────────────────────────────────
+
+    @staticmethod
+    def compute(base_url):
+        from apps.accounts.serializers import UserProfileSerializer
+        from apps.properties.serializers import PropertyListSerializer
+
+        stats = StatsService.platform()
+        properties = stats['properties']
+        approved = stats['properties:approved']
+
+        # Shared by every admin, so no per-user favourite flag
+        latest_requested = (
+            Property.objects.filter(is_approved=False).with_list_projection().order_by('-created_at')[:5]
+        )
+
+        activities = []
+        for u in User.objects.only('id', 'role', 'member_since').order_by('-member_since')[:5]:
+            activities.append({
+                'id': str(u.id),
+                'user': u.id,
+                'action': 'registered',
+                'timestamp': u.member_since,
+                'details': f"New {u.role} registered."
+            })
+        for p in Property.objects.only('id', 'agent_id', 'title', 'created_at').order_by('-created_at')[:5]:
+            activities.append({
+                'id': str(p.id),
+                'user': p.agent_id,
+                'action': 'created_property',
+                'timestamp': p.created_at,
+                'details': f"Added property: {p.title}"
+            })
+        for msg in SupportMessage.objects.only('id', 'user_id', 'message', 'created_at').order_by('-created_at')[:5]:
+            activities.append({
+                'id': str(msg.id),
+                'user': msg.user_id,
+                'action': 'sent_support_message',
+                'timestamp': msg.created_at,
+                'details': f"Sent message: {msg.message[:30]}..."
+            })
+        activities.sort(key=lambda x: x['timestamp'], reverse=True)
+        recent_activities = activities[:5]
+        # Only the users that make the cut are loaded, with their totals, in one query
+        users = User.objects.with_profile_stats().in_bulk({activity['user'] for activity in recent_activities})
+        for activity in recent_activities:
+            activity['user'] = UserProfileSerializer(users[activity['user']]).data
+
+        return {
+            'total_users': stats['users:buyer'],
+            'total_agents': stats['users:agent'],
+            'total_agents_verified': stats['agents:verified'],
+            'total_agents_pending': stats['agents:pending'],
+            'total_properties': properties,
+            'total_properties_approved': approved,
+            'total_properties_pending': properties - approved,
+            'total_views_counts': stats['views'],
+            'property_by_type': StatsService.property_by_type(stats),
+            'latest_requested_properties': PropertyListSerializer(
+                latest_requested, many=True, context={'base_url': base_url}
+            ).data,
+            'recent_user_activities': recent_activities,
+        }
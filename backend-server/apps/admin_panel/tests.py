@@ -1,3 +1,177 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.accounts.models import AgentProfile
+from apps.offers.models import Offer
+from apps.properties.models import Property, PropertyImage
+
+from .services import DashboardService
+
+User = get_user_model()
+
+
+class AdminUserListQueryCountTests(TestCase):
+    """The user and agent lists cost the same number of queries however many rows a page holds."""
+
+    # count (exact) + the page itself, with profile and totals annotated
+    QUERIES_PER_PAGE = 2
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin@example.com', 'pass', full_name='Admin'))
+
+    def add_agents(self, n, properties=2):
+        for i in range(n):
+            agent = User.objects.create_user(f'agent{User.objects.count()}@example.com', full_name='Agent', role='agent')
+            AgentProfile.objects.create(user=agent, brand_name=f'Brand {i}')
+            for j in range(properties):
+                Property.objects.create(agent=agent, title=f'Home {j}', price=100000, address='1 High St', views_count=j)
+
+    def add_buyers(self, n):
+        for _ in range(n):
+            User.objects.create_user(f'buyer{User.objects.count()}@example.com', full_name='Buyer')
+
+    def get_page(self, url):
+        response = self.client.get(url, {'count': 'exact', 'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_agent_list_is_constant_query(self):
+        self.add_agents(2)
+        with self.assertNumQueries(self.QUERIES_PER_PAGE):
+            data = self.get_page('/api/v1/admin/agents/')
+        self.assertEqual(data['count'], 2)
+
+        self.add_agents(20)
+        with self.assertNumQueries(self.QUERIES_PER_PAGE):
+            data = self.get_page('/api/v1/admin/agents/')
+        self.assertEqual(data['count'], 22)
+        self.assertEqual({row['total_properties_count'] for row in data['results']}, {2})
+        self.assertEqual({row['total_views_count'] for row in data['results']}, {1})
+
+    def test_user_list_is_constant_query(self):
+        self.add_buyers(2)
+        with self.assertNumQueries(self.QUERIES_PER_PAGE):
+            self.get_page('/api/v1/admin/users/')
+
+        self.add_buyers(20)
+        with self.assertNumQueries(self.QUERIES_PER_PAGE):
+            data = self.get_page('/api/v1/admin/users/')
+        self.assertEqual(data['count'], 22)
+
+
+class AdminPropertyListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin@example.com', 'pass', full_name='Admin'))
+        self.agent = User.objects.create_user('agent@example.com', full_name='Agent', role='agent')
+
+    def add_properties(self, offers):
+        for n in offers:
+            prop = Property.objects.create(agent=self.agent, title=f'Home {n}', price=100000, address='1 High St')
+            for _ in range(n):
+                Offer.objects.create(property=prop, buyer_name='Buyer', email='b@example.com', phone='1', offer_amount=90000)
+
+    def test_page_is_constant_query(self):
+        self.add_properties([0, 1])
+        with self.assertNumQueries(2):  # count (exact) + the page
+            self.client.get('/api/v1/admin/properties/', {'count': 'exact'})
+
+        self.add_properties([2, 3] * 10)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/admin/properties/', {'count': 'exact', 'page_size': 100})
+        self.assertEqual(response.data['count'], 22)
+        self.assertEqual(
+            sum(row['total_offer_got_count'] for row in response.data['results']), Offer.objects.count()
+        )
+
+    def test_sort_by_offers_across_pages(self):
+        self.add_properties([3, 0, 5, 1, 4, 2])
+        counts, url, params = [], '/api/v1/admin/properties/', {'ordering': 'offers_desc', 'page_size': 4}
+        while url:
+            response = self.client.get(url, params)
+            counts += [row['total_offer_got_count'] for row in response.data['results']]
+            url, params = response.data['next'], None
+        self.assertEqual(counts, [5, 4, 3, 2, 1, 0])
+
+
+class AdminExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin@example.com', 'pass', full_name='Admin'))
+        agent = User.objects.create_user('agent@example.com', full_name='Agent, "Jr"', role='agent')
+        self.approved = Property.objects.create(agent=agent, title='Approved', price=1, address='x', is_approved=True)
+        self.pending = Property.objects.create(agent=agent, title='Pending', price=1, address='x')
+        Offer.objects.create(property=self.pending, buyer_name='Buyer', email='b@example.com', phone='1', offer_amount=90000)
+
+    def export(self, entity, **params):
+        response = self.client.get(f'/api/v1/admin/export/{entity}/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_uses_list_filters(self):
+        import csv
+        rows = list(csv.DictReader(self.export('properties', approval_status='pending').splitlines()))
+        self.assertEqual([row['title'] for row in rows], ['Pending'])
+        self.assertEqual(rows[0]['offer_count'], '1')
+
+        rows = list(csv.DictReader(self.export('users', role='agent').splitlines()))
+        self.assertEqual([row['full_name'] for row in rows], ['Agent, "Jr"'])
+
+    def test_csv_escapes_formulas(self):
+        import csv
+        Property.objects.filter(pk=self.pending.pk).update(title='=HYPERLINK("http://evil")', address='-1+2')
+        rows = list(csv.DictReader(self.export('properties', approval_status='pending').splitlines()))
+        self.assertEqual((rows[0]['title'], rows[0]['address']), ('\'=HYPERLINK("http://evil")', "'-1+2"))
+        self.assertEqual(rows[0]['price'], '1.00')  # numbers are left alone
+
+    def test_ndjson(self):
+        import json
+        lines = self.export('offers', file_format='ndjson').splitlines()
+        self.assertEqual(len(lines), 1)
+        offer = json.loads(lines[0])
+        self.assertEqual((offer['property_id'], offer['offer_amount']), (str(self.pending.pk), '90000.00'))
+
+    def test_unknown_entity_and_format(self):
+        self.assertEqual(self.client.get('/api/v1/admin/export/secrets/').status_code, 404)
+        self.assertEqual(self.client.get('/api/v1/admin/export/users/', {'file_format': 'xml'}).status_code, 400)
+
+
+@override_settings(ADMIN_DASHBOARD_STALE_TIMEOUT=60)
+class AdminDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin@example.com', 'pass', full_name='Admin'))
+        agent = User.objects.create_user('agent@example.com', full_name='Agent', role='agent')
+        prop = Property.objects.create(agent=agent, title='Pending', price=1, address='x')
+        PropertyImage.objects.create(property=prop, image='property_images/a.jpg', is_cover=True)
+
+    def get_dashboard(self):
+        response = self.client.get('/api/v1/admin/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_media_urls_are_absolute(self):
+        latest = self.get_dashboard()['latest_requested_properties']
+        self.assertEqual(latest[0]['cover_image'], 'http://testserver/media/property_images/a.jpg')
+
+    def test_background_refresh_gets_no_request(self):
+        self.get_dashboard()
+        cache.delete(DashboardService.FRESH_KEY)  # stale
+
+        with mock.patch('apps.admin_panel.services.threading.Thread') as thread, \
+                mock.patch.object(DashboardService, 'refresh') as refresh:
+            self.assertEqual(self.get_dashboard()['total_properties'], 1)  # served stale
+            target = thread.call_args.kwargs['target']
+            with mock.patch('apps.admin_panel.services.connections') as connections:
+                target()
+        refresh.assert_called_once_with('http://testserver/')
+        connections.close_all.assert_called_once_with()
+        self.assertIsNone(cache.get(DashboardService.REFRESH_LOCK_KEY))
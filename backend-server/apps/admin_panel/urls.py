@@ -20,6 +20,9 @@ urlpatterns = [
     path('agents/<uuid:pk>/verify/', views.AdminAgentVerifyView.as_view(), name='admin-agent-verify'),
     path('agents/<uuid:pk>/ban/', views.AdminAgentBanView.as_view(), name='admin-agent-ban'),
 
+    # Exports (CSV / NDJSON)
+    path('export/<str:entity>/', views.AdminExportView.as_view(), name='admin-export'),
+
     # Property types config
     path('settings/property-types/', views.PropertyTypeConfigView.as_view(), name='admin-property-types'),
 
@@ -29,6 +32,10 @@ urlpatterns = [
     # Support messages
     path('support/', views.SupportMessageListView.as_view(), name='admin-support-list'),
     path('support/<uuid:pk>/reply/', views.SupportMessageReplyView.as_view(), name='admin-support-reply'),
+
+    # System
+    path('system/notification-outbox/', views.NotificationOutboxStatsView.as_view(), name='admin-notification-outbox'),
+    path('system/chat-proxy/', views.ChatProxyStatsView.as_view(), name='admin-chat-proxy'),
 ]
 
 # Public pages (terms / privacy for buyers)
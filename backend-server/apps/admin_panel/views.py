@@ -2,8 +2,9 @@ from rest_framework import status, serializers
 from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Sum
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter, OpenApiTypes
 
@@ -11,6 +12,10 @@ from apps.accounts.permissions import IsAdminUser
 from apps.properties.models import Property, SupportMessage, StaticPage, PropertyType2
 from apps.accounts.models import AgentProfile
 
+from .exports import EXPORTS, FORMATS, stream_export
+from .filters import filter_properties, filter_users
+from .pagination import AdminPropertyCursorPagination, AdminUserCursorPagination
+from .services import DashboardService
 from .serializers import (
     AdminDashboardSerializer, AdminActionResponseSerializer,
     PropertyTypeSerializer, AdminSupportMessageSerializer, SupportReplySerializer
@@ -18,6 +23,13 @@ from .serializers import (
 
 User = get_user_model()
 
+# Query parameters shared by the cursor-paginated lists
+PAGINATION_PARAMETERS = [
+    OpenApiParameter('cursor', OpenApiTypes.STR, description='Opaque cursor taken from the `next` / `previous` links'),
+    OpenApiParameter('page_size', OpenApiTypes.INT, description='Results per page (default 20, max 100)'),
+    OpenApiParameter('count', OpenApiTypes.STR, enum=['estimate', 'exact', 'none'], description='How to compute `count` (default estimate)'),
+]
+
 
 # ── Dashboard ─────────────────────────────────────────────────
 
@@ -26,62 +38,7 @@ class AdminDashboardView(APIView):
 
     @extend_schema(responses=AdminDashboardSerializer, tags=['Admin'])
     def get(self, request):
-        from apps.properties.serializers import PropertyListSerializer
-        from apps.accounts.serializers import UserProfileSerializer
-        
-        activities = []
-        # Add new users
-        for u in User.objects.all().order_by('-member_since')[:5]:
-            activities.append({
-                'id': str(u.id),
-                'user': UserProfileSerializer(u).data,
-                'action': 'registered',
-                'timestamp': u.member_since,
-                'details': f"New {u.role} registered."
-            })
-            
-        # Add property creations
-        for p in Property.objects.all().order_by('-created_at')[:5]:
-            activities.append({
-                'id': str(p.id),
-                'user': UserProfileSerializer(p.agent).data,
-                'action': 'created_property',
-                'timestamp': p.created_at,
-                'details': f"Added property: {p.title}"
-            })
-
-        # Add support messages
-        for msg in SupportMessage.objects.all().order_by('-created_at')[:5]:
-            activities.append({
-                'id': str(msg.id),
-                'user': UserProfileSerializer(msg.user).data,
-                'action': 'sent_support_message',
-                'timestamp': msg.created_at,
-                'details': f"Sent message: {msg.message[:30]}..."
-            })
-            
-        activities.sort(key=lambda x: x['timestamp'], reverse=True)
-        recent_activities = activities[:5]
-
-        return Response({
-            'total_users': User.objects.filter(role='buyer').count(),
-            'total_agents': User.objects.filter(role='agent').count(),
-            'total_agents_verified': AgentProfile.objects.filter(is_verified=True).count(),
-            'total_agents_pending': AgentProfile.objects.filter(is_verified=False).count(),
-            'total_properties': Property.objects.count(),
-            'total_properties_approved': Property.objects.filter(is_approved=True).count(),
-            'total_properties_pending': Property.objects.filter(is_approved=False).count(),
-            'total_views_counts': Property.objects.aggregate(Sum('views_count'))['views_count__sum'] or 0,
-            'property_by_type': dict(
-                Property.objects.values_list('property_type').annotate(c=Count('id')).values_list('property_type', 'c')
-            ),
-            'latest_requested_properties': PropertyListSerializer(
-                Property.objects.filter(is_approved=False).order_by('-created_at')[:5], 
-                many=True, 
-                context={'request': request}
-            ).data,
-            'recent_user_activities': recent_activities,
-        })
+        return Response(DashboardService.get(request))
 
 
 # ── Property Management ───────────────────────────────────────
@@ -98,43 +55,20 @@ class AdminPropertyListView(APIView):
             OpenApiParameter('status', OpenApiTypes.STR, description='(Legacy) Filter by approval status (all, approved, pending)'),
             OpenApiParameter('type', OpenApiTypes.STR, description='(Legacy) Filter by property type'),
             OpenApiParameter('search', OpenApiTypes.STR, description='Search text'),
+            OpenApiParameter('ordering', OpenApiTypes.STR, enum=['relevance', *AdminPropertyCursorPagination.orderings], description='Sort order. Defaults to relevance when searching, otherwise newest'),
+            *PAGINATION_PARAMETERS,
         ],
-        responses={'200': {'type': 'object', 'properties': {'count': {'type': 'integer'}, 'results': {'type': 'array', 'items': {'$ref': '#/components/schemas/AdminProperty'}}}}})
+        responses={'200': AdminPropertyCursorPagination().get_paginated_response_schema(
+            {'type': 'array', 'items': {'$ref': '#/components/schemas/AdminProperty'}}
+        )})
     def get(self, request):
-        qs = Property.objects.select_related('agent').prefetch_related('images')
-        
-        # Approval status (all / approved / pending)
-        status_filter = request.query_params.get('status')
-        approval_status = request.query_params.get('approval_status')
-        
-        active_status = approval_status or status_filter
-        
-        if active_status and active_status != 'all':
-            if active_status == 'approved':
-                qs = qs.filter(is_approved=True)
-            elif active_status == 'pending':
-                qs = qs.filter(is_approved=False)
-                
-        # Property types (comma separated string "house,apartment")
-        type_filter = request.query_params.get('type')
-        property_types = request.query_params.get('property_types')
-        
-        if property_types:
-            types_list = [t.strip().lower() for t in property_types.split(',') if t.strip()]
-            if types_list:
-                qs = qs.filter(property_type__in=types_list)
-        elif type_filter:
-            qs = qs.filter(property_type=type_filter)
-            
-        search = request.query_params.get('search')
-        
-        if search:
-            from django.db.models import Q
-            qs = qs.filter(Q(title__icontains=search) | Q(address__icontains=search))
+        qs = filter_properties(Property.objects.with_admin_projection(request.user), request.query_params)
 
         from apps.properties.serializers import AdminPropertySerializer
-        serializer = AdminPropertySerializer(qs, many=True, context={'request': request})
-        return Response({'count': qs.count(), 'results': serializer.data})
+        paginator = AdminPropertyCursorPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = AdminPropertySerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
 
 
 class AdminPropertyDetailView(APIView):
@@ -147,7 +81,10 @@ class AdminPropertyDetailView(APIView):
     )
     def get(self, request, pk):
         from apps.properties.serializers import AdminPropertyDetailSerializer
-        prop = get_object_or_404(Property, pk=pk)
+        prop = get_object_or_404(
+            Property.objects.with_offer_count().select_related('agent__agent_profile').prefetch_related('images', 'video'),
+            pk=pk,
+        )
         return Response(AdminPropertyDetailSerializer(prop, context={'request': request}).data)
 
 
@@ -160,16 +97,74 @@ class AdminPropertyActionView(APIView):
         if action == 'approve':
             prop.is_approved = True
             prop.save()
+            DashboardService.invalidate()
             return Response({'message': 'Property approved.'})
         elif action == 'reject':
             prop.is_approved = False
             prop.save()
+            DashboardService.invalidate()
             return Response({'message': 'Property rejected.'})
         return Response({'error': 'Invalid action.'}, status=status.HTTP_400_BAD_REQUEST)
 
 
+# ── Exports ───────────────────────────────────────────────────
+
+class AdminExportView(APIView):
+    """
+    Streams every matching property, user, offer or booking as CSV or NDJSON
+    (see exports.py). Takes the same filters as the corresponding list view.
+    """
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        tags=['Admin'],
+        parameters=[
+            OpenApiParameter('entity', OpenApiTypes.STR, OpenApiParameter.PATH, enum=list(EXPORTS)),
+            OpenApiParameter('file_format', OpenApiTypes.STR, enum=list(FORMATS), description='Output format (default csv)'),
+            OpenApiParameter('approval_status', OpenApiTypes.STR, description='properties: filter by approval status (all, approved, pending)'),
+            OpenApiParameter('property_types', OpenApiTypes.STR, description='properties: filter by property types (comma separated string "house,apartment")'),
+            OpenApiParameter('role', OpenApiTypes.STR, enum=['all', 'buyer', 'agent', 'admin'], description='users: filter by role'),
+            OpenApiParameter('account_status', OpenApiTypes.STR, enum=['active', 'inactive', 'suspend'], description='users: filter by account status'),
+            OpenApiParameter('verified_only', OpenApiTypes.STR, description='users with role=agent: only verified agents if "true"'),
+            OpenApiParameter('status', OpenApiTypes.STR, description='offers, bookings: filter by status'),
+            OpenApiParameter('search', OpenApiTypes.STR, description='properties, users: search text'),
+        ],
+        responses={
+            (200, 'text/csv'): OpenApiTypes.STR,
+            (200, 'application/x-ndjson'): OpenApiTypes.STR,
+        },
+    )
+    def get(self, request, entity):
+        export = EXPORTS.get(entity)
+        if export is None:
+            return Response({'error': f'Unknown export: {entity}.'}, status=status.HTTP_404_NOT_FOUND)
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in FORMATS:
+            return Response({'error': 'file_format must be csv or ndjson.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        columns, qs = export(request.query_params)
+        filename = f'{entity}-{timezone.now():%Y%m%d-%H%M%S}.{file_format}'
+        return StreamingHttpResponse(
+            stream_export(columns, qs, file_format),
+            content_type=FORMATS[file_format],
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'X-Accel-Buffering': 'no',
+            },
+        )
+
+
 # ── User Management ───────────────────────────────────────────
 
+USER_PAGINATION_PARAMETERS = [
+    OpenApiParameter('ordering', OpenApiTypes.STR, enum=list(AdminUserCursorPagination.orderings), description='Sort order (default newest)'),
+    *PAGINATION_PARAMETERS,
+]
+USER_PAGE_SCHEMA = AdminUserCursorPagination().get_paginated_response_schema(
+    {'type': 'array', 'items': {'$ref': '#/components/schemas/UserProfile'}}
+)
+
+
 class AdminUserListView(APIView):
     permission_classes = [IsAdminUser]
 
@@ -178,29 +173,18 @@ class AdminUserListView(APIView):
         parameters=[
             OpenApiParameter('search', OpenApiTypes.STR, description='Search by full name or email'),
             OpenApiParameter('account_status', OpenApiTypes.STR, enum=['active', 'inactive', 'suspend'], description='Filter by account status'),
+            *USER_PAGINATION_PARAMETERS,
         ],
-        responses={'200': {'type': 'object', 'properties': {'count': {'type': 'integer'}, 'results': {'type': 'array', 'items': {'$ref': '#/components/schemas/UserProfile'}}}}})
+        responses={'200': USER_PAGE_SCHEMA})
     def get(self, request):
         from apps.accounts.serializers import UserProfileSerializer
-        from django.db.models import Q
-        
-        qs = User.objects.filter(role='buyer')
-        
-        search = request.query_params.get('search')
-        if search:
-            qs = qs.filter(Q(full_name__icontains=search) | Q(email__icontains=search))
-            
-        account_status_filter = request.query_params.get('account_status')
-        if account_status_filter == 'active':
-            qs = qs.filter(is_active=True, is_banned=False)
-        elif account_status_filter == 'inactive':
-            qs = qs.filter(is_active=False)
-        elif account_status_filter == 'suspend':
-            qs = qs.filter(is_banned=True)
-            
-        qs = qs.order_by('-member_since')
-        serializer = UserProfileSerializer(qs, many=True)
-        return Response({'count': qs.count(), 'results': serializer.data})
+
+        qs = filter_users(User.objects.with_profile_stats().filter(role='buyer'), request.query_params)
+
+        paginator = AdminUserCursorPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = UserProfileSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class AdminUserDetailView(APIView):
@@ -209,7 +193,7 @@ class AdminUserDetailView(APIView):
     @extend_schema(tags=['Admin'], operation_id='v1_admin_user_detail_retrieve', responses={'200': {'$ref': '#/components/schemas/UserProfile'}})
     def get(self, request, pk):
         from apps.accounts.serializers import UserProfileSerializer
-        user = get_object_or_404(User, pk=pk)
+        user = get_object_or_404(User.objects.with_profile_stats(), pk=pk)
         return Response(UserProfileSerializer(user).data)
 
 
@@ -222,6 +206,7 @@ class AdminUserBanView(APIView):
         user = get_object_or_404(User, pk=pk)
         user.is_banned = not user.is_banned
         user.save()
+        DashboardService.invalidate()
         action = 'banned' if user.is_banned else 'unbanned'
         return Response({'message': f'User {action}.'})
 
@@ -238,37 +223,18 @@ class AdminAgentListView(APIView):
             OpenApiParameter('verified_only', OpenApiTypes.BOOL, description='Filter for verified agents only'),
             OpenApiParameter('verify_list', OpenApiTypes.BOOL, description='Filter for verified agents only (alias for verified_only)'),
             OpenApiParameter('account_status', OpenApiTypes.STR, enum=['active', 'inactive', 'suspend'], description='Filter by account status'),
+            *USER_PAGINATION_PARAMETERS,
         ],
-        responses={'200': {'type': 'object', 'properties': {'count': {'type': 'integer'}, 'results': {'type': 'array', 'items': {'$ref': '#/components/schemas/UserProfile'}}}}})
+        responses={'200': USER_PAGE_SCHEMA})
     def get(self, request):
         from apps.accounts.serializers import UserProfileSerializer
-        from django.db.models import Q
-        
-        qs = User.objects.filter(role='agent').select_related('agent_profile')
-        
-        search = request.query_params.get('search')
-        if search:
-            qs = qs.filter(
-                Q(full_name__icontains=search) | 
-                Q(email__icontains=search) | 
-                Q(agent_profile__brand_name__icontains=search)
-            )
-            
-        verified_only = request.query_params.get('verified_only') or request.query_params.get('verify_list')
-        if verified_only == 'true':
-            qs = qs.filter(agent_profile__is_verified=True)
-
-        account_status_filter = request.query_params.get('account_status')
-        if account_status_filter == 'active':
-            qs = qs.filter(is_active=True, is_banned=False)
-        elif account_status_filter == 'inactive':
-            qs = qs.filter(is_active=False)
-        elif account_status_filter == 'suspend':
-            qs = qs.filter(is_banned=True)
-            
-        qs = qs.order_by('-member_since')
-        serializer = UserProfileSerializer(qs, many=True)
-        return Response({'count': qs.count(), 'results': serializer.data})
+
+        qs = filter_users(User.objects.with_profile_stats().filter(role='agent'), request.query_params, agents=True)
+
+        paginator = AdminUserCursorPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = UserProfileSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class AdminAgentVerifyView(APIView):
@@ -279,6 +245,7 @@ class AdminAgentVerifyView(APIView):
         agent_profile = get_object_or_404(AgentProfile, user__pk=pk)
         agent_profile.is_verified = not agent_profile.is_verified
         agent_profile.save()
+        DashboardService.invalidate()
         state = 'verified' if agent_profile.is_verified else 'unverified'
         return Response({'message': f'Agent {state}.'})
 
@@ -291,6 +258,7 @@ class AdminAgentBanView(APIView):
         agent = get_object_or_404(User, pk=pk, role='agent')
         agent.is_banned = not agent.is_banned
         agent.save()
+        DashboardService.invalidate()
         action = 'banned' if agent.is_banned else 'unbanned'
         return Response({'message': f'Agent {action}.'})
 
@@ -422,3 +390,46 @@ class SupportMessageReplyView(APIView):
         )
 
         return Response({'message': 'Reply sent.'})
+
+
+# ── System ────────────────────────────────────────────────────
+class NotificationOutboxStatsView(APIView):
+    """Queue depth and dispatch latency of the notification outbox."""
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        responses=OpenApiResponse(description="Outbox metrics", response={
+            'type': 'object',
+            'properties': {
+                'queue_depth': {'type': 'integer'},
+                'retrying': {'type': 'integer'},
+                'oldest_pending_seconds': {'type': 'number'},
+                'dispatcher': {'type': 'object', 'nullable': True, 'additionalProperties': {'type': 'string'}},
+            },
+        }),
+        tags=['Admin Settings']
+    )
+    def get(self, request):
+        from apps.notifications.dispatcher import NotificationDispatcher
+        return Response(NotificationDispatcher.metrics())
+
+
+class ChatProxyStatsView(APIView):
+    """Queue depth, in-flight calls and circuit state of the async chat proxy workers."""
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        responses=OpenApiResponse(description="Chat proxy metrics", response={
+            'type': 'object',
+            'properties': {
+                'queue_depth': {'type': 'integer'},
+                'in_flight': {'type': 'integer'},
+                'open_circuits': {'type': 'integer'},
+                'workers': {'type': 'object', 'additionalProperties': {'type': 'object'}},
+            },
+        }),
+        tags=['Admin Settings']
+    )
+    def get(self, request):
+        from apps.chat.client import collect_stats
+        return Response(collect_stats())
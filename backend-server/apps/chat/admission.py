@@ -0,0 +1,156 @@
+import logging
+import math
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.http import JsonResponse
+from redis.exceptions import RedisError, WatchError
+
+logger = logging.getLogger(__name__)
+
+
+class ChatRejected(Exception):
+    """Request not admitted; the caller should retry after `retry_after` seconds."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def rejected_response(exc):
+    """429 with Retry-After, in the same shape as DRF's throttled responses."""
+    wait = max(1, math.ceil(exc.retry_after))
+    return JsonResponse(
+        {'detail': f'Request was throttled. Expected available in {wait} seconds.', 'reason': exc.reason},
+        status=429,
+        headers={'Retry-After': str(wait)},
+    )
+
+
+class ChatAdmission:
+    """
+    Per-user admission for chat requests, shared by every worker through Redis:
+
+    - at most CHAT_USER_MAX_IN_FLIGHT requests in flight per user (leases in a
+      sorted set, each expiring on its own so a crashed worker can't leak one;
+      streams renew theirs while they run);
+    - a token bucket per user: CHAT_USER_RATE_BURST requests at once, refilled
+      at CHAT_USER_RATE_PER_MINUTE.
+
+    Together with the per-worker queue bound in ChatServiceClient this keeps a
+    burst from a few users from queueing everyone else behind it. If Redis is
+    unreachable requests are let through (the per-worker limits still apply).
+    """
+    COUNTERS = ('admitted', 'rejected_in_flight', 'rejected_rate')
+
+    def __init__(self, redis, counters=None):
+        self.redis = redis
+        self.max_in_flight = settings.CHAT_USER_MAX_IN_FLIGHT
+        self.burst = settings.CHAT_USER_RATE_BURST
+        self.rate = settings.CHAT_USER_RATE_PER_MINUTE / 60
+        self.lease_timeout = settings.CHATBOT_TIMEOUT + settings.CHATBOT_QUEUE_TIMEOUT + 5
+        self.counters = counters if counters is not None else dict.fromkeys(self.COUNTERS, 0)
+
+    @staticmethod
+    def in_flight_key(user_id):
+        return f'chat:inflight:{user_id}'
+
+    @staticmethod
+    def bucket_key(user_id):
+        return f'chat:bucket:{user_id}'
+
+    @asynccontextmanager
+    async def admit(self, user_id):
+        lease = await self.acquire(user_id)
+        try:
+            yield
+        finally:
+            await self.release(user_id, lease)
+
+    async def acquire(self, user_id):
+        """Take an in-flight lease and a token for `user_id`, or raise ChatRejected."""
+        lease = None
+        try:
+            lease = await self._lease(user_id)
+            if lease is None:
+                self.counters['rejected_in_flight'] += 1
+                raise ChatRejected('in_flight', 1)
+
+            retry_after = await self._take_token(user_id)
+            if retry_after:
+                await self.release(user_id, lease)
+                self.counters['rejected_rate'] += 1
+                raise ChatRejected('rate', retry_after)
+        except RedisError as e:
+            logger.warning(f"Chat admission check skipped: {str(e)}")
+            # Don't leave a lease taken before the error to run out on its own
+            await self.release(user_id, lease)
+            lease = None
+        self.counters['admitted'] += 1
+        return lease
+
+    async def release(self, user_id, lease):
+        if lease is None:
+            return
+        try:
+            await self.redis.zrem(self.in_flight_key(user_id), lease)
+        except RedisError as e:
+            logger.warning(f"Chat lease release failed: {str(e)}")
+
+    async def renew(self, user_id, lease):
+        """Push back the expiry of a lease held by a long request (e.g. a stream)."""
+        if lease is None:
+            return
+        key = self.in_flight_key(user_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.zadd(key, {lease: time.time()}, xx=True)
+                pipe.expire(key, math.ceil(self.lease_timeout))
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Chat lease renewal failed: {str(e)}")
+
+    async def _lease(self, user_id):
+        key = self.in_flight_key(user_id)
+        lease = uuid.uuid4().hex
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(key, '-inf', now - self.lease_timeout)
+            pipe.zadd(key, {lease: now})
+            pipe.zcard(key)
+            pipe.expire(key, math.ceil(self.lease_timeout))
+            _, _, count, _ = await pipe.execute()
+        if count > self.max_in_flight:
+            await self.redis.zrem(key, lease)
+            return None
+        return lease
+
+    async def _take_token(self, user_id):
+        """Spend one token; returns 0 if one was available, else seconds until the next."""
+        key = self.bucket_key(user_id)
+        ttl = math.ceil(self.burst / self.rate) + 1
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for _ in range(5):
+                try:
+                    await pipe.watch(key)
+                    tokens, updated = await pipe.hmget(key, 'tokens', 'ts')
+                    now = time.time()
+                    if tokens is None:
+                        tokens = float(self.burst)
+                    else:
+                        tokens = min(self.burst, float(tokens) + max(0.0, now - float(updated)) * self.rate)
+                    allowed = tokens >= 1
+                    if allowed:
+                        tokens -= 1
+                    pipe.multi()
+                    pipe.hset(key, mapping={'tokens': tokens, 'ts': now})
+                    pipe.expire(key, ttl)
+                    await pipe.execute()
+                    return 0 if allowed else (1 - tokens) / self.rate
+                except WatchError:
+                    continue
+        # Several of this user's requests raced for the bucket; make them back off.
+        return 1
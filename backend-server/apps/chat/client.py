@@ -0,0 +1,282 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import weakref
+from contextlib import asynccontextmanager
+
+import httpx
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+
+from .admission import ChatAdmission, ChatRejected
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = 'chat:proxy:workers'
+
+
+class ChatServiceUnavailable(Exception):
+    """The ai-server can't be reached, or the circuit breaker is open."""
+
+
+class ChatServiceError(Exception):
+    """The ai-server answered, but with an error or too slowly."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds; then lets a single trial call through (half-open)
+    and closes again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class ChatServiceClient:
+    """
+    Async client for the ai-server, shared by every chat request on an event
+    loop (i.e. per ASGI worker): one keep-alive connection pool, a concurrency
+    limit toward the ai-server with a bounded wait queue, per-user admission
+    (see ChatAdmission) and a circuit breaker so an outage fails fast.
+    """
+
+    COUNTERS = ('requests', 'failures', 'rejected', 'overloaded')
+
+    def __init__(self, breaker=None, counters=None, admission_counters=None):
+        self.max_concurrency = settings.CHATBOT_MAX_CONCURRENCY
+        self.max_queue = settings.CHATBOT_MAX_QUEUE
+        self.queue_timeout = settings.CHATBOT_QUEUE_TIMEOUT
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.CHATBOT_TIMEOUT, connect=settings.CHATBOT_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency
+            ),
+        )
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.breaker = breaker or CircuitBreaker(settings.CHATBOT_BREAKER_THRESHOLD, settings.CHATBOT_BREAKER_RESET)
+        self.redis = aioredis.Redis.from_url(
+            settings.REDIS_URL, decode_responses=True,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT, socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+        self.admission = ChatAdmission(self.redis, admission_counters)
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.waiting = 0
+        self.in_flight = 0
+        self.counters = counters if counters is not None else dict.fromkeys(self.COUNTERS, 0)
+        self.last_latency_ms = None
+        self._last_published = 0.0
+
+    async def aclose(self):
+        await self.http.aclose()
+        await self.redis.aclose()
+
+    @property
+    def queue_full(self):
+        return self.waiting >= self.max_queue
+
+    @asynccontextmanager
+    async def _slot(self):
+        """
+        Admission for one ai-server call: circuit breaker, then the concurrency
+        limit. At most `max_queue` calls wait for a slot, each for at most
+        `queue_timeout` seconds; beyond that they are turned away (ChatRejected).
+        """
+        if not self.breaker.allow():
+            self.counters['rejected'] += 1
+            await self.publish_stats()
+            raise ChatServiceUnavailable('Circuit open')
+        if self.queue_full:
+            await self._overloaded()
+
+        self.counters['requests'] += 1
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.waiting -= 1
+            await self._overloaded()
+        except asyncio.CancelledError:
+            self.waiting -= 1
+            self.breaker.trial_in_flight = False
+            raise
+        self.waiting -= 1
+
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client went away; don't leave a half-open trial hanging
+            self.breaker.trial_in_flight = False
+            raise
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+            self.last_latency_ms = round((time.monotonic() - started) * 1000, 1)
+            await self.publish_stats()
+
+    async def _overloaded(self):
+        self.breaker.trial_in_flight = False
+        self.counters['overloaded'] += 1
+        await self.publish_stats()
+        raise ChatRejected('busy', 1)
+
+    async def post(self, url, payload):
+        """POST `payload` to the ai-server and return the decoded JSON body."""
+        async with self._slot():
+            try:
+                response = await self.http.post(url, json=payload)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                raise self._error(e) from e
+            self.breaker.record_success()
+            return response.json()
+
+    async def stream(self, url, payload):
+        """
+        POST `payload` to a streaming ai-server endpoint and yield the response
+        body as it arrives. Connection failures raise ChatServiceUnavailable
+        before anything is yielded.
+        """
+        async with self._slot():
+            try:
+                async with self.http.stream('POST', url, json=payload) as response:
+                    response.raise_for_status()
+                    self.breaker.record_success()
+                    async for chunk in response.aiter_raw():
+                        yield chunk
+            except httpx.HTTPError as e:
+                raise self._error(e) from e
+
+    def _error(self, exc):
+        """Map an httpx error to ours, feeding the circuit breaker."""
+        if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout)):
+            self._failed()
+            return ChatServiceUnavailable(str(exc))
+        if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code < 500:
+            self.breaker.record_success()
+        else:
+            self._failed()
+        return ChatServiceError(str(exc) or exc.__class__.__name__)
+
+    def _failed(self):
+        self.counters['failures'] += 1
+        self.breaker.record_failure()
+
+    def stats(self):
+        return {
+            'queue_depth': self.waiting,
+            'in_flight': self.in_flight,
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'circuit': self.breaker.state,
+            'last_latency_ms': self.last_latency_ms,
+            **self.counters,
+            **self.admission.counters,
+            'updated_at': time.time(),
+        }
+
+    async def publish_stats(self, force=False):
+        """Share this worker's stats through Redis (at most once a second)."""
+        now = time.monotonic()
+        if not force and now - self._last_published < 1:
+            return
+        self._last_published = now
+        try:
+            await self.redis.hset(STATS_KEY, self.worker_id, json.dumps(self.stats()))
+        except Exception as e:
+            logger.warning(f"Could not publish chat proxy stats: {str(e)}")
+
+
+_clients = weakref.WeakKeyDictionary()
+_wsgi_state = None
+
+
+def get_chat_client():
+    """The ChatServiceClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = ChatServiceClient()
+    return client
+
+
+@asynccontextmanager
+async def chat_client(request):
+    """
+    The ChatServiceClient to use for `request`. ASGI workers share one per
+    event loop (get_chat_client). Under WSGI every request runs on an event
+    loop of its own, so it gets a client that is closed on exit and shares the
+    process-wide circuit breaker and counters.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        yield get_chat_client()
+        return
+
+    global _wsgi_state
+    if _wsgi_state is None:
+        _wsgi_state = {
+            'breaker': CircuitBreaker(settings.CHATBOT_BREAKER_THRESHOLD, settings.CHATBOT_BREAKER_RESET),
+            'counters': dict.fromkeys(ChatServiceClient.COUNTERS, 0),
+            'admission_counters': dict.fromkeys(ChatAdmission.COUNTERS, 0),
+        }
+    client = ChatServiceClient(**_wsgi_state)
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+def collect_stats(max_age=300):
+    """Stats of every worker that reported within `max_age` seconds (sync, for admin views)."""
+    from apps.common.redis import get_redis
+
+    workers = {}
+    for worker_id, raw in get_redis().hgetall(STATS_KEY).items():
+        data = json.loads(raw)
+        if time.time() - data['updated_at'] <= max_age:
+            workers[worker_id] = data
+    return {
+        'workers': workers,
+        'queue_depth': sum(w['queue_depth'] for w in workers.values()),
+        'in_flight': sum(w['in_flight'] for w in workers.values()),
+        'open_circuits': sum(1 for w in workers.values() if w['circuit'] != 'closed'),
+    }
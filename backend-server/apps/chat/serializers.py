@@ -2,7 +2,10 @@ from rest_framework import serializers
 
 class ChatMessageSerializer(serializers.Serializer):
     message = serializers.CharField(max_length=1000)
+    # Returned by the first reply; send it back to continue the conversation.
+    conversation_id = serializers.UUIDField(required=False)
 
 class ChatResponseSerializer(serializers.Serializer):
     reply = serializers.CharField()
+    conversation_id = serializers.UUIDField(required=False)
     fallback = serializers.BooleanField(required=False, default=False)
@@ -1,3 +1,240 @@
-from django.test import TestCase
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from .admission import ChatAdmission, ChatRejected
+from .client import ChatServiceClient
+from .views import LeasedStream
+
+
+@override_settings(CHAT_USER_MAX_IN_FLIGHT=2, CHAT_USER_RATE_BURST=3, CHAT_USER_RATE_PER_MINUTE=60)
+class ChatAdmissionTests(SimpleTestCase):
+    """Per-user limits, kept in the configured Redis (REDIS_URL)."""
+
+    def setUp(self):
+        self.user_id = uuid.uuid4().hex
+
+    @asynccontextmanager
+    async def admission(self):
+        client = ChatServiceClient()
+        try:
+            yield client.admission
+        finally:
+            await client.redis.delete(
+                ChatAdmission.in_flight_key(self.user_id), ChatAdmission.bucket_key(self.user_id)
+            )
+            await client.aclose()
+
+    async def in_flight(self, admission):
+        return await admission.redis.zcard(ChatAdmission.in_flight_key(self.user_id))
+
+    async def test_in_flight_limit_and_release(self):
+        async with self.admission() as admission:
+            first = await admission.acquire(self.user_id)
+            await admission.acquire(self.user_id)
+            with self.assertRaises(ChatRejected) as rejected:
+                await admission.acquire(self.user_id)
+            self.assertEqual(rejected.exception.reason, 'in_flight')
+            self.assertEqual(await self.in_flight(admission), 2)
+
+            await admission.release(self.user_id, first)
+            await admission.acquire(self.user_id)
+            self.assertEqual(admission.counters, {'admitted': 3, 'rejected_in_flight': 1, 'rejected_rate': 0})
+
+    async def test_admit_releases_on_error(self):
+        async with self.admission() as admission:
+            with self.assertRaises(ValueError):
+                async with admission.admit(self.user_id):
+                    self.assertEqual(await self.in_flight(admission), 1)
+                    raise ValueError
+            self.assertEqual(await self.in_flight(admission), 0)
+
+    async def test_expired_lease_is_reclaimed(self):
+        async with self.admission() as admission:
+            # Leases of a worker that died mid-request
+            stale = time.time() - admission.lease_timeout - 1
+            await admission.redis.zadd(ChatAdmission.in_flight_key(self.user_id), {'a': stale, 'b': stale})
+            await admission.acquire(self.user_id)
+            self.assertEqual(await self.in_flight(admission), 1)
+
+    async def test_token_bucket(self):
+        async with self.admission() as admission:
+            for _ in range(3):
+                async with admission.admit(self.user_id):
+                    pass
+            with self.assertRaises(ChatRejected) as rejected:
+                await admission.acquire(self.user_id)
+            self.assertEqual(rejected.exception.reason, 'rate')
+            self.assertAlmostEqual(rejected.exception.retry_after, 1, delta=0.1)
+            # The rejected request gave its lease back
+            self.assertEqual(await self.in_flight(admission), 0)
+
+            # One token a second
+            await admission.redis.hset(ChatAdmission.bucket_key(self.user_id), 'ts', time.time() - 1.1)
+            await admission.acquire(self.user_id)
+            self.assertEqual(admission.counters['rejected_rate'], 1)
+
+    async def test_redis_errors_fail_open(self):
+        async with self.admission() as admission:
+            with mock.patch.object(admission, '_lease', side_effect=RedisConnectionError('down')):
+                with self.assertLogs('apps.chat.admission', 'WARNING'):
+                    lease = await admission.acquire(self.user_id)
+            self.assertIsNone(lease)
+            self.assertEqual(admission.counters['admitted'], 1)
+
+    async def test_redis_error_after_lease_releases_it(self):
+        async with self.admission() as admission:
+            with mock.patch.object(admission, '_take_token', side_effect=RedisConnectionError('down')):
+                with self.assertLogs('apps.chat.admission', 'WARNING'):
+                    self.assertIsNone(await admission.acquire(self.user_id))
+            self.assertEqual(await self.in_flight(admission), 0)
+
+    async def test_renewed_lease_does_not_expire(self):
+        async with self.admission() as admission:
+            lease = await admission.acquire(self.user_id)
+            stale = time.time() - admission.lease_timeout - 1
+            key = ChatAdmission.in_flight_key(self.user_id)
+            await admission.redis.zadd(key, {lease: stale})
+
+            await admission.renew(self.user_id, lease)
+            await admission.acquire(self.user_id)  # sweeps expired leases
+            self.assertEqual(await self.in_flight(admission), 2)
+            # A lease that is gone (released or expired) isn't brought back
+            await admission.release(self.user_id, lease)
+            await admission.renew(self.user_id, lease)
+            self.assertEqual(await self.in_flight(admission), 1)
+
+
+@override_settings(CHATBOT_MAX_CONCURRENCY=1, CHATBOT_MAX_QUEUE=1, CHATBOT_QUEUE_TIMEOUT=0.2)
+class ChatServiceClientQueueTests(SimpleTestCase):
+    async def test_queue_is_bounded(self):
+        client = ChatServiceClient()
+        held, release = asyncio.Event(), asyncio.Event()
+
+        async def call():
+            async with client._slot():
+                held.set()
+                await release.wait()
+
+        try:
+            running = asyncio.create_task(call())
+            await held.wait()
+            queued = asyncio.create_task(call())
+            await asyncio.sleep(0)
+            self.assertTrue(client.queue_full)
+
+            # Beyond the queue: turned away at once
+            with self.assertRaises(ChatRejected) as rejected:
+                async with client._slot():
+                    pass
+            self.assertEqual(rejected.exception.reason, 'busy')
+
+            # The queued call waits at most CHATBOT_QUEUE_TIMEOUT for the slot
+            with self.assertRaises(ChatRejected):
+                await queued
+            self.assertEqual(client.waiting, 0)
+
+            release.set()
+            await running
+            self.assertEqual(client.counters['overloaded'], 2)
+            self.assertEqual((client.in_flight, client.breaker.failures), (0, 0))
+        finally:
+            await client.aclose()
+
+
+class LeasedStreamTests(SimpleTestCase):
+    """The admission lease is handed back however the stream ends."""
+
+    def setUp(self):
+        self.user_id = uuid.uuid4().hex
+        self.request = RequestFactory().post('/api/v1/chat/stream/')
+
+    @asynccontextmanager
+    async def admission(self):
+        client = ChatServiceClient()
+        try:
+            yield client.admission
+        finally:
+            await client.redis.delete(
+                ChatAdmission.in_flight_key(self.user_id), ChatAdmission.bucket_key(self.user_id)
+            )
+            await client.aclose()
+
+    async def in_flight(self, admission):
+        return await admission.redis.zcard(ChatAdmission.in_flight_key(self.user_id))
+
+    async def stream(self, admission, events):
+        lease = await admission.acquire(self.user_id)
+        return LeasedStream(self.request, events, self.user_id, lease)
+
+    async def test_released_when_events_run_out(self):
+        async def events():
+            yield b'a'
+            yield b'b'
+
+        async with self.admission() as admission:
+            stream = await self.stream(admission, events())
+            self.assertEqual([chunk async for chunk in stream], [b'a', b'b'])
+            self.assertEqual(await self.in_flight(admission), 0)
+            self.assertIsNone(stream.lease)
+
+    async def test_released_when_events_fail(self):
+        async def events():
+            yield b'a'
+            raise ValueError
+
+        async with self.admission() as admission:
+            stream = await self.stream(admission, events())
+            with self.assertRaises(ValueError):
+                async for _ in stream:
+                    self.assertEqual(await self.in_flight(admission), 1)
+            self.assertEqual(await self.in_flight(admission), 0)
+
+    async def test_released_when_the_client_disconnects(self):
+        started = asyncio.Event()
+
+        async def events():
+            yield b'a'
+            started.set()
+            await asyncio.Event().wait()
+            yield b'never'
+
+        async def consume(stream):
+            async for _ in stream:
+                pass
+
+        async with self.admission() as admission:
+            # Midway: the ASGI handler cancels the task feeding the response...
+            task = asyncio.create_task(consume(await self.stream(admission, events())))
+            await started.wait()
+            self.assertEqual(await self.in_flight(admission), 1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertEqual(await self.in_flight(admission), 0)
+
+            # ...and before the first chunk, Django closes the response
+            stream = await self.stream(admission, events())
+            self.assertEqual(await self.in_flight(admission), 1)
+            await sync_to_async(stream.close)()
+            self.assertEqual(await self.in_flight(admission), 0)
+
+    async def test_lease_is_renewed_while_streaming(self):
+        async def events():
+            for _ in range(3):
+                yield b'a'
+
+        async with self.admission() as admission:
+            stream = await self.stream(admission, events())
+            lease = stream.lease
+            stream.renewed_at -= LeasedStream.RENEW_INTERVAL
+            with mock.patch.object(ChatAdmission, 'renew') as renew:
+                async for _ in stream:
+                    pass
+            renew.assert_awaited_once_with(self.user_id, lease)
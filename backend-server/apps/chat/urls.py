@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('', views.ChatbotView.as_view(), name='chatbot'),
+    path('stream/', views.ChatbotStreamView.as_view(), name='chatbot-stream'),
 ]
@@ -1,36 +1,217 @@
-import requests
-from rest_framework import status
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+import json
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
 from django.conf import settings
-from drf_spectacular.utils import extend_schema
+from django.http import JsonResponse, StreamingHttpResponse
+from drf_spectacular.utils import OpenApiResponse, OpenApiTypes, extend_schema
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 
+from .admission import ChatRejected, rejected_response
+from .client import ChatServiceError, ChatServiceUnavailable, chat_client
 from .serializers import ChatMessageSerializer, ChatResponseSerializer
 
+FALLBACK_REPLY = (
+    'Our AI assistant is currently unavailable. '
+    'Please contact support at support@scan2home.com or try again later.'
+)
 
-class ChatbotView(APIView):
-    permission_classes = [IsAuthenticated]
 
-    @extend_schema(request=ChatMessageSerializer, responses=ChatResponseSerializer, tags=['Chat'])
-    def post(self, request):
-        serializer = ChatMessageSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        message = serializer.validated_data['message'].strip()
+def sse(data, event=None):
+    prefix = f'event: {event}\n' if event else ''
+    return f'{prefix}data: {json.dumps(data)}\n\n'.encode()
+
+
+class LeasedStream:
+    """
+    Async iterator over `events` that holds an admission lease and hands it
+    back once: when the events run out or fail, or when the response is closed
+    (Django registers `close` as a resource closer), which also covers a client
+    that disconnects before the stream starts. While events keep coming the
+    lease is renewed every RENEW_INTERVAL seconds, so a long stream doesn't
+    outlive it and let the user's in-flight limit be exceeded.
+    """
+    RENEW_INTERVAL = 5
+
+    def __init__(self, request, events, user_id, lease):
+        self.request = request
+        self.events = events
+        self.user_id = user_id
+        self.lease = lease
+        self.renewed_at = time.monotonic()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            chunk = await self.events.__anext__()
+        except BaseException:
+            await self.aclose()
+            raise
+        if self.lease is not None and time.monotonic() - self.renewed_at >= self.RENEW_INTERVAL:
+            self.renewed_at = time.monotonic()
+            async with chat_client(self.request) as client:
+                await client.admission.renew(self.user_id, self.lease)
+        return chunk
+
+    async def aclose(self):
+        await self.events.aclose()
+        lease, self.lease = self.lease, None
+        if lease is not None:
+            async with chat_client(self.request) as client:
+                await client.admission.release(self.user_id, lease)
+
+    def close(self):
+        if self.lease is not None:
+            async_to_sync(self.aclose)()
+
+
+class FirstRendererNegotiation(BaseContentNegotiation):
+    """Errors are always JSON, whatever the client accepts (e.g. text/event-stream)."""
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose handlers are coroutines (DRF itself is sync-only). The usual
+    authentication, permission and throttle checks run in a thread, then the
+    handler is awaited on the event loop; DRF exceptions become the usual
+    error responses.
+    """
+    content_negotiation_class = FirstRendererNegotiation
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
 
         try:
-            response = requests.post(
-                settings.CHATBOT_SERVICE_URL,
-                json={'message': message, 'user_id': str(request.user.id)},
-                timeout=35,
-            )
-            response.raise_for_status()
-            return Response(response.json())
-        except requests.exceptions.ConnectionError:
-            # Fallback FAQ response
-            return Response({
-                'reply': 'Our AI assistant is currently unavailable. Please contact support at support@scan2home.com or try again later.',
-                'fallback': True,
-            })
-        except requests.exceptions.RequestException as e:
-            return Response({'error': str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            method = request.method.lower()
+            if method not in self.http_method_names or not hasattr(self, method):
+                raise MethodNotAllowed(request.method)
+            response = await getattr(self, method)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        return self.finalize_response(request, response, *args, **kwargs)
+
+
+def parse_chat_request(request):
+    """
+    Returns (ai-server payload, None), or (None, error response). Only the new
+    message and the conversation id are sent; the ai-server keeps the history.
+    """
+    serializer = ChatMessageSerializer(data=request.data)
+    if not serializer.is_valid():
+        return None, JsonResponse(serializer.errors, status=400)
+
+    payload = {'message': serializer.validated_data['message'].strip(), 'user_id': str(request.user.id)}
+    if 'conversation_id' in serializer.validated_data:
+        payload['conversation_id'] = str(serializer.validated_data['conversation_id'])
+    return payload, None
+
+
+class ChatbotView(AsyncAPIView):
+    """
+    Async proxy to the ai-server.
+
+    Runs on the ASGI workers (`asgi` service) so a slow LLM reply only holds
+    an await, not a gunicorn worker; all requests on a worker share one
+    keep-alive pool, concurrency limit and circuit breaker (see ChatServiceClient).
+    Still works under WSGI, with a short-lived client per request (see
+    chat_client). Requests over the
+    per-user or per-worker limits get a 429 with Retry-After (see ChatAdmission).
+    """
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['post']
+
+    @extend_schema(
+        request=ChatMessageSerializer,
+        responses={200: ChatResponseSerializer, 429: OpenApiResponse(description='Too many chat requests (see Retry-After)')},
+        tags=['Chat'],
+    )
+    async def post(self, request):
+        payload, error = parse_chat_request(request)
+        if error:
+            return error
+
+        async with chat_client(request) as client:
+            try:
+                async with client.admission.admit(payload['user_id']):
+                    reply = await client.post(settings.CHATBOT_SERVICE_URL, payload)
+            except ChatRejected as e:
+                return rejected_response(e)
+            except ChatServiceUnavailable:
+                # Fallback FAQ response
+                return JsonResponse({'reply': FALLBACK_REPLY, 'fallback': True})
+            except ChatServiceError as e:
+                return JsonResponse({'error': str(e)}, status=502)
+        return JsonResponse(reply)
+
+
+class ChatbotStreamView(AsyncAPIView):
+    """
+    Streaming variant of ChatbotView (Server-Sent Events).
+
+    Relays the ai-server's /chat/stream as-is: `data: {"token": ...}` events
+    followed by `event: done` with the full `reply`. If the ai-server is down
+    the stream is a single `done` event with the fallback reply; a failure
+    midway ends it with `event: error`. Requests over the admission limits get
+    a 429 with Retry-After before the stream starts.
+    """
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['post']
+
+    @extend_schema(
+        request=ChatMessageSerializer,
+        responses={
+            (200, 'text/event-stream'): OpenApiResponse(
+                OpenApiTypes.STR, description='`data: {"token": ...}` events, then `event: done` with the full reply'
+            ),
+            429: OpenApiResponse(description='Too many chat requests (see Retry-After)'),
+        },
+        tags=['Chat'],
+    )
+    async def post(self, request):
+        payload, error = parse_chat_request(request)
+        if error:
+            return error
+
+        # Admit before the 200 goes out so a rejection is still a plain 429.
+        async with chat_client(request) as client:
+            try:
+                if client.queue_full:
+                    raise ChatRejected('busy', 1)
+                lease = await client.admission.acquire(payload['user_id'])
+            except ChatRejected as e:
+                return rejected_response(e)
+
+        # Under WSGI the body is consumed on another event loop, hence a client of its own
+        async def events():
+            async with chat_client(request) as client:
+                try:
+                    async for chunk in client.stream(settings.CHATBOT_STREAM_URL, payload):
+                        yield chunk
+                except ChatRejected as e:
+                    yield sse({'error': 'Too many chat requests.', 'reason': e.reason, 'retry_after': e.retry_after}, event='error')
+                except ChatServiceUnavailable:
+                    yield sse({'reply': FALLBACK_REPLY, 'fallback': True}, event='done')
+                except ChatServiceError as e:
+                    yield sse({'error': str(e)}, event='error')
+
+        return StreamingHttpResponse(
+            LeasedStream(request, events(), payload['user_id'], lease),
+            content_type='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
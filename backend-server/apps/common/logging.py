@@ -0,0 +1,96 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any `extra=` fields."""
+
+    def format(self, record):
+        line = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                line[key] = value
+        if record.exc_info:
+            line['exc'] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+
+class BackgroundHandler(QueueHandler):
+    """
+    Hands records to a QueueListener thread that formats and writes them with
+    `targets`, so file I/O and rotation stay off the request thread (see
+    write_in_background).
+
+    The queue is bounded: when the writer can't keep up, records are dropped
+    (and counted in `dropped`) rather than blocking requests. The listener is
+    started on first use in each process, so it survives gunicorn's fork.
+    """
+
+    def __init__(self, targets, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.targets = list(targets)
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+            atexit.register(self._listener.stop)
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def write_in_background(logger_name, maxsize=10000):
+    """
+    Move the handlers LOGGING gave `logger_name` behind a BackgroundHandler.
+    Calling it again is a no-op. See start_background_logging.
+    """
+    logger = logging.getLogger(logger_name)
+    targets = list(logger.handlers)
+    if not targets or any(isinstance(handler, BackgroundHandler) for handler in targets):
+        return
+    for handler in targets:
+        logger.removeHandler(handler)
+    logger.addHandler(BackgroundHandler(targets, maxsize))
+
+
+def start_background_logging():
+    """
+    Put every logger in settings.BACKGROUND_LOGGERS behind a BackgroundHandler.
+    The one place the queue listeners are set up; called from
+    AccountsConfig.ready(), once LOGGING has been applied.
+    """
+    from django.conf import settings
+
+    for logger_name, maxsize in settings.BACKGROUND_LOGGERS.items():
+        write_in_background(logger_name, maxsize)
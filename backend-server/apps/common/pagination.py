@@ -0,0 +1,238 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Row count for `queryset` taken from the PostgreSQL planner instead of a
+    full COUNT(*). Falls back to an exact count on other backends.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over a fixed, unique ordering.
+
+    Each page is fetched with a `WHERE (a, b) < (x, y) ORDER BY a, b LIMIT n`
+    style query, so page N costs the same as page 1 and only one page of rows
+    is ever loaded. Cursors are opaque, URL-safe tokens holding the ordering
+    values of the row at the edge of the current page.
+
+    Subclasses declare the allowed orderings; the last field of every ordering
+    must be unique (usually `id`) so that rows never tie.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    count_query_param = 'count'
+
+    orderings = {
+        'newest': ('-created_at', '-id'),
+    }
+    default_ordering = 'newest'
+
+    # In "estimate" mode, results smaller than this are counted exactly.
+    exact_count_threshold = 1000
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.available_orderings = self.get_orderings(queryset)
+        self.ordering_key, ordering = self.get_ordering(request)
+        self.model = queryset.model
+
+        cursor = self.decode_cursor(request)
+        self.count, self.count_is_estimate = self.get_count(queryset, request)
+
+        reverse = bool(cursor and cursor['reverse'])
+        if reverse:
+            ordering = self._invert(ordering)
+        if cursor:
+            queryset = queryset.filter(self._seek_filter(ordering, cursor['position']))
+
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if cursor is None:
+            has_next, has_previous = has_more, False
+        elif not reverse:
+            has_next, has_previous = has_more, True
+        else:
+            has_next, has_previous = True, has_more
+
+        self.next_position = self._position(results[-1]) if has_next and results else None
+        self.previous_position = self._position(results[0]) if has_previous and results else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_is_estimate', self.count_is_estimate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'count_is_estimate': {'type': 'boolean'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # ── Request parsing ───────────────────────────────────────
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_orderings(self, queryset):
+        """Orderings allowed for `queryset` (hook for annotation-based sorts)."""
+        return self.orderings
+
+    def get_default_ordering(self):
+        return self.default_ordering
+
+    def get_ordering(self, request):
+        key = request.query_params.get(self.ordering_query_param)
+        if key not in self.available_orderings:
+            key = self.get_default_ordering()
+        return key, self.available_orderings[key]
+
+    def get_count(self, queryset, request):
+        """Returns (count, is_estimate). `?count=exact|estimate|none`."""
+        mode = request.query_params.get(self.count_query_param, 'estimate')
+        if mode == 'none':
+            return None, False
+        if mode == 'exact':
+            return queryset.count(), False
+
+        estimate = estimate_count(queryset)
+        if estimate < self.exact_count_threshold:
+            return queryset.count(), False
+        return estimate, True
+
+    # ── Cursors ───────────────────────────────────────────────
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if data['o'] != self.ordering_key:
+                raise ValueError('ordering mismatch')
+            names = self._field_names(self.available_orderings[self.ordering_key])
+            if len(data['p']) != len(names):
+                raise ValueError('position length mismatch')
+            position = [self._decode_value(name, value) for name, value in zip(names, data['p'])]
+        except (TypeError, ValueError, KeyError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return {'position': position, 'reverse': bool(data.get('r'))}
+
+    def encode_cursor(self, position, reverse):
+        data = {'o': self.ordering_key, 'p': position}
+        if reverse:
+            data['r'] = 1
+        raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        encoded = base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    # ── Internals ─────────────────────────────────────────────
+
+    @staticmethod
+    def _field_names(ordering):
+        return [field.lstrip('-') for field in ordering]
+
+    @staticmethod
+    def _invert(ordering):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+    @staticmethod
+    def _seek_filter(ordering, position):
+        """Rows strictly after `position` in `ordering` (row-value comparison)."""
+        names = KeysetPagination._field_names(ordering)
+        seek = Q()
+        for i, field in enumerate(ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition = Q(**{f'{names[i]}__{lookup}': position[i]})
+            for name, value in zip(names[:i], position[:i]):
+                condition &= Q(**{name: value})
+            seek |= condition
+
+        # Redundant bound on the leading column so the planner can range-scan the index.
+        lead_lookup = 'lte' if ordering[0].startswith('-') else 'gte'
+        return Q(**{f'{names[0]}__{lead_lookup}': position[0]}) & seek
+
+    def _model_field(self, name):
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def _position(self, obj):
+        position = []
+        for name in self._field_names(self.available_orderings[self.ordering_key]):
+            field = self._model_field(name)
+            if field is not None:
+                position.append(field.value_to_string(obj))
+            else:
+                # Annotated values (rank, distance, ...) are plain numbers.
+                position.append(getattr(obj, name))
+        return position
+
+    def _decode_value(self, name, value):
+        field = self._model_field(name)
+        if field is not None:
+            return field.to_python(value)
+        if not isinstance(value, (int, float, str)):
+            raise ValueError(f'Unsupported cursor value for {name}')
+        return value
@@ -0,0 +1,33 @@
+import redis
+from django.conf import settings
+
+_client = None
+
+
+def get_redis():
+    """Process-wide Redis client; every caller shares its connection pool."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _client
+
+
+def claim(client, key):
+    """
+    Atomically move a write-behind buffer aside for flushing; returns the key
+    to read, or None if nothing is buffered.
+    """
+    flushing = f'{key}:flushing'
+    # A batch left behind by a failed flush is retried before taking a new one
+    if client.exists(flushing):
+        return flushing
+    try:
+        client.rename(key, flushing)
+    except redis.ResponseError:  # nothing buffered
+        return None
+    return flushing
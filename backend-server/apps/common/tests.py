@@ -0,0 +1,168 @@
+import atexit
+import base64
+import json
+import logging
+import os
+import sys
+from decimal import Decimal
+from urllib.parse import parse_qsl, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.properties.models import Property
+
+from .logging import BackgroundHandler, JSONFormatter, write_in_background
+from .pagination import KeysetPagination
+
+
+class PricePagination(KeysetPagination):
+    page_size = 3
+    orderings = {
+        'newest': ('-created_at', '-id'),
+        'price_asc': ('price', 'id'),
+    }
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        agent = get_user_model().objects.create_user('agent@example.com', full_name='Agent', role='agent')
+        # Prices and creation times repeat, so only `id` tells rows apart
+        for i in range(8):
+            Property.objects.create(agent=agent, title=f'Home {i}', price=Decimal(100 * (i % 3)), address='x')
+        now = timezone.now()
+        for i, pk in enumerate(Property.objects.values_list('pk', flat=True)):
+            Property.objects.filter(pk=pk).update(created_at=now - timezone.timedelta(days=i % 2))
+
+    def paginate(self, params=None, paginator_class=PricePagination):
+        paginator = paginator_class()
+        request = Request(APIRequestFactory().get('/properties/', params or {}))
+        page = paginator.paginate_queryset(Property.objects.all(), request)
+        return paginator, [prop.pk for prop in page]
+
+    @staticmethod
+    def params(link):
+        return dict(parse_qsl(urlsplit(link).query))
+
+    def walk(self, ordering):
+        """Every page forwards, then back again from the last one."""
+        forward, pages = [], []
+        paginator, page = self.paginate({'ordering': ordering})
+        self.assertIsNone(paginator.get_previous_link())
+        while True:
+            pages.append(page)
+            forward += page
+            link = paginator.get_next_link()
+            if link is None:
+                break
+            paginator, page = self.paginate(self.params(link))
+
+        backward = [page]
+        while (link := paginator.get_previous_link()) is not None:
+            paginator, page = self.paginate(self.params(link))
+            backward.append(page)
+        self.assertEqual(backward, pages[::-1])
+        return forward
+
+    def test_traversal_follows_each_ordering(self):
+        for key, ordering in PricePagination.orderings.items():
+            with self.subTest(ordering=key):
+                expected = list(Property.objects.order_by(*ordering).values_list('pk', flat=True))
+                self.assertEqual(self.walk(key), expected)
+
+    def test_ties_are_broken_on_id(self):
+        Property.objects.update(price=1, created_at=timezone.now())
+        forward = self.walk('price_asc')
+        self.assertEqual(forward, sorted(forward))
+        self.assertEqual(len(forward), 8)
+
+    def test_bad_cursors_are_not_found(self):
+        paginator, _ = self.paginate({'ordering': 'price_asc'})
+        cursor = self.params(paginator.get_next_link())['cursor']
+
+        tampered = base64.urlsafe_b64encode(json.dumps({'o': 'price_asc', 'p': ['x']}).encode()).decode()
+        for params in (
+            {'cursor': 'not-a-cursor'},
+            {'cursor': tampered},
+            {'cursor': cursor[:-2]},
+            {'cursor': cursor, 'ordering': 'newest'},  # issued for another ordering
+        ):
+            with self.subTest(params=params), self.assertRaises(NotFound):
+                self.paginate(params)
+
+    def test_count_modes(self):
+        paginator, _ = self.paginate({'count': 'exact'})
+        self.assertEqual((paginator.count, paginator.count_is_estimate), (8, False))
+
+        paginator, _ = self.paginate({'count': 'none'})
+        self.assertEqual((paginator.count, paginator.count_is_estimate), (None, False))
+
+        # Small results are counted exactly even in estimate mode
+        paginator, _ = self.paginate()
+        self.assertEqual((paginator.count, paginator.count_is_estimate), (8, False))
+
+        class EstimatingPagination(PricePagination):
+            exact_count_threshold = 0
+
+        paginator, _ = self.paginate(paginator_class=EstimatingPagination)
+        self.assertTrue(paginator.count_is_estimate)
+        self.assertIsInstance(paginator.count, int)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+class LoggingTests(TestCase):
+    def test_json_formatter_fields(self):
+        record = logging.makeLogRecord({
+            'name': 'request', 'levelno': logging.INFO, 'levelname': 'INFO', 'msg': 'request %s', 'args': ('done',),
+            'created': 0, 'route': 'qr-scan-redirect', 'when': timezone.now(),
+        })
+        line = json.loads(JSONFormatter().format(record))
+        self.assertEqual(line['ts'], '1970-01-01T00:00:00.000+00:00')
+        self.assertEqual((line['level'], line['logger'], line['msg']), ('INFO', 'request', 'request done'))
+        # `extra=` fields are kept, non-JSON values as strings
+        self.assertEqual(line['route'], 'qr-scan-redirect')
+        self.assertIsInstance(line['when'], str)
+        self.assertNotIn('exc', line)
+        self.assertFalse({'args', 'levelno', 'pathname', 'thread'} & set(line))
+
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record.exc_info = sys.exc_info()
+        self.assertIn('ValueError: boom', json.loads(JSONFormatter().format(record))['exc'])
+
+    def test_handlers_are_moved_behind_a_queue(self):
+        logger = logging.getLogger('tests.background')
+        target = ListHandler()
+        target.setFormatter(JSONFormatter())
+        logger.addHandler(target)
+        self.addCleanup(logger.handlers.clear)
+
+        write_in_background('tests.background', maxsize=10)
+        write_in_background('tests.background', maxsize=10)  # no-op
+        [handler] = logger.handlers
+        self.assertIsInstance(handler, BackgroundHandler)
+
+        logger.warning('one', extra={'n': 1})
+        handler._listener.stop()  # drains the queue
+        atexit.unregister(handler._listener.stop)
+        self.assertEqual([json.loads(line)['n'] for line in target.lines], [1])
+
+    def test_full_queue_drops_records(self):
+        handler = BackgroundHandler([ListHandler()], maxsize=1)
+        handler._pid = os.getpid()  # listener not started: nothing drains the queue
+        for _ in range(3):
+            handler.handle(logging.makeLogRecord({'msg': 'x'}))
+        self.assertEqual(handler.dropped, 2)
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+import redis
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from apps.common.redis import get_redis
+from .models import NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def notification_payload(notif):
+    return {
+        'id': str(notif.id),
+        'title': notif.title,
+        'body': notif.body,
+        'notification_type': notif.notification_type,
+        'event_count': notif.event_count,
+        'is_read': notif.is_read,
+        'created_at': notif.created_at.isoformat(),
+        'updated_at': notif.updated_at.isoformat(),
+    }
+
+
+class NotificationDispatcher:
+    """
+    Drains `NotificationOutbox` to the channel layer.
+
+    Batches are claimed with `SELECT ... FOR UPDATE SKIP LOCKED`, so several
+    dispatchers can run side by side. All pushes go through one long-lived
+    event loop, and therefore one channel-layer connection pool. Failed pushes
+    are retried with exponential backoff; after `max_attempts` they are dropped
+    (the notification itself is still in the user's feed).
+    """
+    STATS_KEY = 'notifications:dispatch:stats'
+
+    def __init__(self, batch_size=100, max_attempts=8, max_backoff=300):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.loop = asyncio.new_event_loop()
+        self.layer = get_channel_layer()
+
+    def close(self):
+        self.loop.close()
+
+    def dispatch_batch(self):
+        """Push one batch. Returns the number of outbox entries handled."""
+        started = time.monotonic()
+        now = timezone.now()
+        with transaction.atomic():
+            entries = list(
+                NotificationOutbox.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('notification')
+                .filter(available_at__lte=now)
+                .order_by('available_at', 'id')[:self.batch_size]
+            )
+            if not entries:
+                return 0
+
+            # Several pending entries for one notification (e.g. a coalesced
+            # scan notification updated twice) need only one push of its latest state
+            by_notification = {}
+            for entry in entries:
+                by_notification.setdefault(entry.notification_id, []).append(entry)
+            notifications = [group[0].notification for group in by_notification.values()]
+            results = self.loop.run_until_complete(self._send_all(notifications))
+
+            sent, retry, dropped = [], [], []
+            for notif, error in zip(notifications, results):
+                group = by_notification[notif.id]
+                if error is None:
+                    sent += group
+                    continue
+                for entry in group:
+                    entry.attempts += 1
+                    entry.last_error = repr(error)[:1000]
+                    if entry.attempts >= self.max_attempts:
+                        dropped.append(entry)
+                    else:
+                        entry.available_at = now + timedelta(seconds=self._backoff(entry.attempts))
+                        retry.append(entry)
+
+            NotificationOutbox.objects.filter(id__in=[entry.id for entry in sent + dropped]).delete()
+            NotificationOutbox.objects.bulk_update(retry, ['attempts', 'last_error', 'available_at'])
+
+        for entry in dropped:
+            logger.error(
+                f"Giving up on WebSocket push for notification {entry.notification_id} "
+                f"after {entry.attempts} attempts: {entry.last_error}"
+            )
+        finished = timezone.now()
+        latencies = [(finished - entry.enqueued_at).total_seconds() * 1000 for entry in sent]
+        self._record_stats(len(sent), len(retry), len(dropped), latencies, time.monotonic() - started)
+        return len(entries)
+
+    def _backoff(self, attempts):
+        return min(2 ** attempts, self.max_backoff)
+
+    async def _send_all(self, notifications):
+        results = await asyncio.gather(
+            *(
+                self.layer.group_send(
+                    f'notifications_{notif.user_id}',
+                    {'type': 'notification_message', 'data': notification_payload(notif)},
+                )
+                for notif in notifications
+            ),
+            return_exceptions=True,
+        )
+        return [result if isinstance(result, BaseException) else None for result in results]
+
+    def _record_stats(self, sent, retried, dropped, latencies, duration):
+        stats = {
+            'last_batch_at': timezone.now().isoformat(),
+            'last_batch_sent': sent,
+            'last_batch_duration_ms': round(duration * 1000, 1),
+        }
+        if latencies:
+            stats['last_latency_avg_ms'] = round(sum(latencies) / len(latencies), 1)
+            stats['last_latency_max_ms'] = round(max(latencies), 1)
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.hset(self.STATS_KEY, mapping=stats)
+            pipe.hincrby(self.STATS_KEY, 'sent_total', sent)
+            pipe.hincrby(self.STATS_KEY, 'retried_total', retried)
+            pipe.hincrby(self.STATS_KEY, 'dropped_total', dropped)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not record dispatch stats: {str(e)}")
+
+    @staticmethod
+    def metrics():
+        """Queue depth from the outbox table plus the dispatcher's own counters."""
+        queue = NotificationOutbox.objects.aggregate(
+            depth=Count('id'),
+            retrying=Count('id', filter=Q(attempts__gt=0)),
+            oldest=Min('enqueued_at'),
+        )
+        oldest = queue['oldest']
+        data = {
+            'queue_depth': queue['depth'],
+            'retrying': queue['retrying'],
+            'oldest_pending_seconds': round((timezone.now() - oldest).total_seconds(), 1) if oldest else 0,
+        }
+        try:
+            data['dispatcher'] = get_redis().hgetall(NotificationDispatcher.STATS_KEY)
+        except redis.RedisError:
+            data['dispatcher'] = None
+        return data
@@ -0,0 +1,44 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.notifications.dispatcher import NotificationDispatcher
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Delivers queued notifications (NotificationOutbox) over WebSocket'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Seconds to wait when the outbox is empty; 0 drains once and exits',
+        )
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=8)
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        dispatcher = NotificationDispatcher(
+            batch_size=options['batch_size'], max_attempts=options['max_attempts']
+        )
+        try:
+            while True:
+                try:
+                    # Keep going while batches come back full
+                    while dispatcher.dispatch_batch() == dispatcher.batch_size:
+                        pass
+                except Exception:
+                    if not interval:
+                        raise
+                    logger.exception('Notification dispatch failed; retrying next interval')
+
+                if not interval:
+                    break
+                time.sleep(interval)
+                close_old_connections()
+        finally:
+            dispatcher.close()
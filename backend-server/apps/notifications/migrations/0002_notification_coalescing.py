@@ -0,0 +1,61 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="notification",
+            options={"ordering": ["-updated_at"]},
+        ),
+        migrations.AlterField(
+            model_name="notification",
+            name="notification_type",
+            field=models.CharField(
+                choices=[
+                    ("qr_scan", "QR Scan"),
+                    ("offer", "Offer"),
+                    ("booking", "Booking"),
+                    ("property", "Property"),
+                    ("system", "System"),
+                ],
+                default="system",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="event_count",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="group_key",
+            field=models.CharField(blank=True, default="", max_length=100),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(
+            "UPDATE notifications SET updated_at = created_at",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("group_key", ""), _negated=True),
+                fields=["group_key", "-created_at"],
+                name="notif_group_key_idx",
+            ),
+        ),
+    ]
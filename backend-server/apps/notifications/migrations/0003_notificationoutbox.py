@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0002_notification_coalescing"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationOutbox",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("enqueued_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "available_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True)),
+                (
+                    "notification",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outbox_entries",
+                        to="notifications.notification",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "notification_outbox",
+                "indexes": [
+                    models.Index(
+                        fields=["available_at", "id"], name="notif_outbox_available_idx"
+                    )
+                ],
+            },
+        ),
+    ]
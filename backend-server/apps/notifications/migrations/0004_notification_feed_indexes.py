@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0003_notificationoutbox"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "-updated_at", "-id"], name="notif_user_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "is_read", "-created_at"],
+                name="notif_user_read_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0004_notification_feed_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="notification",
+            options={"ordering": ["-created_at"]},
+        ),
+        migrations.RemoveIndex(
+            model_name="notification",
+            name="notif_user_updated_idx",
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="notif_user_created_idx"
+            ),
+        ),
+    ]
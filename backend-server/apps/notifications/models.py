@@ -1,6 +1,9 @@
 import uuid
 from django.db import models
 from django.conf import settings
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
 
 
 class NotificationType(models.TextChoices):
@@ -20,16 +23,51 @@ class Notification(models.Model):
     body = models.TextField()
     notification_type = models.CharField(max_length=20, choices=NotificationType.choices, default=NotificationType.SYSTEM)
     is_read = models.BooleanField(default=False)
+    # Coalesced notifications (e.g. QR scans) share a group key and are
+    # updated in place while their window is open; see NotificationService.coalesce
+    group_key = models.CharField(max_length=100, blank=True, default='')
+    event_count = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'notifications'
         ordering = ['-created_at']
+        indexes = [
+            # Feed pages (keyset on created_at, id) and unread filtering / counting
+            models.Index(fields=['user', '-created_at', '-id'], name='notif_user_created_idx'),
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_read_created_idx'),
+            models.Index(
+                fields=['group_key', '-created_at'], name='notif_group_key_idx',
+                condition=~models.Q(group_key=''),
+            ),
+        ]
 
     def __str__(self):
         return f'Notif for {self.user.email}: {self.title}'
 
 
+
+class NotificationOutbox(models.Model):
+    """
+    Pending WebSocket push for a notification, written in the same transaction
+    as the notification itself and drained by `manage.py dispatch_notifications`.
+    """
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='outbox_entries')
+    enqueued_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)  # pushed back on retry
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        db_table = 'notification_outbox'
+        indexes = [
+            models.Index(fields=['available_at', 'id'], name='notif_outbox_available_idx'),
+        ]
+
+    def __str__(self):
+        return f'Outbox entry for {self.notification_id} (attempts={self.attempts})'
+
 class UserNotificationSettings(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notification_settings'
@@ -42,3 +80,12 @@ class UserNotificationSettings(models.Model):
 
     def __str__(self):
         return f'NotifSettings for {self.user.email}'
+
+
+# ── Unread counter ───────────────────────────────────────────
+@receiver(post_delete, sender=Notification)
+def reset_unread_on_delete(sender, instance, **kwargs):
+    # The deleted instance may be stale (read since it was loaded), so drop
+    # the counter and let the next read recount it; deletes are rare
+    from .services import NotificationService
+    NotificationService.reset_unread(instance.user_id)
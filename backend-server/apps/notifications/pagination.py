@@ -0,0 +1,13 @@
+from apps.common.pagination import KeysetPagination
+
+
+class NotificationPagination(KeysetPagination):
+    """
+    Cursor pagination for the notification feed, newest first. Keyed on
+    `created_at` rather than `updated_at`: coalesced notifications are updated
+    in place, and would otherwise jump between pages while the feed is read.
+    """
+    orderings = {
+        'newest': ('-created_at', '-id'),
+    }
+    default_ordering = 'newest'
@@ -5,7 +5,7 @@ from .models import Notification, UserNotificationSettings
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
-        fields = ('id', 'title', 'body', 'notification_type', 'is_read', 'created_at')
+        fields = ('id', 'title', 'body', 'notification_type', 'event_count', 'is_read', 'created_at', 'updated_at')
         read_only_fields = fields
 
 
@@ -13,3 +13,13 @@ class NotificationSettingsSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserNotificationSettings
         fields = ('push_enabled', 'email_enabled')
+
+
+class NotificationMarkReadSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, max_length=500)
+    all = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if not attrs['all'] and not attrs.get('ids'):
+            raise serializers.ValidationError('Provide "ids" or set "all" to true.')
+        return attrs
@@ -1,47 +1,146 @@
-import asyncio
-import threading
-from channels.layers import get_channel_layer
-from .models import Notification
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .models import Notification, NotificationOutbox
+
+logger = logging.getLogger(__name__)
 
 
 class NotificationService:
     @staticmethod
     def create(user, title: str, body: str, notification_type: str = 'system') -> Notification:
-        """Create a DB notification and push it over WebSocket (non-blocking)."""
-        notif = Notification.objects.create(
-            user=user,
-            title=title,
-            body=body,
-            notification_type=notification_type,
-        )
-
-        # Push WS in a daemon thread using its own asyncio event loop
-        # This is safe for Gunicorn sync workers
-        payload = {
-            'id': str(notif.id),
-            'title': notif.title,
-            'body': notif.body,
-            'notification_type': notif.notification_type,
-            'created_at': notif.created_at.isoformat(),
-        }
-        group_name = f'notifications_{user.id}'
-
-        def push():
-            async def _send():
+        """
+        Create a DB notification and queue its WebSocket push in the outbox
+        (same transaction; delivered by `manage.py dispatch_notifications`).
+        `user` may be a user instance or just its id.
+        """
+        user_id = getattr(user, 'pk', user)
+        with transaction.atomic():
+            notif = Notification.objects.create(
+                user_id=user_id,
+                title=title,
+                body=body,
+                notification_type=notification_type,
+            )
+            NotificationOutbox.objects.create(notification=notif)
+        NotificationService.adjust_unread({user_id: 1})
+        return notif
+
+    @staticmethod
+    def coalesce(groups, window: timedelta, notification_type: str = 'system') -> list:
+        """
+        Fold bursts of the same event into one rolling notification per group.
+
+        `groups` maps a group key to a dict with `user_id`, `count` (new events)
+        and a `render(total, since)` callable returning `(title, body)`. A group
+        whose latest notification was opened less than `window` ago has that
+        row updated in place (and marked unread again); otherwise a new one is
+        started. Costs one lookup plus one write per group, however many events.
+        """
+        if not groups:
+            return []
+
+        now = timezone.now()
+        open_notifs = {}
+        for notif in Notification.objects.filter(
+            group_key__in=list(groups), created_at__gte=now - window
+        ).order_by('group_key', '-created_at').distinct('group_key'):
+            open_notifs[notif.group_key] = notif
+
+        to_create = []
+        touched = []
+        became_unread = Counter()
+        with transaction.atomic():
+            for key, group in groups.items():
+                notif = open_notifs.get(key)
+                if notif is None:
+                    title, body = group['render'](group['count'], now)
+                    to_create.append(Notification(
+                        user_id=group['user_id'], title=title, body=body,
+                        notification_type=notification_type, group_key=key, event_count=group['count'],
+                    ))
+                    continue
+
+                if notif.is_read:
+                    became_unread[notif.user_id] += 1
+                notif.event_count += group['count']
+                notif.title, notif.body = group['render'](notif.event_count, notif.created_at)
+                notif.is_read = False
+                notif.save(update_fields=['event_count', 'title', 'body', 'is_read', 'updated_at'])
+                touched.append(notif)
+
+            touched += Notification.objects.bulk_create(to_create)
+            NotificationOutbox.objects.bulk_create([NotificationOutbox(notification=notif) for notif in touched])
+            became_unread.update(notif.user_id for notif in to_create)
+            NotificationService.adjust_unread(became_unread)
+        return touched
+
+    # ── Unread counter ────────────────────────────────────────
+
+    @staticmethod
+    def unread_cache_key(user_id):
+        return f'notifications:unread:{user_id}'
+
+    @staticmethod
+    def unread_count(user_id) -> int:
+        """Per-user unread count, recounted from the DB only on a cache miss."""
+        key = NotificationService.unread_cache_key(user_id)
+        try:
+            count = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Unread counter read failed: {str(e)}")
+            count = None
+        if count is not None and count >= 0:
+            return count
+
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        try:
+            cache.set(key, count, settings.NOTIFICATION_UNREAD_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Unread counter write failed: {str(e)}")
+        return count
+
+    @staticmethod
+    def adjust_unread(deltas):
+        """
+        Apply `{user_id: delta}` to the cached counters once the transaction
+        commits. Missing counters are left alone; the next read recounts them.
+        """
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        def _apply():
+            for user_id, delta in deltas.items():
                 try:
-                    layer = get_channel_layer()
-                    await layer.group_send(
-                        group_name,
-                        {'type': 'notification_message', 'data': payload}
-                    )
-                except Exception:
+                    cache.incr(NotificationService.unread_cache_key(user_id), delta)
+                except ValueError:  # not cached
                     pass
+                except Exception as e:
+                    logger.warning(f"Unread counter update failed: {str(e)}")
+        transaction.on_commit(_apply)
 
+    @staticmethod
+    def reset_unread(user_id):
+        """Drop the cached counter once the transaction commits; the next read recounts it."""
+        def _apply():
             try:
-                asyncio.run(_send())
-            except Exception:
-                pass
-
-        threading.Thread(target=push, daemon=True).start()
+                cache.delete(NotificationService.unread_cache_key(user_id))
+            except Exception as e:
+                logger.warning(f"Unread counter reset failed: {str(e)}")
+        transaction.on_commit(_apply)
 
-        return notif
+    @staticmethod
+    def mark_read(user, ids=None) -> int:
+        """Mark `ids` (or everything) read for `user` in one UPDATE. Returns rows changed."""
+        notifs = Notification.objects.filter(user=user, is_read=False)
+        if ids is not None:
+            notifs = notifs.filter(pk__in=ids)
+        updated = notifs.update(is_read=True)
+        NotificationService.adjust_unread({user.pk: -updated})
+        return updated
@@ -1,3 +1,235 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlsplit
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .dispatcher import NotificationDispatcher
+from .models import Notification, NotificationOutbox
+from .services import NotificationService
+
+User = get_user_model()
+
+
+class RecordingLayer:
+    """Channel layer stand-in that records pushes and fails them for `failing` groups."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.sent = []
+
+    async def group_send(self, group, message):
+        if group in self.failing:
+            raise ConnectionError('channel layer down')
+        self.sent.append((group, message['data']['id']))
+
+
+class DispatcherTestMixin:
+    def make_dispatcher(self, failing=(), **options):
+        dispatcher = NotificationDispatcher(**options)
+        dispatcher.layer = RecordingLayer(failing)
+        self.addCleanup(dispatcher.close)
+        return dispatcher
+
+    def notify(self, user):
+        return NotificationService.create(user, 'Title', 'Body')
+
+
+class NotificationCoalesceTests(TestCase):
+    WINDOW = timedelta(minutes=10)
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice@example.com', full_name='Alice')
+
+    def coalesce(self, count, key='qr_scan:board'):
+        def render(total, since):
+            return f'{total} scans', f'since {since:%H:%M:%S.%f}'
+        groups = {key: {'user_id': self.alice.pk, 'count': count, 'render': render}}
+        with self.captureOnCommitCallbacks(execute=True):
+            return NotificationService.coalesce(groups, self.WINDOW, 'qr_scan')
+
+    def test_events_within_the_window_update_one_row(self):
+        [first] = self.coalesce(2)
+        NotificationService.mark_read(self.alice, [first.pk])
+
+        [second] = self.coalesce(3)
+        self.assertEqual(second.pk, first.pk)
+        notif = Notification.objects.get()
+        self.assertEqual((notif.event_count, notif.title, notif.is_read), (5, '5 scans', False))
+        # Rendered from when the group was opened
+        self.assertEqual(notif.body, f'since {first.created_at:%H:%M:%S.%f}')
+        self.assertEqual(NotificationOutbox.objects.filter(notification=notif).count(), 2)
+
+    def test_events_after_the_window_start_a_new_row(self):
+        [first] = self.coalesce(2)
+        Notification.objects.filter(pk=first.pk).update(created_at=timezone.now() - self.WINDOW - timedelta(seconds=1))
+
+        [second] = self.coalesce(1)
+        self.assertNotEqual(second.pk, first.pk)
+        self.assertEqual(
+            list(Notification.objects.order_by('created_at').values_list('event_count', flat=True)), [2, 1]
+        )
+
+    def test_groups_are_kept_apart(self):
+        self.coalesce(1, key='qr_scan:a')
+        self.coalesce(1, key='qr_scan:b')
+        self.assertEqual(Notification.objects.count(), 2)
+
+
+class NotificationUnreadTests(TestCase):
+    """The cached unread counter and the feed, through the API."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.alice = User.objects.create_user('alice@example.com', full_name='Alice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def notify(self, n=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [NotificationService.create(self.alice, f'Title {i}', 'Body') for i in range(n)]
+
+    def assertUnread(self, n, cached=True):
+        self.assertEqual(Notification.objects.filter(user=self.alice, is_read=False).count(), n)
+        with self.assertNumQueries(0 if cached else 1):
+            response = self.client.get('/api/v1/user/notifications/unread-count/')
+        self.assertEqual(response.data['unread_count'], n)
+
+    def test_counter_follows_every_change(self):
+        self.assertEqual(NotificationService.unread_count(self.alice.pk), 0)  # primes the cache
+        first, second, third, fourth = self.notify(4)
+        self.assertUnread(4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/v1/user/notifications/{first.pk}/read/')
+            self.client.post(f'/api/v1/user/notifications/{first.pk}/read/')  # already read
+        self.assertUnread(3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/user/notifications/read/', {'ids': [str(second.pk)]}, format='json')
+        self.assertEqual(response.data['updated'], 1)
+        self.assertUnread(2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            third.delete()
+            first.delete()  # stale: read since it was loaded
+        self.assertUnread(1, cached=False)  # recounted once
+        self.assertUnread(1)
+
+        self.notify()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/user/notifications/read/', {'all': True}, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        self.assertUnread(0)
+
+    def test_feed_pages_are_stable_under_coalescing(self):
+        now = timezone.now()
+        groups = {}
+        for i in range(5):
+            groups[f'qr_scan:{i}'] = {'user_id': self.alice.pk, 'count': 1, 'render': lambda total, since: ('Scans', str(total))}
+        with self.captureOnCommitCallbacks(execute=True):
+            notifs = NotificationService.coalesce(groups, timedelta(hours=1), 'qr_scan')
+        for i, notif in enumerate(notifs):
+            Notification.objects.filter(pk=notif.pk).update(created_at=now - timedelta(minutes=i))
+        expected = [str(notif.pk) for notif in notifs]
+
+        response = self.client.get('/api/v1/user/notifications/', {'page_size': 2})
+        seen = [item['id'] for item in response.data['results']]
+        # The oldest notification gets another event while the feed is being read
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.coalesce({'qr_scan:4': groups['qr_scan:4']}, timedelta(hours=1), 'qr_scan')
+
+        while response.data['next']:
+            params = dict(parse_qsl(urlsplit(response.data['next']).query))
+            response = self.client.get('/api/v1/user/notifications/', params)
+            seen += [item['id'] for item in response.data['results']]
+        self.assertEqual(seen, expected)
+        self.assertEqual(response.data['results'][-1]['event_count'], 2)
+
+
+class NotificationDispatcherTests(DispatcherTestMixin, TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice@example.com', full_name='Alice')
+        self.bob = User.objects.create_user('bob@example.com', full_name='Bob')
+
+    def test_one_push_per_notification(self):
+        notif = self.notify(self.alice)
+        NotificationOutbox.objects.create(notification=notif)  # updated again before the push
+        other = self.notify(self.bob)
+
+        dispatcher = self.make_dispatcher()
+        self.assertEqual(dispatcher.dispatch_batch(), 3)
+        self.assertCountEqual(dispatcher.layer.sent, [
+            (f'notifications_{self.alice.pk}', str(notif.pk)), (f'notifications_{self.bob.pk}', str(other.pk)),
+        ])
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertEqual(dispatcher.dispatch_batch(), 0)
+
+    def test_failed_push_is_retried_with_backoff(self):
+        notif = self.notify(self.alice)
+        NotificationOutbox.objects.create(notification=notif)
+        self.notify(self.bob)
+        dispatcher = self.make_dispatcher(failing={f'notifications_{self.alice.pk}'}, max_attempts=3)
+
+        before = timezone.now()
+        self.assertEqual(dispatcher.dispatch_batch(), 3)
+        # Both of Alice's entries are kept and pushed back; Bob's push went out
+        entries = list(NotificationOutbox.objects.all())
+        self.assertEqual([(entry.notification_id, entry.attempts) for entry in entries], [(notif.pk, 1)] * 2)
+        for entry in entries:
+            self.assertIn('channel layer down', entry.last_error)
+            self.assertGreaterEqual(entry.available_at, before + timedelta(seconds=2))
+
+        # Not due yet
+        self.assertEqual(dispatcher.dispatch_batch(), 0)
+
+        NotificationOutbox.objects.update(available_at=timezone.now())
+        dispatcher.dispatch_batch()
+        self.assertEqual(set(NotificationOutbox.objects.values_list('attempts', flat=True)), {2})
+        self.assertEqual(dispatcher._backoff(2), 4)
+
+        # Dropped after max_attempts
+        NotificationOutbox.objects.update(available_at=timezone.now())
+        with self.assertLogs('apps.notifications.dispatcher', 'ERROR'):
+            dispatcher.dispatch_batch()
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_backoff_is_capped(self):
+        dispatcher = self.make_dispatcher(max_backoff=60)
+        self.assertEqual([dispatcher._backoff(n) for n in (1, 5, 6, 10)], [2, 32, 60, 60])
+
+
+class NotificationDispatcherLockingTests(DispatcherTestMixin, TransactionTestCase):
+    def test_locked_entries_are_skipped(self):
+        alice = User.objects.create_user('alice@example.com', full_name='Alice')
+        locked = self.notify(alice)
+        free = self.notify(alice)
+
+        # Another dispatcher holds the first entry
+        claimed, done = threading.Event(), threading.Event()
+
+        def hold():
+            try:
+                with transaction.atomic():
+                    list(NotificationOutbox.objects.select_for_update().filter(notification=locked))
+                    claimed.set()
+                    done.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(done.set)
+        self.assertTrue(claimed.wait(10))
+
+        dispatcher = self.make_dispatcher()
+        self.assertEqual(dispatcher.dispatch_batch(), 1)
+        self.assertEqual(dispatcher.layer.sent, [(f'notifications_{alice.pk}', str(free.pk))])
+        self.assertEqual(list(NotificationOutbox.objects.values_list('notification_id', flat=True)), [locked.pk])
@@ -4,5 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.NotificationListView.as_view(), name='notification-list'),
     path('settings/', views.NotificationSettingsView.as_view(), name='notification-settings'),
+    path('unread-count/', views.NotificationUnreadCountView.as_view(), name='notification-unread-count'),
+    path('read/', views.NotificationBulkMarkReadView.as_view(), name='notification-bulk-read'),
     path('<uuid:pk>/read/', views.NotificationMarkReadView.as_view(), name='notification-read'),
 ]
@@ -2,20 +2,45 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from drf_spectacular.utils import extend_schema, OpenApiResponse
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiTypes
 
 from .models import Notification, UserNotificationSettings
-from .serializers import NotificationSerializer, NotificationSettingsSerializer
+from .pagination import NotificationPagination
+from .serializers import NotificationSerializer, NotificationSettingsSerializer, NotificationMarkReadSerializer
+from .services import NotificationService
 
 
 class NotificationListView(APIView):
     permission_classes = [IsAuthenticated]
 
-    @extend_schema(responses=NotificationSerializer(many=True), tags=['Notifications'])
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('is_read', OpenApiTypes.BOOL, description='Only read / unread notifications'),
+            OpenApiParameter('cursor', OpenApiTypes.STR, description='Opaque cursor taken from the `next` / `previous` links'),
+            OpenApiParameter('page_size', OpenApiTypes.INT, description='Results per page (default 20, max 100)'),
+            OpenApiParameter('count', OpenApiTypes.STR, enum=['estimate', 'exact', 'none'], description='How to compute `count` (default estimate)'),
+        ],
+        responses=NotificationSerializer(many=True),
+        tags=['Notifications']
+    )
     def get(self, request):
         notifs = Notification.objects.filter(user=request.user)
-        serializer = NotificationSerializer(notifs, many=True)
-        return Response(serializer.data)
+        is_read = request.query_params.get('is_read')
+        if is_read is not None:
+            notifs = notifs.filter(is_read=is_read.lower() == 'true')
+
+        paginator = NotificationPagination()
+        page = paginator.paginate_queryset(notifs, request, view=self)
+        serializer = NotificationSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class NotificationUnreadCountView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(responses=OpenApiResponse(description="Unread count", response={'type': 'object', 'properties': {'unread_count': {'type': 'integer'}}}), tags=['Notifications'])
+    def get(self, request):
+        return Response({'unread_count': NotificationService.unread_count(request.user.pk)})
 
 
 class NotificationMarkReadView(APIView):
@@ -23,10 +48,27 @@ class NotificationMarkReadView(APIView):
 
     @extend_schema(request=None, responses=OpenApiResponse(description="Marked as read"), tags=['Notifications'])
     def post(self, request, pk):
-        Notification.objects.filter(user=request.user, pk=pk).update(is_read=True)
+        NotificationService.mark_read(request.user, ids=[pk])
         return Response({'message': 'Marked as read.'})
 
 
+class NotificationBulkMarkReadView(APIView):
+    """Mark the given notifications, or all of them, as read in a single UPDATE."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        request=NotificationMarkReadSerializer,
+        responses=OpenApiResponse(description="Marked as read", response={'type': 'object', 'properties': {'message': {'type': 'string'}, 'updated': {'type': 'integer'}}}),
+        tags=['Notifications']
+    )
+    def post(self, request):
+        serializer = NotificationMarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = None if serializer.validated_data['all'] else serializer.validated_data['ids']
+        updated = NotificationService.mark_read(request.user, ids=ids)
+        return Response({'message': 'Marked as read.', 'updated': updated})
+
+
 class NotificationSettingsView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -0,0 +1,110 @@
+import math
+
+from django.db import models
+from django.db.models import FloatField, Func, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 2 * math.pi * EARTH_RADIUS_KM / 360
+DEFAULT_RADIUS_KM = 5
+MAX_RADIUS_KM = 200
+
+
+class LonLatPoint(Func):
+    """PostgreSQL geometric `point(lon, lat)`."""
+    function = 'point'
+    output_field = models.Field()
+
+
+class ContainedIn(Func):
+    """`a <@ b` (geometric containment), usable directly in `.filter()`."""
+    template = '(%(expressions)s)'
+    arg_joiner = ' <@ '
+    output_field = models.BooleanField()
+
+
+def location_point():
+    """The indexed expression (see the GiST index on Property)."""
+    return LonLatPoint(Cast('lon', FloatField()), Cast('lat', FloatField()))
+
+
+def within_bbox(min_lon, min_lat, max_lon, max_lat):
+    box = Func(
+        LonLatPoint(Value(float(min_lon)), Value(float(min_lat))),
+        LonLatPoint(Value(float(max_lon)), Value(float(max_lat))),
+        function='box', output_field=models.Field(),
+    )
+    return ContainedIn(location_point(), box)
+
+
+def distance_km(lat, lon):
+    """Haversine great-circle distance in km from (lat, lon) to each row."""
+    row_lat = Radians(Cast('lat', FloatField()))
+    row_lon = Radians(Cast('lon', FloatField()))
+    origin_lat, origin_lon = math.radians(lat), math.radians(lon)
+
+    a = (
+        Power(Sin((row_lat - Value(origin_lat)) / Value(2.0)), 2)
+        + Value(math.cos(origin_lat)) * Cos(row_lat) * Power(Sin((row_lon - Value(origin_lon)) / Value(2.0)), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(Least(a, Value(1.0))))
+
+
+def radius_bbox(lat, lon, radius_km):
+    """(min_lon, min_lat, max_lon, max_lat) enclosing the circle, for the index pre-filter."""
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = min(180.0, radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)))
+    return (max(lon - dlon, -180.0), max(lat - dlat, -90.0), min(lon + dlon, 180.0), min(lat + dlat, 90.0))
+
+
+def filter_nearby(queryset, lat, lon, radius_km):
+    """Rows within `radius_km` of (lat, lon), annotated with `distance_km`."""
+    return queryset.filter(
+        within_bbox(*radius_bbox(lat, lon, radius_km))
+    ).annotate(
+        distance_km=distance_km(lat, lon)
+    ).filter(distance_km__lte=radius_km)
+
+
+def filter_bbox(queryset, bbox):
+    return queryset.filter(within_bbox(*bbox))
+
+
+def _floats(value, count, name):
+    try:
+        parts = [float(part) for part in value.split(',')]
+    except ValueError:
+        raise ValueError(f'{name} must be {count} comma-separated numbers.')
+    if len(parts) != count or not all(math.isfinite(part) for part in parts):
+        raise ValueError(f'{name} must be {count} comma-separated numbers.')
+    return parts
+
+
+def _check_lat_lon(lat, lon):
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError('Latitude must be within ±90 and longitude within ±180.')
+
+
+def parse_near(value, radius=None):
+    """'51.5,-0.12' + radius_km -> (lat, lon, radius_km)."""
+    lat, lon = _floats(value, 2, 'near')
+    _check_lat_lon(lat, lon)
+    if radius in (None, ''):
+        return lat, lon, DEFAULT_RADIUS_KM
+    try:
+        radius_km = float(radius)
+    except ValueError:
+        raise ValueError('radius_km must be a number.')
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise ValueError(f'radius_km must be between 0 and {MAX_RADIUS_KM}.')
+    return lat, lon, radius_km
+
+
+def parse_bbox(value):
+    """'min_lon,min_lat,max_lon,max_lat' -> tuple of floats."""
+    min_lon, min_lat, max_lon, max_lat = _floats(value, 4, 'bbox')
+    _check_lat_lon(min_lat, min_lon)
+    _check_lat_lon(max_lat, max_lon)
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError('bbox must be min_lon,min_lat,max_lon,max_lat.')
+    return min_lon, min_lat, max_lon, max_lat
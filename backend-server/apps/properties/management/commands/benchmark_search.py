@@ -0,0 +1,109 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from faker import Faker
+
+from apps.properties.models import Property
+from apps.properties.search import search_properties
+from apps.stats.services import StatsService
+
+User = get_user_model()
+fake = Faker('en_GB')
+
+BENCH_AGENT_EMAIL = 'search-benchmark@scan2home.local'
+DEFAULT_TERMS = ['garden', 'kensing', 'modern apartment', 'sw1', 'road', 'charmng', 'zzzz']
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks full-text property search against the legacy icontains filter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Insert this many synthetic approved properties first')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per term and path')
+        parser.add_argument('--terms', nargs='+', default=DEFAULT_TERMS, help='Search terms to time')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the synthetic properties afterwards')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'])
+
+        total = Property.objects.filter(is_approved=True).count()
+        self.stdout.write(f'Approved properties: {total}')
+        self.stdout.write(f"{'Term':<20} | {'icontains ms':>12} | {'rows':>6} | {'search ms':>10} | {'rows':>6} | {'speedup':>7}")
+        self.stdout.write('-' * 78)
+
+        for term in options['terms']:
+            legacy_ms, legacy_rows = self.time_path(self.legacy_page, term, options['repeat'])
+            search_ms, search_rows = self.time_path(self.search_page, term, options['repeat'])
+            speedup = legacy_ms / search_ms if search_ms else 0
+            self.stdout.write(
+                f'{term:<20} | {legacy_ms:>12.2f} | {legacy_rows:>6} | {search_ms:>10.2f} | {search_rows:>6} | {speedup:>6.1f}x'
+            )
+
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(email=BENCH_AGENT_EMAIL).delete()
+            self.stdout.write(self.style.SUCCESS(f'Removed {deleted} synthetic rows.'))
+
+    # The pre-full-text list path: OR-ed icontains, newest first, plus a count.
+    @staticmethod
+    def legacy_page(term):
+        qs = Property.objects.filter(is_approved=True).filter(
+            Q(title__icontains=term) | Q(address__icontains=term) | Q(postcode__icontains=term)
+        )
+        return qs.count(), list(qs.order_by('-created_at', '-id').values_list('id', flat=True)[:20])
+
+    @staticmethod
+    def search_page(term):
+        qs = search_properties(Property.objects.filter(is_approved=True), term)
+        return qs.count(), list(qs.order_by('-search_rank', '-id').values_list('id', flat=True)[:20])
+
+    @staticmethod
+    def time_path(path, term, repeat):
+        path(term)  # warm caches and the plan
+        timings = []
+        rows = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows, _ = path(term)
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings), rows
+
+    def seed(self, count):
+        agent, _ = User.objects.get_or_create(
+            email=BENCH_AGENT_EMAIL,
+            defaults={'full_name': 'Search Benchmark', 'role': 'agent', 'is_active': False},
+        )
+        descriptors = ['Beautiful', 'Stunning', 'Modern', 'Classic', 'Spacious', 'Charming']
+        property_types = ['house', 'apartment', 'villa']
+        batch_size = 5000
+
+        self.stdout.write(f'Seeding {count} synthetic properties...')
+        for offset in range(0, count, batch_size):
+            batch = []
+            for _ in range(min(batch_size, count - offset)):
+                p_type = random.choice(property_types)
+                batch.append(Property(
+                    agent=agent,
+                    title=f'{random.choice(descriptors)} {fake.street_name()} {p_type.capitalize()}',
+                    property_type=p_type,
+                    price=random.randint(150000, 2500000),
+                    address=f'{fake.street_address()}, {fake.city()}',
+                    postcode=fake.postcode(),
+                    description=fake.paragraph(nb_sentences=5),
+                    beds=random.randint(1, 6),
+                    is_approved=True,
+                ))
+            with transaction.atomic():
+                Property.objects.bulk_create(batch)
+                # bulk_create skips the signals that keep the dashboard counters;
+                # the --cleanup cascade delete does go through them.
+                StatsService.record_created(batch)
+            self.stdout.write(f'  {offset + len(batch)}/{count}')
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE properties')
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0002_property_qr_scanned_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                condition=models.Q(("is_approved", True)),
+                fields=["created_at", "id"],
+                name="prop_approved_created_id_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                condition=models.Q(("is_approved", True)),
+                fields=["price", "id"],
+                name="prop_approved_price_id_idx",
+            ),
+        ),
+    ]
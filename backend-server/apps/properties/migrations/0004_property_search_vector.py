@@ -0,0 +1,64 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0003_property_keyset_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="property",
+            name="search_vector",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.contrib.postgres.search.CombinedSearchVector(
+                    django.contrib.postgres.search.CombinedSearchVector(
+                        django.contrib.postgres.search.SearchVector(
+                            "title", config="english", weight="A"
+                        ),
+                        "||",
+                        django.contrib.postgres.search.SearchVector(
+                            "address", "postcode", config="english", weight="B"
+                        ),
+                        django.contrib.postgres.search.SearchConfig("english"),
+                    ),
+                    "||",
+                    django.contrib.postgres.search.SearchVector(
+                        "description", config="english", weight="D"
+                    ),
+                    django.contrib.postgres.search.SearchConfig("english"),
+                ),
+                output_field=django.contrib.postgres.search.SearchVectorField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="prop_search_vector_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"], name="prop_title_trgm_idx", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["address"],
+                name="prop_address_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
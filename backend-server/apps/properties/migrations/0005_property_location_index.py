@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:15
+
+import apps.properties.geo
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0004_property_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="property",
+            index=django.contrib.postgres.indexes.GistIndex(
+                apps.properties.geo.LonLatPoint(
+                    django.db.models.functions.comparison.Cast(
+                        "lon", models.FloatField()
+                    ),
+                    django.db.models.functions.comparison.Cast(
+                        "lat", models.FloatField()
+                    ),
+                ),
+                name="prop_location_gist_idx",
+            ),
+        ),
+    ]
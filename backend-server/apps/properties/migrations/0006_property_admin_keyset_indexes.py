@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0005_property_location_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(fields=["created_at", "id"], name="prop_created_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="property",
+            index=models.Index(
+                condition=models.Q(("is_approved", False)),
+                fields=["created_at", "id"],
+                name="prop_pending_created_id_idx",
+            ),
+        ),
+    ]
@@ -1,7 +1,12 @@
 import uuid
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.conf import settings
 
+from .geo import location_point
+
 
 class PropertyType(models.TextChoices):
     HOUSE = 'house', 'House'
@@ -15,6 +20,57 @@ class PropertyStatus(models.TextChoices):
     SOLD = 'sold', 'Sold'
 
 
+class PropertyQuerySet(models.QuerySet):
+    def with_list_projection(self, user=None):
+        """
+        Annotate everything PropertyListSerializer needs beyond the row itself
+        (cover image, favourite flag, active QR board) as correlated subqueries,
+        so a page of listings is fetched in a single statement.
+        """
+        from apps.qr_boards.models import BoardAssignment
+
+        cover = PropertyImage.objects.filter(property=models.OuterRef('pk')).order_by('-is_cover', 'order')
+        active_board = BoardAssignment.objects.filter(
+            property=models.OuterRef('pk'), is_active=True
+        ).order_by('-assigned_at')
+
+        if user is not None and user.is_authenticated:
+            is_favourited = models.Exists(
+                PropertyFavourite.objects.filter(property=models.OuterRef('pk'), user=user)
+            )
+        else:
+            is_favourited = models.Value(False, output_field=models.BooleanField())
+
+        return self.annotate(
+            list_cover_image=models.Subquery(cover.values('image')[:1]),
+            list_is_favourited=is_favourited,
+            list_board_id=models.Subquery(active_board.values('board_id')[:1]),
+            list_board_qr_code_image=models.Subquery(active_board.values('board__qr_code_image')[:1]),
+            list_board_scan_count=models.Subquery(active_board.values('board__scan_count')[:1]),
+        )
+
+    def with_offer_count(self):
+        """Annotate `offer_count` (offers received) as a correlated subquery, so it can be sorted on."""
+        from apps.offers.models import Offer
+
+        offers = (
+            Offer.objects.filter(property=models.OuterRef('pk'))
+            .order_by().values('property').annotate(n=models.Count('pk')).values('n')
+        )
+        return self.annotate(offer_count=Coalesce(models.Subquery(offers), 0))
+
+    def with_admin_projection(self, user=None):
+        """Everything AdminPropertySerializer needs (list projection, agent, offer count) in one statement."""
+        return self.select_related('agent').with_list_projection(user).with_offer_count()
+
+
+class PropertyManager(models.Manager.from_queryset(PropertyQuerySet)):
+    def get_queryset(self):
+        # The search document is only used inside SQL (see properties/search.py);
+        # don't ship it with every row
+        return super().get_queryset().defer('search_vector')
+
+
 class Property(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     agent = models.ForeignKey(
@@ -51,6 +107,19 @@ class Property(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Weighted full-text document, maintained by PostgreSQL (see properties/search.py)
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config='english')
+            + SearchVector('address', 'postcode', weight='B', config='english')
+            + SearchVector('description', weight='D', config='english')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = PropertyManager()
+
     class Meta:
         db_table = 'properties'
         ordering = ['-created_at']
@@ -59,6 +128,21 @@ class Property(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['price']),
             models.Index(fields=['agent']),
+            # Keyset pagination of the public listing (see PropertyCursorPagination)
+            models.Index(fields=['created_at', 'id'], name='prop_approved_created_id_idx',
+                         condition=models.Q(is_approved=True)),
+            models.Index(fields=['price', 'id'], name='prop_approved_price_id_idx',
+                         condition=models.Q(is_approved=True)),
+            # Keyset pagination of the admin list and its moderation queue (see AdminPropertyCursorPagination)
+            models.Index(fields=['created_at', 'id'], name='prop_created_id_idx'),
+            models.Index(fields=['created_at', 'id'], name='prop_pending_created_id_idx',
+                         condition=models.Q(is_approved=False)),
+            # Full-text search, plus trigram indexes for the typo fallback
+            GinIndex(fields=['search_vector'], name='prop_search_vector_idx'),
+            GinIndex(fields=['title'], name='prop_title_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['address'], name='prop_address_trgm_idx', opclasses=['gin_trgm_ops']),
+            # point(lon, lat) for bbox / radius pre-filtering (see properties/geo.py)
+            GistIndex(location_point(), name='prop_location_gist_idx'),
         ]
 
     def __str__(self):
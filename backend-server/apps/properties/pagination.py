@@ -0,0 +1,33 @@
+from apps.common.pagination import KeysetPagination
+
+
+class PropertyCursorPagination(KeysetPagination):
+    """Cursor pagination for property listings (`?ordering=` picks the sort)."""
+    orderings = {
+        'newest': ('-created_at', '-id'),
+        'oldest': ('created_at', 'id'),
+        'price_asc': ('price', 'id'),
+        'price_desc': ('-price', '-id'),
+    }
+    default_ordering = 'newest'
+
+    # Offered only when the view annotated the leading column; the first
+    # available one becomes the default (nearest first, then best match).
+    annotated_orderings = {
+        'distance': ('distance_km', 'id'),
+        'relevance': ('-search_rank', '-id'),
+    }
+
+    def get_orderings(self, queryset):
+        annotations = queryset.query.annotations
+        available = {
+            key: ordering for key, ordering in self.annotated_orderings.items()
+            if ordering[0].lstrip('-') in annotations
+        }
+        return {**available, **self.orderings}
+
+    def get_default_ordering(self):
+        for key in self.annotated_orderings:
+            if key in self.available_orderings:
+                return key
+        return self.default_ordering
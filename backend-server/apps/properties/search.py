@@ -0,0 +1,44 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast, Greatest
+
+SEARCH_CONFIG = 'english'
+TERM_RE = re.compile(r'[^\W_]+')
+
+
+def build_prefix_query(text):
+    """'3 bed gard' -> to_tsquery('3:* & bed:* & gard:*') for type-ahead matching."""
+    terms = TERM_RE.findall(text.lower())
+    if not terms:
+        return None
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_properties(queryset, text):
+    """
+    Filter `queryset` by `text` and annotate a `search_rank` (higher is better).
+
+    Matches against the GIN-indexed `Property.search_vector` (title > address,
+    postcode > description) with prefix matching on every term. When that finds
+    nothing, falls back to trigram word similarity on title and address so that
+    typos ("Kensingtn") still return results.
+    """
+    text = text.strip()
+    query = build_prefix_query(text)
+    if query is not None:
+        matches = queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+        )
+        if matches.exists():
+            return matches
+
+    return queryset.filter(
+        Q(title__trigram_word_similar=text) | Q(address__trigram_word_similar=text)
+    ).annotate(
+        search_rank=Cast(
+            Greatest(TrigramWordSimilarity(text, 'title'), TrigramWordSimilarity(text, 'address')),
+            FloatField(),
+        ),
+    )
@@ -1,6 +1,9 @@
+from urllib.parse import urljoin
+
 from rest_framework import serializers
 from .models import Property, PropertyImage, PropertyVideo, PropertyFavourite, SupportMessage
 from apps.accounts.serializers import AgentProfileSerializer
+from apps.qr_boards.models import QRBoard
 from drf_spectacular.utils import extend_schema_field
 
 
@@ -33,10 +36,14 @@ class AgentMinimalSerializer(serializers.Serializer):
 
 
 class PropertyListSerializer(serializers.ModelSerializer):
+    """
+    Uses the annotations from `Property.objects.with_list_projection()` when
+    present and falls back to per-row queries otherwise.
+    """
     cover_image = serializers.SerializerMethodField()
     is_new = serializers.BooleanField(read_only=True)
     is_favourited = serializers.SerializerMethodField()
-    agent_id = serializers.UUIDField(source='agent.id', read_only=True)
+    agent_id = serializers.UUIDField(read_only=True)
     assigned_qr_board = serializers.SerializerMethodField()
 
     class Meta:
@@ -48,16 +55,31 @@ class PropertyListSerializer(serializers.ModelSerializer):
             'agent_id', 'assigned_qr_board'
         )
 
+    def _absolute_url(self, url):
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(url)
+        # Payloads built outside a request (e.g. the cached admin dashboard)
+        base_url = self.context.get('base_url')
+        return urljoin(base_url, url) if base_url else url
+
     @extend_schema_field(serializers.CharField(allow_null=True))
     def get_cover_image(self, obj):
+        if hasattr(obj, 'list_cover_image'):
+            if not obj.list_cover_image:
+                return None
+            storage = PropertyImage._meta.get_field('image').storage
+            return self._absolute_url(storage.url(obj.list_cover_image))
+
         img = obj.images.filter(is_cover=True).first() or obj.images.first()
         if img:
-            request = self.context.get('request')
-            return request.build_absolute_uri(img.image.url) if request else img.image.url
+            return self._absolute_url(img.image.url)
         return None
 
     @extend_schema_field(serializers.BooleanField())
     def get_is_favourited(self, obj):
+        if hasattr(obj, 'list_is_favourited'):
+            return obj.list_is_favourited
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.favourited_by.filter(user=request.user).exists()
@@ -65,13 +87,25 @@ class PropertyListSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.DictField(allow_null=True))
     def get_assigned_qr_board(self, obj):
+        if hasattr(obj, 'list_board_id'):
+            if obj.list_board_id is None:
+                return None
+            qr_image_url = None
+            if obj.list_board_qr_code_image:
+                storage = QRBoard._meta.get_field('qr_code_image').storage
+                qr_image_url = self._absolute_url(storage.url(obj.list_board_qr_code_image))
+            return {
+                'id': str(obj.list_board_id),
+                'qr_code_image': qr_image_url,
+                'scan_count': obj.list_board_scan_count,
+            }
+
         assignment = obj.board_assignments.filter(is_active=True).select_related('board').first()
         if assignment and assignment.board:
             board = assignment.board
-            request = self.context.get('request')
             qr_image_url = None
             if board.qr_code_image:
-                qr_image_url = request.build_absolute_uri(board.qr_code_image.url) if request else board.qr_code_image.url
+                qr_image_url = self._absolute_url(board.qr_code_image.url)
             return {
                 'id': str(board.id),
                 'qr_code_image': qr_image_url,
@@ -91,7 +125,7 @@ class PropertyDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Property
-        fields = '__all__'
+        exclude = ('search_vector',)
 
     @extend_schema_field(serializers.BooleanField())
     def get_is_favourited(self, obj):
@@ -127,7 +161,7 @@ class PropertyCreateUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Property
-        exclude = ('agent', 'views_count', 'qr_scanned_count', 'is_approved', 'created_at', 'updated_at')
+        exclude = ('agent', 'views_count', 'qr_scanned_count', 'is_approved', 'created_at', 'updated_at', 'search_vector')
 
     def create(self, validated_data):
         images_data = validated_data.pop('uploaded_images', [])
@@ -199,6 +233,7 @@ class SupportMessageSerializer(serializers.ModelSerializer):
 
 
 class AdminPropertySerializer(PropertyListSerializer):
+    """Uses the annotations from `Property.objects.with_admin_projection()` when present."""
     created_by = serializers.CharField(source='agent.full_name', read_only=True)
     total_view_count = serializers.IntegerField(source='views_count', read_only=True)
     total_offer_got_count = serializers.SerializerMethodField()
@@ -212,6 +247,8 @@ class AdminPropertySerializer(PropertyListSerializer):
 
     @extend_schema_field(serializers.IntegerField())
     def get_total_offer_got_count(self, obj):
+        if hasattr(obj, 'offer_count'):
+            return obj.offer_count
         return obj.offers.count()
 
 
@@ -223,7 +260,7 @@ class AdminPropertyDetailSerializer(PropertyDetailSerializer):
 
     class Meta:
         model = Property
-        fields = '__all__'
+        exclude = ('search_vector',)
         # We don't need to add them to fields if we use __all__ and they are defined on the class?
         # Actually DRF includes declared fields even with __all__. 
         # But to be safe and clean, I'll list the ones I want to add if I really need to, 
@@ -231,4 +268,6 @@ class AdminPropertyDetailSerializer(PropertyDetailSerializer):
     
     @extend_schema_field(serializers.IntegerField())
     def get_total_offer_got_count(self, obj):
+        if hasattr(obj, 'offer_count'):
+            return obj.offer_count
         return obj.offers.count()
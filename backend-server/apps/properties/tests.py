@@ -1,3 +1,179 @@
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.accounts.models import CustomUser
+from apps.qr_boards.models import QRBoard, BoardAssignment
+from .models import Property, PropertyImage, PropertyFavourite
+
+
+class PropertyListQueryCountTests(TestCase):
+    """The list endpoints must cost a fixed number of queries, whatever the page size."""
+
+    def setUp(self):
+        self.agent = CustomUser.objects.create_user(
+            email='agent@example.com', password='password123', full_name='Agent', role='agent'
+        )
+        self.buyer = CustomUser.objects.create_user(
+            email='buyer@example.com', password='password123', full_name='Buyer', role='buyer'
+        )
+        self.client = APIClient()
+
+    def _create_properties(self, count):
+        for i in range(count):
+            prop = Property.objects.create(
+                agent=self.agent, title=f'Home {i}', price=Decimal('250000.00'),
+                address=f'{i} High Street', is_approved=True,
+            )
+            PropertyImage.objects.create(property=prop, image=f'property_images/{i}-a.jpg', order=0)
+            PropertyImage.objects.create(property=prop, image=f'property_images/{i}-b.jpg', order=1, is_cover=True)
+            PropertyFavourite.objects.create(user=self.buyer, property=prop)
+            board = QRBoard.objects.create(agent=self.agent, qr_code_image=f'qr_codes/qr_{i}.png')
+            BoardAssignment.objects.create(board=board, property=prop, is_active=True)
+
+    def _assert_constant_queries(self, url, user, expected):
+        self.client.force_authenticate(user)
+        for count in (2, 10):
+            self._create_properties(count)
+            with self.assertNumQueries(expected):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_public_list(self):
+        # planner estimate + exact count (small result) + page
+        self._assert_constant_queries('/api/v1/user/properties/', self.buyer, 3)
+
+    def test_public_list_projection_values(self):
+        self._create_properties(1)
+        self.client.force_authenticate(self.buyer)
+        item = self.client.get('/api/v1/user/properties/').data['results'][0]
+        self.assertTrue(item['is_favourited'])
+        self.assertTrue(item['cover_image'].endswith('/media/property_images/0-b.jpg'))
+        self.assertTrue(item['assigned_qr_board']['qr_code_image'].endswith('/media/qr_codes/qr_0.png'))
+        self.assertEqual(item['agent_id'], str(self.agent.id))
+
+    def test_favourite_list(self):
+        self._assert_constant_queries('/api/v1/user/properties/favourites/', self.buyer, 2)
+
+    def test_agent_list(self):
+        self._assert_constant_queries('/api/v1/agent/properties/', self.agent, 2)
+
+    def test_board_list(self):
+        self._assert_constant_queries('/api/v1/agent/boards/', self.agent, 3)
+
+    def test_search_vector_is_not_fetched(self):
+        # Only properties/search.py uses it, and only inside SQL
+        self._create_properties(1)
+        self.client.force_authenticate(self.buyer)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/v1/user/properties/')
+            self.client.get('/api/v1/user/properties/', {'search': 'home'})
+        selects = [q['sql'].split(' FROM ')[0] for q in queries if q['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        self.assertFalse([sql for sql in selects if 'search_vector' in sql])
+        self.assertIn('search_vector', Property.objects.get().get_deferred_fields())
+
+
+class PropertyLocationFilterTests(TestCase):
+    URL = '/api/v1/user/properties/'
+
+    def setUp(self):
+        agent = CustomUser.objects.create_user(email='agent@example.com', full_name='Agent', role='agent')
+        places = {
+            'Westminster': (51.4995, -0.1248),
+            'Camden': (51.5390, -0.1426),
+            'Greenwich': (51.4826, 0.0077),
+            'Oxford': (51.7520, -1.2577),
+            'Paris': (48.8566, 2.3522),
+        }
+        for title, (lat, lon) in places.items():
+            Property.objects.create(
+                agent=agent, title=title, price=Decimal('250000.00'), address='x', is_approved=True,
+                lat=Decimal(str(lat)), lon=Decimal(str(lon)),
+            )
+        Property.objects.create(agent=agent, title='Nowhere', price=Decimal('1.00'), address='x', is_approved=True)
+        self.client = APIClient()
+
+    def titles(self, **params):
+        response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [item['title'] for item in response.data['results']]
+
+    def test_near_is_ordered_by_distance(self):
+        # From Trafalgar Square
+        self.assertEqual(self.titles(near='51.508,-0.128', radius_km=15), ['Westminster', 'Camden', 'Greenwich'])
+        self.assertEqual(self.titles(near='51.508,-0.128'), ['Westminster', 'Camden'])  # default 5 km
+        self.assertEqual(
+            self.titles(near='51.508,-0.128', radius_km=100, ordering='newest'),
+            list(Property.objects.filter(title__in=['Westminster', 'Camden', 'Greenwich', 'Oxford'])
+                 .order_by('-created_at', '-id').values_list('title', flat=True)),
+        )
+
+    def test_bbox(self):
+        # Greater London viewport
+        self.assertCountEqual(self.titles(bbox='-0.5,51.3,0.3,51.7'), ['Westminster', 'Camden', 'Greenwich'])
+        # Combined with `near`: the viewport narrows the radius, still nearest first (from Oxford)
+        self.assertEqual(self.titles(near='51.752,-1.258', radius_km=200)[0], 'Oxford')
+        self.assertEqual(
+            self.titles(bbox='-0.5,51.3,0.3,51.7', near='51.752,-1.258', radius_km=200),
+            ['Camden', 'Westminster', 'Greenwich'],
+        )
+
+    def test_malformed_or_out_of_range_coordinates(self):
+        for params in (
+            {'near': 'london'},
+            {'near': '51.5'},
+            {'near': '51.5,-0.12,3'},
+            {'near': 'nan,0'},
+            {'near': '91,0'},
+            {'near': '0,181'},
+            {'near': '51.5,-0.12', 'radius_km': 'far'},
+            {'near': '51.5,-0.12', 'radius_km': '0'},
+            {'near': '51.5,-0.12', 'radius_km': '500'},
+            {'bbox': '-0.5,51.3,0.3'},
+            {'bbox': '0.3,51.3,-0.5,51.7'},
+            {'bbox': '-0.5,-95,0.3,51.7'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(self.URL, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+
+
+class PropertySearchTests(TestCase):
+    URL = '/api/v1/user/properties/'
+
+    def setUp(self):
+        agent = CustomUser.objects.create_user(email='agent@example.com', full_name='Agent', role='agent')
+        for title, address, description in (
+            ('Quiet flat', '1 Mill Lane', 'A short walk from Kensington.'),
+            ('Kensington townhouse', '2 High Street', ''),
+            ('Garden maisonette', '3 Kensington Road', ''),
+            ('Riverside loft', '4 Wharf Road', 'Views of the river.'),
+        ):
+            Property.objects.create(
+                agent=agent, title=title, address=address, description=description,
+                price=Decimal('250000.00'), is_approved=True,
+            )
+        self.client = APIClient()
+
+    def titles(self, search):
+        response = self.client.get(self.URL, {'search': search})
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.data['results']]
+
+    def test_full_text_ranking(self):
+        # title > address > description
+        expected = ['Kensington townhouse', 'Garden maisonette', 'Quiet flat']
+        self.assertEqual(self.titles('kensington'), expected)
+        self.assertEqual(self.titles('kens'), expected)  # prefix matching
+        self.assertEqual(self.titles('garden kensington'), ['Garden maisonette'])
 
-# Create your tests here.
+    def test_trigram_fallback_for_typos(self):
+        # No full-text match, so title and address similarity decide (not the description)
+        self.assertCountEqual(self.titles('Kensingtn'), ['Kensington townhouse', 'Garden maisonette'])
+        self.assertEqual(self.titles('Riversdie'), ['Riverside loft'])
+        self.assertEqual(self.titles('zzzz'), [])
@@ -1,6 +1,6 @@
 from django.urls import path
 from . import views
-from ../accounts/views import AgentRateView
+from apps.accounts.views import AgentRateView
 
 urlpatterns = [
     # Public & Filter
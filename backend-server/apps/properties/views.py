@@ -2,7 +2,7 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db.models import Q, Sum
+from django.db.models import F, Prefetch
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.utils.timesince import timesince
@@ -12,14 +12,19 @@ from .models import (
     Property, PropertyImage, PropertyVideo, PropertyFavourite, 
     SupportMessage, PropertyType, PropertyType2
 )
+from .geo import filter_bbox, filter_nearby, parse_bbox, parse_near
+from .pagination import PropertyCursorPagination
+from .search import search_properties
 from .serializers import (
     PropertyListSerializer, PropertyDetailSerializer,
     PropertyCreateUpdateSerializer, PropertyImageUploadSerializer,
     FavouriteSerializer, PropertyVideoUploadSerializer, SupportMessageSerializer
 )
 from apps.accounts.permissions import IsAgent
+from apps.admin_panel.services import DashboardService
 from apps.common.doc_examples import PROPERTY_CREATE_REQUEST, PROPERTY_RESPONSE
 from apps.notifications.services import NotificationService
+from apps.stats.services import StatsService
 
 
 class PropertyListView(APIView):
@@ -35,18 +40,25 @@ class PropertyListView(APIView):
             OpenApiParameter('price_max', OpenApiTypes.DECIMAL, description='Maximum price (legacy)'),
             OpenApiParameter('max_price', OpenApiTypes.DECIMAL, description='Maximum price'),
             OpenApiParameter('beds', OpenApiTypes.STR, description='Number of beds (e.g. 1, 2, 5+)'),
-            OpenApiParameter('text_search', OpenApiTypes.STR, description='Search by text (title, address, postcode)'),
-            OpenApiParameter('search', OpenApiTypes.STR, description='Search by title, address, postcode'),
+            OpenApiParameter('text_search', OpenApiTypes.STR, description='Full-text search over title, address, postcode and description (prefix and typo tolerant)'),
+            OpenApiParameter('search', OpenApiTypes.STR, description='Alias of text_search'),
             OpenApiParameter('amenities', OpenApiTypes.STR, description='Filter by amenities (comma-separated, e.g. "parking,pool")'),
             OpenApiParameter('pool', OpenApiTypes.BOOL, description='Has pool'),
             OpenApiParameter('pet_friendly', OpenApiTypes.BOOL, description='Is pet friendly'),
             OpenApiParameter('garden', OpenApiTypes.BOOL, description='Has garden'),
             OpenApiParameter('parking', OpenApiTypes.BOOL, description='Has parking'),
+            OpenApiParameter('near', OpenApiTypes.STR, description='Only properties around "lat,lon" (e.g. "51.5072,-0.1276")'),
+            OpenApiParameter('radius_km', OpenApiTypes.NUMBER, description='Radius for `near` in km (default 5, max 200)'),
+            OpenApiParameter('bbox', OpenApiTypes.STR, description='Map viewport "min_lon,min_lat,max_lon,max_lat"'),
+            OpenApiParameter('ordering', OpenApiTypes.STR, enum=['distance', 'relevance', *PropertyCursorPagination.orderings], description='Sort order. Defaults to distance with `near`, relevance when searching, otherwise newest'),
+            OpenApiParameter('cursor', OpenApiTypes.STR, description='Opaque cursor taken from the `next` / `previous` links'),
+            OpenApiParameter('page_size', OpenApiTypes.INT, description='Results per page (default 20, max 100)'),
+            OpenApiParameter('count', OpenApiTypes.STR, enum=['estimate', 'exact', 'none'], description='How to compute `count` (default estimate)'),
         ],
         responses=PropertyListSerializer(many=True)
     )
     def get(self, request):
-        qs = Property.objects.filter(is_approved=True).select_related('agent__agent_profile').prefetch_related('images')
+        qs = Property.objects.filter(is_approved=True).with_list_projection(request.user)
 
         # Filters
         property_type_param = request.query_params.get('property_type', 'all')
@@ -83,22 +95,6 @@ class PropertyListView(APIView):
             else:
                 qs = qs.filter(beds=beds)
 
-        text_search_param = request.query_params.get('text_search', '').strip(' "')
-        if text_search_param:
-            qs = qs.filter(
-                Q(title__icontains=text_search_param) |
-                Q(address__icontains=text_search_param) |
-                Q(postcode__icontains=text_search_param)
-            )
-        else:
-            search = request.query_params.get('search')
-            if search:
-                qs = qs.filter(
-                    Q(title__icontains=search) |
-                    Q(address__icontains=search) |
-                    Q(postcode__icontains=search)
-                )
-
         # Amenities
         amenities_param = request.query_params.get('amenities', '')
         if amenities_param:
@@ -132,8 +128,26 @@ class PropertyListView(APIView):
                 else:
                     qs = qs.filter(**{field: True})
 
-        serializer = PropertyListSerializer(qs, many=True, context={'request': request})
-        return Response({'count': qs.count(), 'results': serializer.data})
+        # Location: radius around a point and/or a map viewport
+        near = request.query_params.get('near')
+        bbox = request.query_params.get('bbox')
+        try:
+            if near:
+                qs = filter_nearby(qs, *parse_near(near, request.query_params.get('radius_km')))
+            if bbox:
+                qs = filter_bbox(qs, parse_bbox(bbox))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Text search runs last so its typo fallback sees the fully filtered set
+        search = request.query_params.get('text_search', '').strip(' "') or request.query_params.get('search', '').strip()
+        if search:
+            qs = search_properties(qs, search)
+
+        paginator = PropertyCursorPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = PropertyListSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
 
 
 class PropertyCreateView(APIView):
@@ -149,6 +163,7 @@ class PropertyCreateView(APIView):
         serializer = PropertyCreateUpdateSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         property_ = serializer.save()
+        DashboardService.invalidate()
 
         # Track property creation
         NotificationService.create(
@@ -175,7 +190,8 @@ class PropertyDetailView(APIView):
     def get(self, request, pk):
         prop = self.get_object(pk)
         # Increment views
-        Property.objects.filter(pk=pk).update(views_count=prop.views_count + 1)
+        Property.objects.filter(pk=pk).update(views_count=F('views_count') + 1)
+        StatsService.bump({'views': 1}, {prop.agent_id: {'views': 1}})
 
         # Track property visit (notify the agent)
         if request.user.is_authenticated and request.user != prop.agent:
@@ -214,6 +230,7 @@ class PropertyDetailView(APIView):
         if prop.agent != request.user:
             return Response({'error': 'Not your property.'}, status=status.HTTP_403_FORBIDDEN)
         prop.delete()
+        DashboardService.invalidate()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -261,9 +278,9 @@ class FavouriteListView(APIView):
 
     @extend_schema(responses=FavouriteSerializer(many=True), tags=['Favourites'])
     def get(self, request):
-        qs = PropertyFavourite.objects.filter(user=request.user).select_related(
-            'property__agent__agent_profile'
-        ).prefetch_related('property__images')
+        qs = PropertyFavourite.objects.filter(user=request.user).prefetch_related(
+            Prefetch('property', queryset=Property.objects.with_list_projection(request.user))
+        )
         ptype = request.query_params.get('type')
         if ptype:
             qs = qs.filter(property__property_type=ptype)
@@ -277,7 +294,7 @@ class AgentPropertyListView(APIView):
 
     @extend_schema(responses=PropertyListSerializer(many=True), tags=['Properties'])
     def get(self, request):
-        qs = Property.objects.filter(agent=request.user).prefetch_related('images')
+        qs = Property.objects.filter(agent=request.user).with_list_projection(request.user)
         serializer = PropertyListSerializer(qs, many=True, context={'request': request})
         return Response({'count': qs.count(), 'results': serializer.data})
 
@@ -290,7 +307,7 @@ class SimilarPropertyView(APIView):
         prop = get_object_or_404(Property, pk=pk)
         similar = Property.objects.filter(
             property_type=prop.property_type, is_approved=True
-        ).exclude(pk=pk).prefetch_related('images')[:6]
+        ).exclude(pk=pk).with_list_projection(request.user)[:6]
         serializer = PropertyListSerializer(similar, many=True, context={'request': request})
         return Response(serializer.data)
 
@@ -317,39 +334,30 @@ class AgentDashboardView(APIView):
     )
     def get(self, request):
         agent = request.user
-        agent_properties = Property.objects.filter(agent=agent)
+        stats = StatsService.for_agent(agent.pk)
 
-        # Aggregate stats
-        aggregates = agent_properties.aggregate(
-            total_views=Sum('views_count'),
-            total_qr_scanned=Sum('qr_scanned_count'),
-        )
-
-        from apps.offers.models import Offer
         from apps.notifications.models import Notification
 
-        total_offers = Offer.objects.filter(property__agent=agent).count()
-
         # Recent activity from notifications (covers all: property, offer, booking, qr_scan)
         notifications = Notification.objects.filter(
             user=agent
-        ).order_by('-created_at')[:10]
+        ).order_by('-updated_at')[:10]
 
         recent_activity = [
             {
                 'property_name': notif.title,
                 'activity': notif.body,
                 'type': notif.notification_type,
-                'time': timesince(notif.created_at, timezone.now()) + ' ago',
+                'time': timesince(notif.updated_at, timezone.now()) + ' ago',
             }
             for notif in notifications
         ]
 
         return Response({
-            'total_property_listing': agent_properties.count(),
-            'total_property_views': aggregates['total_views'] or 0,
-            'total_offers_received': total_offers,
-            'total_qr_scanned': aggregates['total_qr_scanned'] or 0,
+            'total_property_listing': stats['properties'],
+            'total_property_views': stats['views'],
+            'total_offers_received': stats['offers'],
+            'total_qr_scanned': stats['qr_scans'],
             'recent_activity': recent_activity,
         })
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import QRBoard, BoardAssignment
+from .models import QRBoard, BoardAssignment, ScanEvent, ScanDailyRollup
 
 
 @admin.register(QRBoard)
@@ -12,3 +12,16 @@ class QRBoardAdmin(admin.ModelAdmin):
 class BoardAssignmentAdmin(admin.ModelAdmin):
     list_display = ('board', 'property', 'is_active', 'assigned_at')
     list_filter = ('is_active',)
+
+
+@admin.register(ScanEvent)
+class ScanEventAdmin(admin.ModelAdmin):
+    list_display = ('board', 'property', 'scanned_at', 'device')
+    list_filter = ('device',)
+    raw_id_fields = ('board', 'property')
+
+
+@admin.register(ScanDailyRollup)
+class ScanDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('board', 'bucket', 'scans', 'unique_visitors')
+    raw_id_fields = ('board',)
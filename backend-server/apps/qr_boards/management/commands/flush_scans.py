@@ -0,0 +1,38 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.qr_boards.services import ScanService
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Applies buffered QR scan data from Redis to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Seconds between flushes; 0 flushes once and exits',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            try:
+                boards, properties, events = ScanService.flush()
+                if boards or properties or events:
+                    self.stdout.write(
+                        f'Flushed scan counts for {boards} boards / {properties} properties, {events} scan events'
+                    )
+            except Exception:
+                if not interval:
+                    raise
+                logger.exception('Scan flush failed; retrying next interval')
+
+            if not interval:
+                break
+            time.sleep(interval)
+            close_old_connections()
@@ -0,0 +1,139 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("properties", "0005_property_location_index"),
+        ("qr_boards", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScanDailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scans", models.PositiveIntegerField(default=0)),
+                ("unique_visitors", models.PositiveIntegerField(default=0)),
+                ("bucket", models.DateField()),
+                (
+                    "board",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="qr_boards.qrboard",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "scan_rollups_daily",
+            },
+        ),
+        migrations.CreateModel(
+            name="ScanEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scanned_at", models.DateTimeField()),
+                (
+                    "device",
+                    models.CharField(
+                        choices=[
+                            ("mobile", "Mobile"),
+                            ("tablet", "Tablet"),
+                            ("desktop", "Desktop"),
+                            ("bot", "Bot"),
+                            ("other", "Other"),
+                        ],
+                        default="other",
+                        max_length=10,
+                    ),
+                ),
+                ("ip_hash", models.CharField(blank=True, max_length=16)),
+                (
+                    "board",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scan_events",
+                        to="qr_boards.qrboard",
+                    ),
+                ),
+                (
+                    "property",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scan_events",
+                        to="properties.property",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "scan_events",
+            },
+        ),
+        migrations.CreateModel(
+            name="ScanHourlyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scans", models.PositiveIntegerField(default=0)),
+                ("unique_visitors", models.PositiveIntegerField(default=0)),
+                ("bucket", models.DateTimeField()),
+                (
+                    "board",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="qr_boards.qrboard",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "scan_rollups_hourly",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="scandailyrollup",
+            constraint=models.UniqueConstraint(
+                fields=("board", "bucket"), name="scan_daily_board_bucket_uniq"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="scanevent",
+            index=models.Index(
+                fields=["board", "scanned_at"], name="scan_event_board_time_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="scanhourlyrollup",
+            constraint=models.UniqueConstraint(
+                fields=("board", "bucket"), name="scan_hourly_board_bucket_uniq"
+            ),
+        ),
+    ]
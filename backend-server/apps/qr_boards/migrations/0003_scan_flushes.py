@@ -0,0 +1,26 @@
+# Generated by Django 5.0.6 on 2026-10-18 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("qr_boards", "0002_scan_events_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScanFlush",
+            fields=[
+                (
+                    "batch_id",
+                    models.CharField(max_length=32, primary_key=True, serialize=False),
+                ),
+                ("flushed_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                "db_table": "scan_flushes",
+            },
+        ),
+    ]
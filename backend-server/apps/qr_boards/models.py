@@ -3,10 +3,25 @@ import os
 import qrcode
 from io import BytesIO
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.conf import settings
 from django.core.files import File
 
 
+class QRBoardQuerySet(models.QuerySet):
+    def with_assignments(self, user=None):
+        """Prefetch assignments and their properties with the list projection."""
+        from apps.properties.models import Property
+
+        return self.prefetch_related(
+            models.Prefetch(
+                'assignments__property',
+                queryset=Property.objects.with_list_projection(user),
+            )
+        )
+
+
 class QRBoard(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     agent = models.ForeignKey(
@@ -17,6 +32,8 @@ class QRBoard(models.Model):
     scan_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = QRBoardQuerySet.as_manager()
+
     class Meta:
         db_table = 'qr_boards'
         ordering = ['-created_at']
@@ -60,3 +77,101 @@ class BoardAssignment(models.Model):
 
     def __str__(self):
         return f'Board {self.board_id} → Property {self.property_id} (active={self.is_active})'
+
+
+
+class ScanEvent(models.Model):
+    """One row per QR scan. Written in batches by `manage.py flush_scans`."""
+    DEVICE_CHOICES = [
+        ('mobile', 'Mobile'),
+        ('tablet', 'Tablet'),
+        ('desktop', 'Desktop'),
+        ('bot', 'Bot'),
+        ('other', 'Other'),
+    ]
+
+    board = models.ForeignKey(QRBoard, on_delete=models.CASCADE, related_name='scan_events', db_index=False)
+    property = models.ForeignKey(
+        'properties.Property', on_delete=models.CASCADE, related_name='scan_events'
+    )
+    scanned_at = models.DateTimeField()
+    device = models.CharField(max_length=10, choices=DEVICE_CHOICES, default='other')
+    # Truncated keyed hash of the client IP, for unique-visitor counts
+    ip_hash = models.CharField(max_length=16, blank=True)
+
+    class Meta:
+        db_table = 'scan_events'
+        indexes = [
+            models.Index(fields=['board', 'scanned_at'], name='scan_event_board_time_idx'),
+        ]
+
+    def __str__(self):
+        return f'Scan of {self.board_id} at {self.scanned_at}'
+
+
+class ScanRollup(models.Model):
+    board = models.ForeignKey(QRBoard, on_delete=models.CASCADE, related_name='+')
+    scans = models.PositiveIntegerField(default=0)
+    unique_visitors = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ScanHourlyRollup(ScanRollup):
+    bucket = models.DateTimeField()  # start of the hour (UTC)
+
+    class Meta:
+        db_table = 'scan_rollups_hourly'
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'bucket'], name='scan_hourly_board_bucket_uniq'),
+        ]
+
+
+class ScanDailyRollup(ScanRollup):
+    bucket = models.DateField()  # UTC date
+
+    class Meta:
+        db_table = 'scan_rollups_daily'
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'bucket'], name='scan_daily_board_bucket_uniq'),
+        ]
+
+
+class ScanFlush(models.Model):
+    """
+    A batch of buffered scans applied by `manage.py flush_scans`, written in
+    the same transaction as the batch itself. A batch whose Redis keys outlive
+    the commit is recognised by its id and not applied again.
+    """
+    batch_id = models.CharField(max_length=32, primary_key=True)
+    flushed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'scan_flushes'
+
+    def __str__(self):
+        return f'Scan batch {self.batch_id} at {self.flushed_at}'
+
+# ── Board resolution cache invalidation ──────────────────────
+@receiver(post_save, sender=BoardAssignment)
+@receiver(post_delete, sender=BoardAssignment)
+def invalidate_assignment_board(sender, instance, **kwargs):
+    from .services import BoardResolver
+    BoardResolver.invalidate(instance.board_id)
+
+
+@receiver(post_delete, sender=QRBoard)
+def invalidate_deleted_board(sender, instance, **kwargs):
+    from .services import BoardResolver
+    BoardResolver.invalidate(instance.pk)
+
+
+@receiver(post_save, sender='properties.Property')
+def invalidate_property_boards(sender, instance, created, **kwargs):
+    # The cached entry carries the property title
+    if created:
+        return
+    from .services import BoardResolver
+    board_ids = BoardAssignment.objects.filter(property_id=instance.pk, is_active=True).values_list('board_id', flat=True)
+    BoardResolver.invalidate(*board_ids)
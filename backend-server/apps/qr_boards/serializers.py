@@ -23,7 +23,9 @@ class QRBoardSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(PropertyListSerializer(allow_null=True))
     def get_active_property(self, obj):
-        assignment = obj.assignments.filter(is_active=True).select_related('property').first()
+        # Iterate the (usually prefetched) assignments instead of filtering,
+        # so QRBoard.objects.with_assignments() keeps this query-free.
+        assignment = next((a for a in obj.assignments.all() if a.is_active), None)
         if assignment:
             return PropertyListSerializer(assignment.property, context=self.context).data
         return None
@@ -31,3 +33,28 @@ class QRBoardSerializer(serializers.ModelSerializer):
 
 class ReassignBoardSerializer(serializers.Serializer):
     property_id = serializers.UUIDField()
+
+
+class ScanCountsSerializer(serializers.Serializer):
+    scans = serializers.IntegerField()
+    unique_visitors = serializers.IntegerField()
+
+
+class ScanStatsSummarySerializer(serializers.Serializer):
+    board_id = serializers.UUIDField()
+    total_scans = serializers.IntegerField()
+    today = ScanCountsSerializer()
+    last_7_days = ScanCountsSerializer()
+    last_30_days = ScanCountsSerializer()
+
+
+class ScanStatsPointSerializer(ScanCountsSerializer):
+    bucket = serializers.CharField(help_text='Start of the hour (ISO datetime) or the UTC date')
+
+
+class ScanStatsSeriesSerializer(serializers.Serializer):
+    board_id = serializers.UUIDField()
+    interval = serializers.ChoiceField(choices=['hour', 'day'])
+    start = serializers.CharField()
+    end = serializers.CharField()
+    points = ScanStatsPointSerializer(many=True)
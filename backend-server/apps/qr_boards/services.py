@@ -0,0 +1,397 @@
+import hashlib
+import hmac
+import json
+import logging
+import math
+import re
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.common.redis import claim, get_redis
+from apps.notifications.services import NotificationService
+from apps.properties.models import Property
+from apps.stats.services import StatsService
+from .models import QRBoard, BoardAssignment, ScanEvent, ScanFlush, ScanHourlyRollup, ScanDailyRollup
+
+logger = logging.getLogger(__name__)
+
+UA_BOT_RE = re.compile(r'bot|crawl|spider|slurp|preview|facebookexternalhit|whatsapp', re.I)
+UA_TABLET_RE = re.compile(r'ipad|tablet|kindle|silk|playbook|android(?!.*mobile)', re.I)
+UA_MOBILE_RE = re.compile(r'mobi|iphone|ipod|android|blackberry|opera mini|iemobile', re.I)
+UA_DESKTOP_RE = re.compile(r'windows nt|macintosh|x11|cros', re.I)
+
+
+def device_class(user_agent):
+    """Coarse device class ('mobile', 'tablet', 'desktop', 'bot', 'other') from a User-Agent."""
+    if not user_agent:
+        return 'other'
+    for device, pattern in (
+        ('bot', UA_BOT_RE), ('tablet', UA_TABLET_RE), ('mobile', UA_MOBILE_RE), ('desktop', UA_DESKTOP_RE)
+    ):
+        if pattern.search(user_agent):
+            return device
+    return 'other'
+
+
+def client_ip(request):
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if forwarded:
+        return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def hash_ip(ip):
+    """Keyed, truncated hash so raw IPs are never stored."""
+    if not ip:
+        return ''
+    return hmac.new(settings.SECRET_KEY.encode(), ip.encode(), hashlib.sha256).hexdigest()[:16]
+
+
+class ScanService:
+    """
+    Scan bookkeeping for the public redirect, kept off the request path.
+
+    Recording a scan is one pipelined round-trip to Redis: HINCRBY on the board
+    and property counters plus an RPUSH of the raw event. `flush()` (run by
+    `manage.py flush_scans`) applies the counters as batched `F()` increments,
+    bulk-inserts the `ScanEvent` rows and folds them into the hourly and daily
+    rollups, all in one transaction.
+    """
+    BOARD_KEY = 'qr:scan_deltas:boards'
+    PROPERTY_KEY = 'qr:scan_deltas:properties'
+    EVENTS_KEY = 'qr:scan_events'
+    BATCH_KEY = 'qr:scan_batch'
+    UNIQUES_KEY = 'qr:scan_uniques'
+    ROLLUP_BATCH_SIZE = 1000
+    EVENTS_CHUNK_SIZE = 5000
+    FLUSH_RETENTION = timedelta(days=1)
+
+    @staticmethod
+    def record(board_id, property_id, device='other', ip_hash=''):
+        event = {'b': str(board_id), 'p': str(property_id), 't': time.time(), 'd': device, 'h': ip_hash}
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.hincrby(ScanService.BOARD_KEY, event['b'], 1)
+            pipe.hincrby(ScanService.PROPERTY_KEY, event['p'], 1)
+            pipe.rpush(ScanService.EVENTS_KEY, json.dumps(event))
+            pipe.execute()
+        except redis.RedisError as e:
+            # Never drop a scan: fall back to an (atomic) write-through
+            logger.warning(f"Scan buffer unavailable, writing through: {str(e)}")
+            with transaction.atomic():
+                ScanService._apply(QRBoard, 'scan_count', {event['b']: 1})
+                ScanService._apply(Property, 'qr_scanned_count', {event['p']: 1})
+                StatsService.record_scans({event['p']: 1})
+                ScanService._apply_events([event], client=None)
+
+    @staticmethod
+    def flush():
+        """
+        Apply everything buffered so far. Returns (boards, properties, events) written.
+
+        The claimed batch carries an id (BATCH_KEY) that is recorded as a
+        ScanFlush in the same transaction, so if the Redis keys outlive the
+        commit (crash or Redis error before the delete) the next flush drops
+        them instead of counting those scans twice.
+        """
+        client = get_redis()
+        keys = [claim(client, key) for key in (ScanService.BOARD_KEY, ScanService.PROPERTY_KEY, ScanService.EVENTS_KEY)]
+        claimed = [key for key in keys if key]
+        if not claimed:
+            return 0, 0, 0
+        # Kept until the batch is deleted, so a retried batch keeps its id
+        client.set(ScanService.BATCH_KEY, uuid.uuid4().hex, nx=True)
+        batch_id = client.get(ScanService.BATCH_KEY)
+
+        with transaction.atomic():
+            if ScanFlush.objects.filter(batch_id=batch_id).exists():
+                logger.warning(f"Scan batch {batch_id} was already applied, discarding it")
+                result = 0, 0, 0
+            else:
+                ScanFlush.objects.create(batch_id=batch_id)
+                ScanFlush.objects.filter(flushed_at__lt=timezone.now() - ScanService.FLUSH_RETENTION).delete()
+                result = ScanService._apply_batch(client, *keys)
+
+        client.delete(*claimed, ScanService.BATCH_KEY)
+        return result
+
+    @staticmethod
+    def _apply_batch(client, board_key, property_key, events_key):
+        board_deltas = client.hgetall(board_key) if board_key else {}
+        property_deltas = client.hgetall(property_key) if property_key else {}
+        ScanService._apply(QRBoard, 'scan_count', board_deltas)
+        ScanService._apply(Property, 'qr_scanned_count', property_deltas)
+        StatsService.record_scans(property_deltas)
+
+        written = 0
+        if events_key:
+            for events in ScanService._read_events(client, events_key):
+                written += ScanService._apply_events(events, client)
+        return len(board_deltas), len(property_deltas), written
+
+    @staticmethod
+    def _read_events(client, key):
+        """The buffered events of a claimed list, EVENTS_CHUNK_SIZE at a time."""
+        start = 0
+        while True:
+            raw = client.lrange(key, start, start + ScanService.EVENTS_CHUNK_SIZE - 1)
+            if not raw:
+                return
+            yield [json.loads(event) for event in raw]
+            start += len(raw)
+
+    @staticmethod
+    def _apply(model, field, deltas):
+        # One UPDATE per distinct delta rather than one per row
+        by_delta = defaultdict(list)
+        for pk, delta in deltas.items():
+            by_delta[int(delta)].append(pk)
+        for delta, pks in by_delta.items():
+            model.objects.filter(pk__in=pks).update(**{field: F(field) + delta})
+
+    # ── Events & rollups ──────────────────────────────────────
+
+    @staticmethod
+    def _apply_events(events, client):
+        if not events:
+            return 0
+        # Boards / properties deleted since the scan would violate the FKs
+        boards = {str(pk) for pk in QRBoard.objects.filter(id__in={e['b'] for e in events}).order_by().values_list('id', flat=True)}
+        properties = {
+            str(pk): (agent_id, title)
+            for pk, agent_id, title in Property.objects.filter(id__in={e['p'] for e in events}).order_by()
+            .values_list('id', 'agent_id', 'title')
+        }
+        events = [e for e in events if e['b'] in boards and e['p'] in properties]
+        if not events:
+            return 0
+
+        scanned_at = [datetime.fromtimestamp(e['t'], tz=dt_timezone.utc) for e in events]
+        ScanEvent.objects.bulk_create([
+            ScanEvent(board_id=e['b'], property_id=e['p'], scanned_at=at, device=e['d'], ip_hash=e['h'])
+            for e, at in zip(events, scanned_at)
+        ], batch_size=ScanService.ROLLUP_BATCH_SIZE)
+
+        hourly = defaultdict(lambda: [0, 0])
+        daily = defaultdict(lambda: [0, 0])
+        flags = ScanService._unique_flags(client, events, scanned_at)
+        for e, at, (new_in_hour, new_in_day) in zip(events, scanned_at, flags):
+            hour = hourly[(e['b'], at.replace(minute=0, second=0, microsecond=0))]
+            hour[0] += 1
+            hour[1] += new_in_hour
+            day = daily[(e['b'], at.date())]
+            day[0] += 1
+            day[1] += new_in_day
+
+        ScanService._upsert_rollups(ScanHourlyRollup, hourly)
+        ScanService._upsert_rollups(ScanDailyRollup, daily)
+        ScanService._notify_agents(events, properties)
+        return len(events)
+
+    @staticmethod
+    def _notify_agents(events, properties):
+        """One rolling "N scans of X" notification per board and window, not one per scan."""
+        groups = {}
+        for e in events:
+            key = f"qr_scan:{e['b']}:{e['p']}"
+            if key not in groups:
+                agent_id, title = properties[e['p']]
+                groups[key] = {'user_id': agent_id, 'count': 0, 'render': ScanService._scan_message(title)}
+            groups[key]['count'] += 1
+        try:
+            with transaction.atomic():
+                NotificationService.coalesce(
+                    groups, timedelta(seconds=settings.SCAN_NOTIFICATION_WINDOW), notification_type='qr_scan'
+                )
+        except Exception as e:
+            # Losing a notification must not roll back the scan data
+            logger.error(f"Scan notification error: {str(e)}")
+
+    @staticmethod
+    def _scan_message(title):
+        def render(total, since):
+            if total == 1:
+                return 'QR Code Scanned!', f'Someone scanned the QR code for "{title}".'
+            minutes = max(1, math.ceil((timezone.now() - since).total_seconds() / 60))
+            unit = 'minute' if minutes == 1 else 'minutes'
+            return 'QR Code Scanned!', f'{total} scans of "{title}" in the last {minutes} {unit}.'
+        return render
+
+    @staticmethod
+    def _unique_flags(client, events, scanned_at):
+        """
+        (new_in_hour, new_in_day) per event, from short-lived Redis sets of IP
+        hashes per board and bucket. Without Redis every scan counts as unique.
+        """
+        if client is None:
+            return [(1, 1)] * len(events)
+
+        pipe = client.pipeline(transaction=False)
+        expiries = {}
+        for e, at in zip(events, scanned_at):
+            if not e['h']:
+                continue
+            hour = at.replace(minute=0, second=0, microsecond=0)
+            day = hour.replace(hour=0)
+            hour_key = f"{ScanService.UNIQUES_KEY}:h:{e['b']}:{hour:%Y%m%d%H}"
+            day_key = f"{ScanService.UNIQUES_KEY}:d:{e['b']}:{day:%Y%m%d}"
+            # Keep each set for one bucket length after the bucket closes
+            expiries[hour_key] = hour + timedelta(hours=2)
+            expiries[day_key] = day + timedelta(days=2)
+            pipe.sadd(hour_key, e['h'])
+            pipe.sadd(day_key, e['h'])
+        for key, expires_at in expiries.items():
+            pipe.expireat(key, expires_at)
+        results = iter(pipe.execute())
+
+        # SADD returns 1 when the hash wasn't in the set yet
+        return [(next(results), next(results)) if e['h'] else (1, 1) for e in events]
+
+    @staticmethod
+    def _upsert_rollups(model, buckets):
+        """INSERT ... ON CONFLICT DO UPDATE that adds to the existing counts."""
+        table = model._meta.db_table
+        rows = [
+            (uuid.UUID(board_id), bucket, scans, uniques)
+            for (board_id, bucket), (scans, uniques) in buckets.items()
+        ]
+        with connection.cursor() as cursor:
+            for i in range(0, len(rows), ScanService.ROLLUP_BATCH_SIZE):
+                batch = rows[i:i + ScanService.ROLLUP_BATCH_SIZE]
+                values = ', '.join(['(%s, %s, %s, %s)'] * len(batch))
+                cursor.execute(
+                    f'INSERT INTO {table} (board_id, bucket, scans, unique_visitors) VALUES {values} '
+                    f'ON CONFLICT (board_id, bucket) DO UPDATE SET '
+                    f'scans = {table}.scans + EXCLUDED.scans, '
+                    f'unique_visitors = {table}.unique_visitors + EXCLUDED.unique_visitors',
+                    [value for row in batch for value in row],
+                )
+
+
+class BoardResolver:
+    """
+    Read-through cache of `board_id -> {property_id, agent_id, title}` for the
+    public redirect. Boards that don't exist or have no active property are
+    cached too (as MISSING / UNASSIGNED) for a shorter time.
+    """
+    MISSING = 'missing'
+    UNASSIGNED = 'unassigned'
+
+    @staticmethod
+    def cache_key(board_id):
+        return f'qr:board:{board_id}'
+
+    @staticmethod
+    def resolve(board_id):
+        key = BoardResolver.cache_key(board_id)
+        try:
+            target = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Board cache read failed: {str(e)}")
+            target = None
+        if target is not None:
+            return target
+
+        target = BoardResolver._load(board_id)
+        timeout = (
+            settings.QR_BOARD_CACHE_TIMEOUT if isinstance(target, dict)
+            else settings.QR_BOARD_NEGATIVE_CACHE_TIMEOUT
+        )
+        try:
+            cache.set(key, target, timeout)
+        except Exception as e:
+            logger.warning(f"Board cache write failed: {str(e)}")
+        return target
+
+    @staticmethod
+    def invalidate(*board_ids):
+        keys = [BoardResolver.cache_key(board_id) for board_id in board_ids]
+        if not keys:
+            return
+        # After commit, so a concurrent scan can't re-cache the old assignment
+        def _delete():
+            try:
+                cache.delete_many(keys)
+            except Exception as e:
+                logger.warning(f"Board cache invalidation failed: {str(e)}")
+        transaction.on_commit(_delete)
+
+    @staticmethod
+    def _load(board_id):
+        assignment = (
+            BoardAssignment.objects.filter(board_id=board_id, is_active=True)
+            .values('property_id', 'property__agent_id', 'property__title')
+            .first()
+        )
+        if assignment is None:
+            exists = QRBoard.objects.filter(id=board_id).exists()
+            return BoardResolver.UNASSIGNED if exists else BoardResolver.MISSING
+        return {
+            'property_id': str(assignment['property_id']),
+            'agent_id': str(assignment['property__agent_id']),
+            'title': assignment['property__title'],
+        }
+
+
+class ScanStatsService:
+    """Agent-facing scan analytics, served from the hourly / daily rollups only."""
+    INTERVALS = {
+        # interval: (rollup model, bucket step, default days, max days)
+        'hour': (ScanHourlyRollup, timedelta(hours=1), 2, 31),
+        'day': (ScanDailyRollup, timedelta(days=1), 30, 366),
+    }
+
+    @staticmethod
+    def summary(board):
+        today = timezone.now().date()
+        windows = {'today': today, 'last_7_days': today - timedelta(days=6), 'last_30_days': today - timedelta(days=29)}
+        aggregates = {}
+        for name, since in windows.items():
+            aggregates[f'{name}_scans'] = Coalesce(Sum('scans', filter=Q(bucket__gte=since)), 0)
+            aggregates[f'{name}_unique'] = Coalesce(Sum('unique_visitors', filter=Q(bucket__gte=since)), 0)
+        totals = ScanDailyRollup.objects.filter(board=board).aggregate(**aggregates)
+        data = {'board_id': str(board.id), 'total_scans': board.scan_count}
+        for name in windows:
+            data[name] = {'scans': totals[f'{name}_scans'], 'unique_visitors': totals[f'{name}_unique']}
+        return data
+
+    @staticmethod
+    def series(board, interval='day', days=None):
+        """Zero-filled time series for the last `days` days, oldest bucket first."""
+        model, step, default_days, max_days = ScanStatsService.INTERVALS[interval]
+        days = min(days or default_days, max_days)
+
+        now = timezone.now()
+        if interval == 'hour':
+            end = now.replace(minute=0, second=0, microsecond=0)
+            start = end - timedelta(days=days) + step
+        else:
+            end = now.date()
+            start = end - timedelta(days=days - 1)
+
+        rows = {
+            row['bucket']: row
+            for row in model.objects.filter(board=board, bucket__gte=start, bucket__lte=end)
+            .values('bucket', 'scans', 'unique_visitors')
+        }
+        points = []
+        bucket = start
+        while bucket <= end:
+            row = rows.get(bucket)
+            points.append({
+                'bucket': bucket,
+                'scans': row['scans'] if row else 0,
+                'unique_visitors': row['unique_visitors'] if row else 0,
+            })
+            bucket += step
+        return {'board_id': str(board.id), 'interval': interval, 'start': start, 'end': end, 'points': points}
@@ -1,3 +1,211 @@
+from unittest import mock
+
+import time
+import uuid
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.common.redis import get_redis
+from apps.properties.models import Property
+
+from .models import BoardAssignment, QRBoard, ScanDailyRollup, ScanEvent, ScanFlush
+from .services import BoardResolver, ScanService
+
+User = get_user_model()
+
+
+BUFFER_KEYS = (ScanService.BOARD_KEY, ScanService.PROPERTY_KEY, ScanService.EVENTS_KEY)
+
+
+def clear_scan_buffers():
+    keys = [ScanService.BATCH_KEY] + [k for key in BUFFER_KEYS for k in (key, f'{key}:flushing')]
+    get_redis().delete(*keys)
+
+
+class ScanFlushTests(TestCase):
+    def setUp(self):
+        clear_scan_buffers()
+        self.addCleanup(clear_scan_buffers)
+        agent = User.objects.create_user('agent@example.com', full_name='Agent', role='agent')
+        self.property = Property.objects.create(agent=agent, title='Home', price=100000, address='1 High St')
+        self.board = QRBoard.objects.create(agent=agent)
+
+    def scan(self, n):
+        for i in range(n):
+            ScanService.record(self.board.pk, self.property.pk, ip_hash=f'ip{i}')
+
+    def assertScans(self, n):
+        self.board.refresh_from_db()
+        self.property.refresh_from_db()
+        self.assertEqual((self.board.scan_count, self.property.qr_scanned_count), (n, n))
+        self.assertEqual(ScanEvent.objects.count(), n)
+        self.assertEqual(ScanDailyRollup.objects.get().scans, n)
+
+    def test_flush_reads_events_in_chunks(self):
+        self.scan(7)
+        with mock.patch.object(ScanService, 'EVENTS_CHUNK_SIZE', 3), \
+                mock.patch.object(ScanService, '_apply_events', wraps=ScanService._apply_events) as apply_events:
+            self.assertEqual(ScanService.flush(), (1, 1, 7))
+        self.assertEqual([len(call.args[0]) for call in apply_events.call_args_list], [3, 3, 1])
+        self.assertScans(7)
+        self.assertEqual(ScanService.flush(), (0, 0, 0))
+
+    def test_committed_batch_is_not_applied_twice(self):
+        self.scan(2)
+        # The batch commits, then Redis fails before its keys are deleted
+        with mock.patch.object(redis.Redis, 'delete', side_effect=redis.ConnectionError('gone')):
+            with self.assertRaises(redis.ConnectionError):
+                ScanService.flush()
+        self.assertScans(2)
+
+        self.assertEqual(ScanService.flush(), (0, 0, 0))
+        self.assertScans(2)
+        self.assertFalse(get_redis().exists(*[f'{key}:flushing' for key in BUFFER_KEYS], ScanService.BATCH_KEY))
+
+        # Later scans are a new batch
+        self.scan(1)
+        self.assertEqual(ScanService.flush(), (1, 1, 1))
+        self.assertScans(3)
+        self.assertEqual(ScanFlush.objects.count(), 2)
+
+
+class BoardResolverTests(TestCase):
+    """Cached board -> property lookups for the public redirect, and their invalidation."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.agent = User.objects.create_user('agent@example.com', full_name='Agent', role='agent')
+        self.property = Property.objects.create(agent=self.agent, title='Home', price=100000, address='1 High St')
+        self.board = QRBoard.objects.create(agent=self.agent)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assignment = BoardAssignment.objects.create(board=self.board, property=self.property)
+
+    def resolve(self, board_id=None):
+        return BoardResolver.resolve(board_id or self.board.pk)
+
+    def assertCached(self, expected, board_id=None):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.resolve(board_id), expected)
+
+    def test_resolve_is_cached(self):
+        target = {'property_id': str(self.property.pk), 'agent_id': str(self.agent.pk), 'title': 'Home'}
+        self.assertEqual(self.resolve(), target)
+        self.assertCached(target)
+
+        with mock.patch('apps.qr_boards.views.ScanService.record'), self.assertNumQueries(0):
+            response = APIClient().get(f'/scan/{self.board.pk}/')
+        self.assertEqual(response.data['property_id'], str(self.property.pk))
+
+    def test_property_save_invalidates(self):
+        self.resolve()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.title = 'Renamed'
+            self.property.save()
+        self.assertEqual(self.resolve()['title'], 'Renamed')
+
+    def test_reassign_invalidates(self):
+        self.resolve()
+        other = Property.objects.create(agent=self.agent, title='Other', price=1, address='x')
+        client = APIClient()
+        client.force_authenticate(self.agent)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(f'/api/v1/agent/boards/{self.board.pk}/reassign/', {'property_id': str(other.pk)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.resolve()['property_id'], str(other.pk))
+
+    def test_assignment_delete_invalidates(self):
+        self.resolve()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assignment.delete()
+        self.assertEqual(self.resolve(), BoardResolver.UNASSIGNED)
+        self.assertCached(BoardResolver.UNASSIGNED)
+
+    def test_property_delete_invalidates(self):
+        self.resolve()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.delete()  # cascades to the assignment
+        self.assertEqual(self.resolve(), BoardResolver.UNASSIGNED)
+
+    def test_board_delete_invalidates(self):
+        self.resolve()
+        board_id = self.board.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.board.delete()
+        self.assertEqual(self.resolve(board_id), BoardResolver.MISSING)
+
+    def test_unknown_board_is_negatively_cached(self):
+        unknown = uuid.uuid4()
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.assertEqual(self.resolve(unknown), BoardResolver.MISSING)
+        self.assertEqual(cache_set.call_args.args[2], settings.QR_BOARD_NEGATIVE_CACHE_TIMEOUT)
+        self.assertCached(BoardResolver.MISSING, unknown)
+
+        response = APIClient().get(f'/scan/{unknown}/')
+        self.assertEqual(response.status_code, 404)
+
+
+class ScanStatsTests(TestCase):
+    """The stats endpoints read what flush_scans folded into the rollups."""
+
+    def setUp(self):
+        clear_scan_buffers()
+        self.addCleanup(clear_scan_buffers)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.agent = User.objects.create_user('agent@example.com', full_name='Agent', role='agent')
+        self.client = APIClient()
+        self.client.force_authenticate(self.agent)
+        self.boards = []
+        for title in ('Home', 'Other home'):
+            prop = Property.objects.create(agent=self.agent, title=title, price=1, address='x')
+            board = QRBoard.objects.create(agent=self.agent)
+            BoardAssignment.objects.create(board=board, property=prop)
+            self.boards.append(board)
+
+    def scan(self, board, ip, days_ago=0):
+        with mock.patch('apps.qr_boards.services.time.time', return_value=time.time() - days_ago * 86400):
+            response = APIClient().get(f'/scan/{board.pk}/', REMOTE_ADDR=ip)
+        self.assertEqual(response.status_code, 200)
+
+    def get(self, board, path='', **params):
+        response = self.client.get(f'/api/v1/agent/boards/{board.pk}/stats/{path}', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_summary_and_series_after_flush(self):
+        home, other = self.boards
+        for ip in ('1.1.1.1', '1.1.1.1', '2.2.2.2'):
+            self.scan(home, ip)
+        self.scan(home, '3.3.3.3', days_ago=3)
+        self.scan(other, '1.1.1.1')
+        ScanService.flush()
+
+        summary = self.get(home)
+        self.assertEqual(summary['total_scans'], 4)
+        self.assertEqual(summary['today'], {'scans': 3, 'unique_visitors': 2})
+        self.assertEqual(summary['last_7_days'], {'scans': 4, 'unique_visitors': 3})
+        self.assertEqual(summary['last_30_days'], {'scans': 4, 'unique_visitors': 3})
+        self.assertEqual(self.get(other)['last_30_days'], {'scans': 1, 'unique_visitors': 1})
+
+        series = self.get(home, 'series/', interval='day', days=7)
+        points = [(point['scans'], point['unique_visitors']) for point in series['points']]
+        self.assertEqual(len(points), 7)
+        self.assertEqual(points[-1], (3, 2))
+        self.assertEqual(points[-4], (1, 1))
+        self.assertEqual(sum(scans for scans, _ in points), 4)
+
+        hourly = self.get(home, 'series/', interval='hour', days=1)
+        self.assertEqual(len(hourly['points']), 24)
+        self.assertEqual(hourly['points'][-1]['scans'], 3)
 
-# Create your tests here.
+    def test_series_validates_its_parameters(self):
+        board = self.boards[0]
+        for params in ({'interval': 'week'}, {'days': 'x'}, {'days': 0}):
+            response = self.client.get(f'/api/v1/agent/boards/{board.pk}/stats/series/', params)
+            self.assertEqual(response.status_code, 400)
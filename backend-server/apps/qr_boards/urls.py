@@ -6,4 +6,6 @@ urlpatterns = [
     path('<uuid:qr_id>/', views.QRBoardDetailView.as_view(), name='qr-board-detail'),
     path('<uuid:qr_id>/reassign/', views.QRBoardReassignView.as_view(), name='qr-board-reassign'),
     path('<uuid:qr_id>/download-qr/', views.QRBoardDownloadView.as_view(), name='qr-board-download'),
+    path('<uuid:qr_id>/stats/', views.QRBoardStatsView.as_view(), name='qr-board-stats'),
+    path('<uuid:qr_id>/stats/series/', views.QRBoardStatsSeriesView.as_view(), name='qr-board-stats-series'),
 ]
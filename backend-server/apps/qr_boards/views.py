@@ -3,14 +3,16 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404, redirect
 from django.http import Http404
-from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiTypes
 
 from .models import QRBoard, BoardAssignment
-from .serializers import QRBoardSerializer, ReassignBoardSerializer
+from .serializers import (
+    QRBoardSerializer, ReassignBoardSerializer, ScanStatsSummarySerializer, ScanStatsSeriesSerializer
+)
+from .services import ScanService, ScanStatsService, BoardResolver, device_class, client_ip, hash_ip
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from apps.accounts.permissions import IsAgent
 from apps.properties.models import Property
-from apps.notifications.services import NotificationService
 from apps.common.doc_examples import REASSIGN_BOARD_REQUEST
 import logging
 import traceback
@@ -23,7 +25,7 @@ class QRBoardListCreateView(APIView):
 
     @extend_schema(responses=QRBoardSerializer(many=True), tags=['QR Boards'])
     def get(self, request):
-        boards = QRBoard.objects.filter(agent=request.user).prefetch_related('assignments__property')
+        boards = QRBoard.objects.filter(agent=request.user).with_assignments(request.user)
         serializer = QRBoardSerializer(boards, many=True, context={'request': request})
         return Response(serializer.data)
 
@@ -40,7 +42,7 @@ class QRBoardDetailView(APIView):
 
     @extend_schema(responses=QRBoardSerializer, tags=['QR Boards'])
     def get(self, request, qr_id):
-        board = get_object_or_404(QRBoard, id=qr_id, agent=request.user)
+        board = get_object_or_404(QRBoard.objects.with_assignments(request.user), id=qr_id, agent=request.user)
         return Response(QRBoardSerializer(board, context={'request': request}).data)
 
 
@@ -70,6 +72,7 @@ class QRBoardReassignView(APIView):
         # Create new active assignment
         BoardAssignment.objects.create(board=board, property=prop, is_active=True)
 
+        board = QRBoard.objects.with_assignments(request.user).get(id=board.id)
         return Response(QRBoardSerializer(board, context={'request': request}).data)
 
 
@@ -84,6 +87,42 @@ class QRBoardDownloadView(APIView):
         return Response({'qr_code_url': request.build_absolute_uri(board.qr_code_image.url)})
 
 
+class QRBoardStatsView(APIView):
+    """Scan totals for one of the agent's boards (today / 7 days / 30 days)."""
+    permission_classes = [IsAgent]
+
+    @extend_schema(responses=ScanStatsSummarySerializer, tags=['QR Boards'])
+    def get(self, request, qr_id):
+        board = get_object_or_404(QRBoard, id=qr_id, agent=request.user)
+        return Response(ScanStatsService.summary(board))
+
+
+class QRBoardStatsSeriesView(APIView):
+    """Scans per hour or per day for one of the agent's boards."""
+    permission_classes = [IsAgent]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter('interval', OpenApiTypes.STR, enum=list(ScanStatsService.INTERVALS), description='Bucket size (default day)'),
+            OpenApiParameter('days', OpenApiTypes.INT, description='How many days back (default 2 for hour, 30 for day; max 31 / 366)'),
+        ],
+        responses=ScanStatsSeriesSerializer,
+        tags=['QR Boards']
+    )
+    def get(self, request, qr_id):
+        board = get_object_or_404(QRBoard, id=qr_id, agent=request.user)
+        interval = request.query_params.get('interval', 'day')
+        if interval not in ScanStatsService.INTERVALS:
+            return Response({'error': 'interval must be "hour" or "day".'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            days = int(request.query_params['days']) if 'days' in request.query_params else None
+        except ValueError:
+            return Response({'error': 'days must be a whole number.'}, status=status.HTTP_400_BAD_REQUEST)
+        if days is not None and days < 1:
+            return Response({'error': 'days must be at least 1.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(ScanStatsService.series(board, interval, days))
+
+
 class QRScanRedirectView(APIView):
     """Public endpoint: scanned by buyer → redirect to property page + log scan"""
     permission_classes = [AllowAny]
@@ -92,32 +131,24 @@ class QRScanRedirectView(APIView):
     @extend_schema(responses=OpenApiResponse(description="Redirect URL", response={'type': 'object', 'properties': {'redirect_url': {'type': 'string'}, 'property_id': {'type': 'string'}}}), tags=['QR Boards'])
     def get(self, request, qr_id):
         try:
-            board = get_object_or_404(QRBoard, id=qr_id)
-            assignment = board.assignments.filter(is_active=True).select_related('property', 'property__agent').first()
-
-            if not assignment:
+            # Served from cache on warm scans; see BoardResolver
+            target = BoardResolver.resolve(qr_id)
+            if target == BoardResolver.MISSING:
+                return Response({'error': 'QR board not found.'}, status=status.HTTP_404_NOT_FOUND)
+            if target == BoardResolver.UNASSIGNED:
                 return Response({'error': 'This board has no active property.'}, status=status.HTTP_404_NOT_FOUND)
 
-            # Increment scan counts
-            QRBoard.objects.filter(id=qr_id).update(scan_count=board.scan_count + 1)
-            Property.objects.filter(id=assignment.property.id).update(
-                qr_scanned_count=assignment.property.qr_scanned_count + 1
+            # Count + log the scan (buffered in Redis, applied by `manage.py flush_scans`,
+            # which also sends the agent a coalesced notification)
+            ScanService.record(
+                qr_id, target['property_id'],
+                device=device_class(request.META.get('HTTP_USER_AGENT', '')),
+                ip_hash=hash_ip(client_ip(request)),
             )
 
-            # Notify agent
-            try:
-                NotificationService.create(
-                    user=assignment.property.agent,
-                    title='QR Code Scanned!',
-                    body=f'Someone scanned the QR code for "{assignment.property.title}".',
-                    notification_type='qr_scan',
-                )
-            except Exception as e:
-                logger.error(f"Notification error in QRScanRedirectView: {str(e)}")
-
             # Return redirect URL
-            redirect_url = f"https://api.scan2home.co.uk/api/v1/user/properties/{assignment.property.id}/"
-            return Response({'redirect_url': redirect_url, 'property_id': str(assignment.property.id)})
+            redirect_url = f"https://api.scan2home.co.uk/api/v1/user/properties/{target['property_id']}/"
+            return Response({'redirect_url': redirect_url, 'property_id': target['property_id']})
         except Exception as e:
             logger.error(f"Critical error in QRScanRedirectView: {str(e)}")
             logger.error(traceback.format_exc())
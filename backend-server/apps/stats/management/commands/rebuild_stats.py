@@ -0,0 +1,55 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from apps.stats.services import StatsService
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the platform and agent dashboard counters from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report counters that have drifted; exits non-zero if any have',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Seconds between rebuilds; 0 rebuilds once and exits',
+        )
+
+    def handle(self, *args, **options):
+        check, interval = options['check'], options['interval']
+        if check and interval:
+            raise CommandError('--check runs once; drop --interval')
+
+        while True:
+            try:
+                self.rebuild(check)
+            except CommandError:
+                raise
+            except Exception:
+                if not interval:
+                    raise
+                logger.exception('Stats rebuild failed; retrying next interval')
+
+            if not interval:
+                break
+            time.sleep(interval)
+            close_old_connections()
+
+    def rebuild(self, check):
+        diffs = StatsService.rebuild(write=not check)
+        for counter, stored, expected in diffs:
+            self.stdout.write(f'{counter}: stored {stored}, actual {expected}')
+
+        if not diffs:
+            self.stdout.write('Stats are up to date')
+        elif check:
+            raise CommandError(f'{len(diffs)} counters have drifted; run rebuild_stats to fix them')
+        else:
+            self.stdout.write(f'Rebuilt stats ({len(diffs)} counters corrected)')
@@ -0,0 +1,89 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Seed the counters from existing data (same as `manage.py rebuild_stats`)
+POPULATE_SQL = """
+INSERT INTO stats_platform (key, value)
+SELECT key, value FROM (
+    SELECT 'users:' || role AS key, COUNT(*) AS value FROM accounts_users GROUP BY role
+    UNION ALL SELECT 'agents:verified', COUNT(*) FROM accounts_agent_profiles WHERE is_verified
+    UNION ALL SELECT 'agents:pending', COUNT(*) FROM accounts_agent_profiles WHERE NOT is_verified
+    UNION ALL SELECT 'properties', COUNT(*) FROM properties
+    UNION ALL SELECT 'properties:approved', COUNT(*) FROM properties WHERE is_approved
+    UNION ALL SELECT 'views', COALESCE(SUM(views_count), 0) FROM properties
+    UNION ALL SELECT 'qr_scans', COALESCE(SUM(qr_scanned_count), 0) FROM properties
+    UNION ALL SELECT 'property_type:' || property_type, COUNT(*) FROM properties GROUP BY property_type
+    UNION ALL SELECT 'offers', COUNT(*) FROM offers
+    UNION ALL SELECT 'bookings', COUNT(*) FROM bookings
+) counters
+WHERE value <> 0;
+
+INSERT INTO stats_agents (agent_id, properties, views, qr_scans, offers, bookings)
+SELECT p.agent_id, p.properties, p.views, p.qr_scans, COALESCE(o.n, 0), COALESCE(b.n, 0)
+FROM (
+    SELECT agent_id, COUNT(*) AS properties,
+           COALESCE(SUM(views_count), 0) AS views, COALESCE(SUM(qr_scanned_count), 0) AS qr_scans
+    FROM properties GROUP BY agent_id
+) p
+LEFT JOIN (
+    SELECT pr.agent_id, COUNT(*) AS n FROM offers JOIN properties pr ON pr.id = offers.property_id GROUP BY pr.agent_id
+) o ON o.agent_id = p.agent_id
+LEFT JOIN (
+    SELECT pr.agent_id, COUNT(*) AS n FROM bookings JOIN properties pr ON pr.id = bookings.property_id GROUP BY pr.agent_id
+) b ON b.agent_id = p.agent_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("accounts", "0005_alter_otpverification_otp_code"),
+        ("properties", "0005_property_location_index"),
+        ("offers", "0001_initial"),
+        ("bookings", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AgentStats",
+            fields=[
+                (
+                    "agent",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("properties", models.IntegerField(default=0)),
+                ("views", models.BigIntegerField(default=0)),
+                ("qr_scans", models.BigIntegerField(default=0)),
+                ("offers", models.IntegerField(default=0)),
+                ("bookings", models.IntegerField(default=0)),
+            ],
+            options={
+                "db_table": "stats_agents",
+            },
+        ),
+        migrations.CreateModel(
+            name="PlatformStats",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "db_table": "stats_platform",
+            },
+        ),
+        migrations.RunSQL(POPULATE_SQL, migrations.RunSQL.noop),
+    ]
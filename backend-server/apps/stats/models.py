@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import models
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+
+class PlatformStats(models.Model):
+    """
+    Platform-wide counters, one row per key (`properties`, `users:buyer`,
+    `property_type:house`, ... see StatsService._contribution). Kept current
+    by the signal handlers below and StatsService.bump(); recomputed from
+    scratch by `manage.py rebuild_stats`.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'stats_platform'
+
+    def __str__(self):
+        return f'{self.key} = {self.value}'
+
+
+class AgentStats(models.Model):
+    """Per-agent counters for the agent dashboard, maintained like PlatformStats."""
+    agent = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='stats'
+    )
+    properties = models.IntegerField(default=0)
+    views = models.BigIntegerField(default=0)
+    qr_scans = models.BigIntegerField(default=0)
+    offers = models.IntegerField(default=0)
+    bookings = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'stats_agents'
+
+    def __str__(self):
+        return f'Stats for {self.agent_id}'
+
+
+# ── Incremental maintenance ──────────────────────────────────
+# Each tracked instance remembers the fields that feed the counters as loaded;
+# on save/delete the difference between its old and new contribution is applied.
+# Queryset .update()s bypass this and bump the counters themselves.
+
+@receiver(post_init, sender='properties.Property')
+@receiver(post_init, sender=settings.AUTH_USER_MODEL)
+@receiver(post_init, sender='accounts.AgentProfile')
+@receiver(post_init, sender='offers.Offer')
+@receiver(post_init, sender='bookings.Booking')
+def remember_stats_state(sender, instance, **kwargs):
+    from .services import StatsService
+    instance._stats_state = StatsService.state_of(instance)
+
+
+@receiver(post_save, sender='properties.Property')
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender='accounts.AgentProfile')
+@receiver(post_save, sender='offers.Offer')
+@receiver(post_save, sender='bookings.Booking')
+def count_saved(sender, instance, created, **kwargs):
+    from .services import StatsService
+    new = StatsService.state_of(instance)
+    old = None if created else getattr(instance, '_stats_state', None)
+    if created or old is not None:
+        StatsService.apply_change(instance, old, new)
+    instance._stats_state = new
+
+
+@receiver(post_delete, sender='properties.Property')
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender='accounts.AgentProfile')
+@receiver(post_delete, sender='offers.Offer')
+@receiver(post_delete, sender='bookings.Booking')
+def count_deleted(sender, instance, **kwargs):
+    from .services import StatsService
+    StatsService.apply_change(instance, StatsService.state_of(instance), None)
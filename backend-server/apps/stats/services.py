@@ -0,0 +1,288 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import AgentStats, PlatformStats
+
+
+class StatsService:
+    """
+    Incrementally maintained dashboard counters (PlatformStats, AgentStats).
+
+    Model signals turn each save/delete of a property, user, agent profile,
+    offer or booking into counter deltas, applied inside the same transaction
+    as `value = value + delta` upserts, so the counters commit or roll back
+    with the change. View and scan counts, which are bumped with queryset
+    updates, are applied by their writers through `bump()` / `record_scans()`.
+
+    Anything else that skips the signals drifts the counters: other queryset
+    `update()`s, `bulk_create()` without `record_created()`, deleting rows
+    loaded with their tracked fields deferred, raw SQL. `rebuild()` recomputes
+    everything and corrects that drift; `manage.py rebuild_stats --interval`
+    must run on a schedule for it (the stats-rebuilder service).
+    """
+    TRACKED_FIELDS = {
+        'properties.Property': ('agent_id', 'is_approved', 'property_type', 'views_count', 'qr_scanned_count'),
+        settings.AUTH_USER_MODEL: ('role',),
+        'accounts.AgentProfile': ('is_verified',),
+        'offers.Offer': ('property_id',),
+        'bookings.Booking': ('property_id',),
+    }
+    AGENT_FIELDS = ('properties', 'views', 'qr_scans', 'offers', 'bookings')
+
+    # ── Reading ───────────────────────────────────────────────
+
+    @staticmethod
+    def platform():
+        """{key: value} for every platform counter (missing keys are 0)."""
+        return Counter(dict(PlatformStats.objects.values_list('key', 'value')))
+
+    @staticmethod
+    def property_by_type(platform):
+        prefix = 'property_type:'
+        return {key[len(prefix):]: value for key, value in platform.items() if key.startswith(prefix) and value}
+
+    @staticmethod
+    def for_agent(agent_id):
+        row = AgentStats.objects.filter(agent_id=agent_id).values(*StatsService.AGENT_FIELDS).first()
+        return row or dict.fromkeys(StatsService.AGENT_FIELDS, 0)
+
+    # ── Incremental updates ───────────────────────────────────
+
+    @staticmethod
+    def state_of(instance):
+        """The tracked field values of `instance`, or None if any of them is deferred."""
+        fields = StatsService.TRACKED_FIELDS[instance._meta.label]
+        values = instance.__dict__
+        if any(field not in values for field in fields):
+            return None  # never load a deferred field just for the counters
+        return tuple(values[field] for field in fields)
+
+    @staticmethod
+    def apply_change(instance, old, new):
+        """Bump the counters by `instance`'s contribution in state `new` minus that in `old`."""
+        if old == new:
+            return
+        platform, agents = Counter(), defaultdict(Counter)
+        for state, sign in ((old, -1), (new, 1)):
+            if state is not None:
+                StatsService._add_contribution(platform, agents, instance, state, sign)
+        StatsService.bump(platform, agents)
+
+    @staticmethod
+    def record_created(instances):
+        """
+        Counter bumps for rows inserted without signals (`bulk_create`); call it
+        in the same transaction as the insert.
+        """
+        platform, agents = Counter(), defaultdict(Counter)
+        for instance in instances:
+            StatsService._add_contribution(platform, agents, instance, StatsService.state_of(instance), 1)
+        StatsService.bump(platform, agents)
+
+    @staticmethod
+    def _add_contribution(platform, agents, instance, state, sign):
+        platform_part, agent_part = StatsService._contribution(instance, state)
+        for key, value in platform_part.items():
+            platform[key] += sign * value
+        for agent_id, fields in agent_part.items():
+            for field, value in fields.items():
+                agents[agent_id][field] += sign * value
+
+    @staticmethod
+    def _contribution(instance, state):
+        label = instance._meta.label
+        if label == 'properties.Property':
+            agent_id, is_approved, property_type, views, scans = state
+            platform = {
+                'properties': 1,
+                'properties:approved': int(is_approved),
+                f'property_type:{property_type}': 1,
+                'views': views,
+                'qr_scans': scans,
+            }
+            return platform, {agent_id: {'properties': 1, 'views': views, 'qr_scans': scans}}
+        if label == settings.AUTH_USER_MODEL:
+            return {f'users:{state[0]}': 1}, {}
+        if label == 'accounts.AgentProfile':
+            return {'agents:verified' if state[0] else 'agents:pending': 1}, {}
+
+        key = 'offers' if label == 'offers.Offer' else 'bookings'
+        agent_id = StatsService._agent_of(instance, state[0])
+        return {key: 1}, ({agent_id: {key: 1}} if agent_id else {})
+
+    @staticmethod
+    def _agent_of(instance, property_id):
+        field = instance._meta.get_field('property')
+        if field.is_cached(instance) and instance.property.pk == property_id:
+            return instance.property.agent_id
+        from apps.properties.models import Property
+        return Property.objects.filter(pk=property_id).values_list('agent_id', flat=True).first()
+
+    @staticmethod
+    def record_scans(property_deltas):
+        """Counter bumps for QR scans applied as `{property_id: scans}` (see ScanService)."""
+        from apps.properties.models import Property
+        deltas = {str(pk): int(delta) for pk, delta in property_deltas.items()}
+        if not deltas:
+            return
+        agents = defaultdict(Counter)
+        for pk, agent_id in Property.objects.filter(pk__in=list(deltas)).values_list('pk', 'agent_id'):
+            agents[agent_id]['qr_scans'] += deltas[str(pk)]
+        StatsService.bump({'qr_scans': sum(deltas.values())}, agents)
+
+    @staticmethod
+    def bump(platform=None, agents=None):
+        """
+        Add `{key: delta}` to the platform counters and `{agent_id: {field: delta}}`
+        to the agent rows. Rows are touched in key order so concurrent bumps
+        can't deadlock.
+        """
+        platform = {key: delta for key, delta in (platform or {}).items() if delta}
+        rows = []
+        for agent_id in sorted(agents or {}, key=str):
+            deltas = [int(agents[agent_id].get(field, 0)) for field in StatsService.AGENT_FIELDS]
+            if any(deltas):
+                rows.append((agent_id, deltas))
+
+        with connection.cursor() as cursor:
+            if platform:
+                keys = sorted(platform)
+                values = ', '.join(['(%s, %s)'] * len(keys))
+                cursor.execute(
+                    f'INSERT INTO {PlatformStats._meta.db_table} (key, value) VALUES {values} '
+                    f'ON CONFLICT (key) DO UPDATE SET value = {PlatformStats._meta.db_table}.value + EXCLUDED.value',
+                    [param for key in keys for param in (key, platform[key])],
+                )
+            # A row that only goes down is never created: it may belong to an
+            # agent being deleted in this very transaction.
+            upserts = [row for row in rows if any(delta > 0 for delta in row[1])]
+            updates = [row for row in rows if not any(delta > 0 for delta in row[1])]
+            if upserts:
+                StatsService._upsert_agents(cursor, upserts)
+            if updates:
+                StatsService._update_agents(cursor, updates)
+
+    @staticmethod
+    def _upsert_agents(cursor, rows):
+        table = AgentStats._meta.db_table
+        fields = StatsService.AGENT_FIELDS
+        values = ', '.join([f'(%s, {", ".join(["%s"] * len(fields))})'] * len(rows))
+        cursor.execute(
+            f'INSERT INTO {table} (agent_id, {", ".join(fields)}) VALUES {values} '
+            f'ON CONFLICT (agent_id) DO UPDATE SET '
+            + ', '.join(f'{field} = {table}.{field} + EXCLUDED.{field}' for field in fields),
+            [param for agent_id, deltas in rows for param in (agent_id, *deltas)],
+        )
+
+    @staticmethod
+    def _update_agents(cursor, rows):
+        table = AgentStats._meta.db_table
+        fields = StatsService.AGENT_FIELDS
+        pk_type = get_user_model()._meta.pk.db_type(connection)
+        values = ', '.join([f'(%s::{pk_type}, {", ".join(["%s::bigint"] * len(fields))})'] * len(rows))
+        cursor.execute(
+            f'UPDATE {table} AS s SET '
+            + ', '.join(f'{field} = s.{field} + v.{field}' for field in fields)
+            + f' FROM (VALUES {values}) AS v(agent_id, {", ".join(fields)}) WHERE s.agent_id = v.agent_id',
+            [param for agent_id, deltas in rows for param in (agent_id, *deltas)],
+        )
+
+    # ── Full recomputation ────────────────────────────────────
+
+    @staticmethod
+    def compute():
+        """(platform counters, agent rows) recomputed from the source tables."""
+        from apps.accounts.models import AgentProfile
+        from apps.bookings.models import Booking
+        from apps.offers.models import Offer
+        from apps.properties.models import Property
+
+        platform = Counter()
+        for role, count in get_user_model().objects.order_by().values_list('role').annotate(n=Count('pk')):
+            platform[f'users:{role}'] = count
+        profiles = AgentProfile.objects.aggregate(
+            verified=Count('pk', filter=Q(is_verified=True)),
+            pending=Count('pk', filter=Q(is_verified=False)),
+        )
+        platform['agents:verified'] = profiles['verified']
+        platform['agents:pending'] = profiles['pending']
+        properties = Property.objects.aggregate(
+            properties=Count('pk'),
+            approved=Count('pk', filter=Q(is_approved=True)),
+            views=Coalesce(Sum('views_count'), 0),
+            qr_scans=Coalesce(Sum('qr_scanned_count'), 0),
+        )
+        platform['properties'] = properties['properties']
+        platform['properties:approved'] = properties['approved']
+        platform['views'] = properties['views']
+        platform['qr_scans'] = properties['qr_scans']
+        for property_type, count in Property.objects.order_by().values_list('property_type').annotate(n=Count('pk')):
+            platform[f'property_type:{property_type}'] = count
+        platform['offers'] = Offer.objects.count()
+        platform['bookings'] = Booking.objects.count()
+
+        agents = defaultdict(lambda: dict.fromkeys(StatsService.AGENT_FIELDS, 0))
+        for row in Property.objects.order_by().values('agent_id').annotate(
+            n=Count('pk'), views=Coalesce(Sum('views_count'), 0), qr_scans=Coalesce(Sum('qr_scanned_count'), 0),
+        ):
+            agents[row['agent_id']].update(properties=row['n'], views=row['views'], qr_scans=row['qr_scans'])
+        for model, field in ((Offer, 'offers'), (Booking, 'bookings')):
+            for agent_id, count in model.objects.order_by().values_list('property__agent_id').annotate(n=Count('pk')):
+                agents[agent_id][field] = count
+
+        platform = {key: value for key, value in platform.items() if value}
+        agents = {agent_id: row for agent_id, row in agents.items() if any(row.values())}
+        return platform, agents
+
+    @staticmethod
+    def drift(expected_platform, expected_agents):
+        """[(counter, stored, expected)] for every counter that differs."""
+        stored_platform = StatsService.platform()
+        stored_agents = {
+            row.pop('agent_id'): row
+            for row in AgentStats.objects.values('agent_id', *StatsService.AGENT_FIELDS)
+        }
+        zero = dict.fromkeys(StatsService.AGENT_FIELDS, 0)
+        diffs = []
+        for key in sorted(set(stored_platform) | set(expected_platform)):
+            stored, expected = stored_platform.get(key, 0), expected_platform.get(key, 0)
+            if stored != expected:
+                diffs.append((key, stored, expected))
+        for agent_id in sorted(set(stored_agents) | set(expected_agents), key=str):
+            stored_row = stored_agents.get(agent_id, zero)
+            expected_row = expected_agents.get(agent_id, zero)
+            for field in StatsService.AGENT_FIELDS:
+                if stored_row[field] != expected_row[field]:
+                    diffs.append((f'agent:{agent_id}:{field}', stored_row[field], expected_row[field]))
+        return diffs
+
+    @staticmethod
+    def rebuild(write=True):
+        """
+        Recompute every counter. Returns the drift found; with `write` the
+        stored counters are replaced. Concurrent bumps wait on the table lock
+        and apply on top of the rebuilt values, so none are lost or doubled.
+        """
+        with transaction.atomic():
+            if write:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'LOCK TABLE {PlatformStats._meta.db_table}, {AgentStats._meta.db_table} IN EXCLUSIVE MODE'
+                    )
+            platform, agents = StatsService.compute()
+            diffs = StatsService.drift(platform, agents)
+            if write and diffs:
+                PlatformStats.objects.all().delete()
+                PlatformStats.objects.bulk_create(
+                    [PlatformStats(key=key, value=value) for key, value in platform.items()]
+                )
+                AgentStats.objects.all().delete()
+                AgentStats.objects.bulk_create(
+                    [AgentStats(agent_id=agent_id, **row) for agent_id, row in agents.items()], batch_size=1000
+                )
+        return diffs
@@ -0,0 +1,159 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase
+
+from apps.accounts.models import AgentProfile
+from apps.bookings.models import Booking
+from apps.offers.models import Offer
+from apps.properties.models import Property
+
+from .services import StatsService
+
+User = get_user_model()
+
+
+class StatsServiceTests(TestCase):
+    """The incrementally maintained counters always agree with a full recount."""
+
+    def setUp(self):
+        self.agent = self.make_agent('agent@example.com')
+        self.other_agent = self.make_agent('other@example.com')
+        self.buyer = User.objects.create_user('buyer@example.com', full_name='Buyer')
+
+    def tearDown(self):
+        # Every test ends in sync with the source tables
+        out = StringIO()
+        call_command('rebuild_stats', check=True, stdout=out)
+        self.assertIn('Stats are up to date', out.getvalue())
+
+    def make_agent(self, email):
+        agent = User.objects.create_user(email, full_name='Agent', role='agent')
+        AgentProfile.objects.create(user=agent)
+        return agent
+
+    def make_property(self, agent=None, **fields):
+        return Property.objects.create(
+            agent=agent or self.agent, title='Home', price=100000, address='1 High St', **fields
+        )
+
+    def make_offer(self, prop):
+        return Offer.objects.create(
+            property=prop, buyer=self.buyer, buyer_name='Buyer', email='b@example.com', phone='1', offer_amount=90000
+        )
+
+    def make_booking(self, prop):
+        return Booking.objects.create(
+            property=prop, buyer=self.buyer, date=datetime.date(2026, 1, 1), time_slot=datetime.time(10)
+        )
+
+    def test_users_and_agent_verification(self):
+        platform = StatsService.platform()
+        self.assertEqual((platform['users:buyer'], platform['users:agent']), (1, 2))
+        self.assertEqual((platform['agents:verified'], platform['agents:pending']), (0, 2))
+
+        profile = self.agent.agent_profile
+        profile.is_verified = True
+        profile.save()
+        platform = StatsService.platform()
+        self.assertEqual((platform['agents:verified'], platform['agents:pending']), (1, 1))
+
+    def test_property_create_approve_and_type_change(self):
+        prop = self.make_property(property_type='house')
+        platform = StatsService.platform()
+        self.assertEqual((platform['properties'], platform['properties:approved']), (1, 0))
+        self.assertEqual(StatsService.property_by_type(platform), {'house': 1})
+        self.assertEqual(StatsService.for_agent(self.agent.pk)['properties'], 1)
+
+        prop.is_approved = True
+        prop.save()
+        self.assertEqual(StatsService.platform()['properties:approved'], 1)
+
+        prop.property_type = 'villa'
+        prop.save()
+        self.assertEqual(StatsService.property_by_type(StatsService.platform()), {'villa': 1})
+
+    def test_property_delete(self):
+        prop = self.make_property(is_approved=True, views_count=7)
+        self.make_offer(prop)
+        prop.delete()
+
+        platform = StatsService.platform()
+        self.assertEqual((platform['properties'], platform['properties:approved'], platform['views']), (0, 0, 0))
+        self.assertEqual(platform['offers'], 0)
+        self.assertEqual(StatsService.for_agent(self.agent.pk), dict.fromkeys(StatsService.AGENT_FIELDS, 0))
+
+    def test_cascade_user_delete(self):
+        prop = self.make_property(is_approved=True, views_count=3)
+        self.make_offer(prop)
+        self.make_booking(prop)
+        self.make_property(agent=self.other_agent)
+
+        self.agent.delete()
+        platform = StatsService.platform()
+        self.assertEqual((platform['users:agent'], platform['agents:pending']), (1, 1))
+        self.assertEqual((platform['properties'], platform['views']), (1, 0))
+        self.assertEqual((platform['offers'], platform['bookings']), (0, 0))
+        self.assertEqual(StatsService.for_agent(self.other_agent.pk)['properties'], 1)
+
+    def test_offers_and_bookings_count_for_the_property_agent(self):
+        theirs = self.make_property(agent=self.other_agent)
+        self.make_offer(theirs)
+        self.make_booking(theirs)
+
+        self.assertEqual(StatsService.for_agent(self.agent.pk)['offers'], 0)
+        other = StatsService.for_agent(self.other_agent.pk)
+        self.assertEqual((other['offers'], other['bookings']), (1, 1))
+
+        # Moving the offer moves its count
+        offer = Offer.objects.get()
+        offer.property = self.make_property()
+        offer.save()
+        self.assertEqual(StatsService.for_agent(self.agent.pk)['offers'], 1)
+        self.assertEqual(StatsService.for_agent(self.other_agent.pk)['offers'], 0)
+
+    def test_record_scans(self):
+        mine, theirs = self.make_property(), self.make_property(agent=self.other_agent)
+        deltas = {mine.pk: 3, theirs.pk: 2}
+        for pk, delta in deltas.items():
+            Property.objects.filter(pk=pk).update(qr_scanned_count=F('qr_scanned_count') + delta)
+        StatsService.record_scans(deltas)
+
+        self.assertEqual(StatsService.platform()['qr_scans'], 5)
+        self.assertEqual(StatsService.for_agent(self.agent.pk)['qr_scans'], 3)
+        self.assertEqual(StatsService.for_agent(self.other_agent.pk)['qr_scans'], 2)
+
+    def test_record_created(self):
+        props = Property.objects.bulk_create([
+            Property(agent=self.agent, title='Home', price=1, address='x', is_approved=True) for _ in range(3)
+        ])
+        StatsService.record_created(props)
+        self.assertEqual(StatsService.platform()['properties:approved'], 3)
+
+    def test_rebuild_fixes_drift(self):
+        prop = self.make_property()
+        self.make_offer(prop)
+        # Writes that bypass the counters
+        Property.objects.update(views_count=5)
+        Property.objects.bulk_create([Property(agent=self.other_agent, title='Home', price=1, address='x')])
+        Offer.objects.only('pk').delete()  # property_id deferred: no delta
+
+        self.assertCountEqual(StatsService.rebuild(write=False), [
+            ('offers', 1, 0),
+            ('properties', 1, 2),
+            ('property_type:house', 1, 2),
+            ('views', 0, 5),
+            (f'agent:{self.agent.pk}:views', 0, 5),
+            (f'agent:{self.agent.pk}:offers', 1, 0),
+            (f'agent:{self.other_agent.pk}:properties', 0, 1),
+        ])
+        with self.assertRaises(CommandError):
+            call_command('rebuild_stats', check=True, stdout=StringIO())
+        out = StringIO()
+        call_command('rebuild_stats', stdout=out)
+        self.assertIn('7 counters corrected', out.getvalue())
+        self.assertEqual(StatsService.platform()['views'], 5)
+        self.assertEqual(StatsService.for_agent(self.other_agent.pk)['properties'], 1)